@@ -60,7 +60,7 @@ def get_extra_requires():
     """
     extras = {
         'dev': ['versioneer', 'wheel', 'CProfileV', 'pytest', 'pytest-qt'],
-        'util': ['pandas', 'openpyxl', 'shapely'],
+        'util': ['pandas', 'openpyxl', 'shapely', 'tifffile'],
         'doc': ['sphinx', 'sphinx-automodapi'],
     }
     return extras
@@ -28,15 +28,21 @@ class Controller():
     """
     #TODO terminally remove uncommented code
 
-    def __init__(self):
+    def __init__(self, entityLayer=False):
         """Implements all functions to manipulate the view and the entities
+
+        Parameters
+        ----------
+        entityLayer : bool
+            Draw all entities with a single EntityLayer, see ViewContext
         """
         # shoudl be in some kind of data structure?
         self.dataManager = DataManager()
         self.entityManager = EntityManager()
 
         self.viewer = ViewContext(dataManager=self.dataManager,
-                                  entityManager=self.entityManager)
+                                  entityManager=self.entityManager,
+                                  entityLayer=entityLayer)
 
         # self._connect()
 
@@ -187,12 +193,10 @@ class Controller():
                     warnings.warn(msg)
 
     def _initRenderEntity(self, entity):
-        """ Check of entity has GFX, create one if needed and add to
-        viewer
+        """ Adds entity to the viewer, which makes a GFX for it, unless
+        an EntityLayer draws all entities
         """
-        if entity.GFX is None:
-            entity.makeGFX()
-            self.viewer.addEntity(entity)
+        self.viewer.addEntity(entity)
 
     def setImages(self, imageSelection):
         """sets image selection viable to display in all kinds of
@@ -1,4 +1,6 @@
 from .entity import Entity
 from .entitymanager import EntityManager
 from .entityfile import EntityFile
+from .contourstore import ContourStore
+from .selection import SelectionModel
 from .entitytools import pixmap_to_json, read_into_manager
@@ -0,0 +1,269 @@
+"""Packed storage of all entity contours in a single coordinate buffer.
+
+All points of all contours are kept in one int32 array of the shape
+`(n, 2)`. Two offset arrays index into it, CSR-style: `cntOffsets` maps
+each contour to its range of points and `entOffsets` maps each entity to
+its range of contours. Entities get views into the buffer, so operations on
+the whole buffer are single numpy calls.
+"""
+from pathlib import Path
+
+import numpy as np
+
+
+class ContourStore():
+    """Ragged array of contours, grouped by entity
+
+    Parameters
+    ----------
+    coords : ndarray
+        int32 array with the shape `(n, 2)` holding all points
+    cntOffsets : ndarray
+        int64 array with the shape `(c + 1,)`, where the points of contour
+        `i` are `coords[cntOffsets[i]:cntOffsets[i + 1]]`
+    entOffsets : ndarray
+        int64 array with the shape `(e + 1,)`, where the contours of entity
+        `j` are the contours `entOffsets[j]` to `entOffsets[j + 1]`
+    objectIds : ndarray
+        int64 array with the shape `(e,)` with the objectId of each entity
+    """
+
+    def __init__(self, coords=None, cntOffsets=None, entOffsets=None,
+                 objectIds=None):
+        if coords is None:
+            coords = np.empty((0, 2), np.int32)
+        if cntOffsets is None:
+            cntOffsets = np.zeros(1, np.int64)
+        if entOffsets is None:
+            entOffsets = np.zeros(1, np.int64)
+        if objectIds is None:
+            objectIds = np.empty(0, np.int64)
+
+        self.coords = np.ascontiguousarray(coords, np.int32).reshape(-1, 2)
+        self.cntOffsets = np.asarray(cntOffsets, np.int64)
+        self.entOffsets = np.asarray(entOffsets, np.int64)
+        self.objectIds = np.asarray(objectIds, np.int64)
+
+        if len(self.entOffsets) != len(self.objectIds) + 1:
+            raise ValueError('entOffsets and objectIds do not match')
+        if self.cntOffsets[-1] != len(self.coords):
+            raise ValueError('cntOffsets do not cover all coords')
+
+    def __len__(self):
+        """Number of entities in the store
+        """
+        return len(self.objectIds)
+
+    @property
+    def contourCount(self):
+        return len(self.cntOffsets) - 1
+
+    @classmethod
+    def fromContours(cls, contourLists, objectIds=None):
+        """Packs a sequence of contour lists
+
+        Parameters
+        ----------
+        contourLists : iterable
+            One entry per entity, each entry is a list of contours, where
+            each contour is a sequence of `(x, y)` points
+        objectIds : iterable of int
+            objectId for each entry in `contourLists`. If `None`, the
+            entries are enumerated starting at 1
+
+        Returns
+        -------
+        store : ContourStore
+            New store holding copies of all contours
+        """
+        parts = []
+        cntLengths = []
+        entLengths = []
+        for contours in contourLists:
+            if contours is None:
+                contours = []
+            entLengths.append(len(contours))
+            for cnt in contours:
+                # catching the case where there is only a dot
+                cnt = np.asarray(cnt).reshape(-1, 2)
+                parts.append(cnt)
+                cntLengths.append(len(cnt))
+
+        if objectIds is None:
+            objectIds = np.arange(1, len(entLengths) + 1)
+        objectIds = np.asarray(list(objectIds), np.int64)
+
+        if parts:
+            coords = np.concatenate(parts).round().astype(np.int32)
+        else:
+            coords = np.empty((0, 2), np.int32)
+
+        cntOffsets = np.zeros(len(cntLengths) + 1, np.int64)
+        np.cumsum(cntLengths, out=cntOffsets[1:])
+        entOffsets = np.zeros(len(entLengths) + 1, np.int64)
+        np.cumsum(entLengths, out=entOffsets[1:])
+
+        return cls(coords, cntOffsets, entOffsets, objectIds)
+
+    @classmethod
+    def fromEntities(cls, entities):
+        """Packs the contours of all entities
+
+        Parameters
+        ----------
+        entities : iterable of Entity
+            Entities to pack, the order is kept
+
+        Returns
+        -------
+        store : ContourStore
+            New store with one entry per entity
+        """
+        entities = list(entities)
+        return cls.fromContours(
+            (ent.contours for ent in entities),
+            (ent.objectId for ent in entities))
+
+    def contours(self, index):
+        """List of views into the buffer for the entity at index
+
+        Parameters
+        ----------
+        index : int
+            Position of the entity in the store
+
+        Returns
+        -------
+        contours : list of ndarray
+            Views of the shape `(k, 2)` into `coords`. Changing them will
+            change the store
+        """
+        cnt0, cnt1 = self.entOffsets[index], self.entOffsets[index + 1]
+        offsets = self.cntOffsets[cnt0:cnt1 + 1]
+        return [self.coords[start:stop] for start, stop in \
+                zip(offsets[:-1], offsets[1:])]
+
+    def __iter__(self):
+        """Iterates over the contour lists of all entities
+        """
+        return (self.contours(i) for i in range(len(self)))
+
+    def entityIndex(self):
+        """Entity position for each point in `coords`
+
+        Returns
+        -------
+        index : ndarray
+            int64 array with the shape `(n,)`
+        """
+        pointsPerEntity = np.diff(self.cntOffsets[self.entOffsets])
+        return np.repeat(np.arange(len(self)), pointsPerEntity)
+
+    def bboxes(self):
+        """Bounding boxes of all entities
+
+        Returns
+        -------
+        bboxes : ndarray
+            int32 array with the shape `(e, 2, 2)`, where `bboxes[j]` is
+            `((xmin, ymin), (xmax, ymax))` of entity `j`. Entities without
+            any point have the bounding box `((0, 0), (-1, -1))`
+        """
+        bboxes = np.empty((len(self), 2, 2), np.int32)
+        bboxes[:, 0] = 0
+        bboxes[:, 1] = -1
+
+        pointStarts = self.cntOffsets[self.entOffsets]
+        hasPoints = np.diff(pointStarts) > 0
+        if not hasPoints.any():
+            return bboxes
+
+        # reduceat needs non-empty segments, so only the starts of entities
+        # with points are used
+        starts = pointStarts[:-1][hasPoints]
+        bboxes[hasPoints, 0] = np.minimum.reduceat(self.coords, starts)
+        bboxes[hasPoints, 1] = np.maximum.reduceat(self.coords, starts)
+        return bboxes
+
+    def translate(self, dx, dy):
+        """Moves all contours inplace
+
+        Parameters
+        ----------
+        dx : int
+            Offset along the horizontal image axis
+        dy : int
+            Offset along the vertical image axis
+        """
+        self.coords += np.array([dx, dy], np.int32)
+
+    def clip(self, xres, yres):
+        """Clips all points inplace to the image extents
+
+        Parameters
+        ----------
+        xres : int
+            Maximal x value of any point
+        yres : int
+            Maximal y value of any point
+        """
+        np.clip(self.coords, 0, np.array([xres, yres], np.int32),
+                out=self.coords)
+
+    def scale(self, factor):
+        """Scales all points inplace, relative to the origin
+
+        Parameters
+        ----------
+        factor : float
+            Scaling factor, resulting points are rounded to int
+        """
+        scaled = np.rint(self.coords * float(factor))
+        self.coords[:] = scaled
+
+    def toLists(self):
+        """Converts the store back into nested lists
+
+        Returns
+        -------
+        contourLists : list of list of list
+            One entry per entity, each being a list of contours, where each
+            contour is a list of `[x, y]` points
+        """
+        points = self.coords.tolist()
+        offsets = self.cntOffsets.tolist()
+        contours = [points[start:stop] for start, stop in \
+                    zip(offsets[:-1], offsets[1:])]
+        entOffsets = self.entOffsets.tolist()
+        return [contours[start:stop] for start, stop in \
+                zip(entOffsets[:-1], entOffsets[1:])]
+
+    def save(self, filename):
+        """Writes the store as numpy `.npz` archive
+
+        Parameters
+        ----------
+        filename : str, pathlib.Path
+            Path to the file written to
+        """
+        with Path(filename).open('wb') as fout:
+            np.savez(fout, coords=self.coords, cntOffsets=self.cntOffsets,
+                     entOffsets=self.entOffsets, objectIds=self.objectIds)
+
+    @classmethod
+    def load(cls, filename):
+        """Reads a store written by `ContourStore.save`
+
+        Parameters
+        ----------
+        filename : str, pathlib.Path
+            Path to the `.npz` archive
+
+        Returns
+        -------
+        store : ContourStore
+            Store with the data found in `filename`
+        """
+        with np.load(str(filename)) as data:
+            return cls(data['coords'], data['cntOffsets'],
+                       data['entOffsets'], data['objectIds'])
@@ -16,7 +16,7 @@ from PyQt5.QtCore import QPointF, QRectF
 from PyQt5.QtGui import QPolygonF, QPainterPath
 
 ### Project
-from ..graphics.gfx import GFX
+from ..graphics.gfx import GFX, arrayToPolygon, polygonToArray
 from .misc import get_kernel
 
 
@@ -25,6 +25,11 @@ class Entity(ImageEntity):
     
     _GFX: GFX = None
 
+    # Qt representations of contour, built once per contour
+    _path: QPainterPath = None
+    _polygons: list = None
+    _cachedContour: list = None
+
     def __init__(self, objectId=None, *args, **kwargs):
         if isinstance(objectId, UUID):
             super().__init__(objectId, *args, **kwargs)
@@ -43,7 +48,7 @@ class Entity(ImageEntity):
     @GFX.setter
     def GFX(self, gfx):
         if gfx is None:
-            self._gfx = None
+            self._GFX = None
             self.contour = []
             self.bbox = np.empty((2, 2), int)
             self.slc = np.s_[:1, :1]
@@ -58,9 +63,25 @@ class Entity(ImageEntity):
     def objectId(self, new_objectid):
         self.scalars['object_id'] = new_objectid
 
+    def _updateCache(self):
+        if self._polygons is None or not self._cachedContour is self.contour:
+            self._polygons = contoursToPolgons(self.contour)
+            self._path = polygonsToPath(self._polygons)
+            self._cachedContour = self.contour
+
+    @property
+    def polygons(self):
+        """Contours as list of QPolygonF, cached until the contour changes
+        """
+        self._updateCache()
+        return self._polygons
+
     @property
     def path(self):
-        return contoursToPath(self.contour)
+        """Contours as QPainterPath, cached until the contour changes
+        """
+        self._updateCache()
+        return self._path
 
     @path.setter
     def path(self, new_path):
@@ -108,13 +129,32 @@ class Entity(ImageEntity):
         ptx, pty = top_left
         return QRectF(ptx, pty, width, height)
 
+    def invalidateCache(self):
+        """Drops polygons and path, e.g. after the contour was changed
+        inplace, which the cache can not detect
+        """
+        self._polygons = None
+        self._path = None
+        self._cachedContour = None
+
+    def update_contour(self, *args, **kwargs):
+        super().update_contour(*args, **kwargs)
+        self.invalidateCache()
+        if not self._GFX is None:
+            self._GFX.updateGeometry()
+
     def from_contours(self, contours):
         self.update_contour(contours)
 
     def makeGFX(self, brush=None, pen=None):
         """
-        Creates new GFX object
+        Creates new GFX object. An existing GFX is reused and only its
+        geometry is updated, see GFX.updateGeometry
         """
+        if not self._GFX is None:
+            self._GFX.updateGeometry()
+            return self._GFX
+
         self.update_contour(self.contours)
         self.GFX = GFX(self, brush, pen)
 
@@ -149,8 +189,9 @@ class Entity(ImageEntity):
             Number of pixels to move along horizontal image axis
         """
 
-        moved_contour = [[(pt0 + rows, pt1 + cols) for (pt0, pt1) in cnt] \
-                          for cnt in self.contours]
+        offset = np.array([rows, cols])
+        moved_contour = [np.asarray(cnt).reshape(-1, 2) + offset \
+                         for cnt in self.contours]
 
         self.update_contour(moved_contour)
 
@@ -217,19 +258,7 @@ def contoursToPolgons(contours):
     if contours is None:
         return None
 
-    polygons = []  
-    for contour in contours:
-        polygon = QPolygonF()
-        try:
-            # catching the case where there is only a dot
-            for x, y in contour:
-                polygon << QPointF(x, y)
-        except TypeError:
-            x, y = contour
-            polygon << QPointF(x, y)
-        polygons.append(polygon)
-
-    return polygons
+    return [arrayToPolygon(contour) for contour in contours]
 
 
 def pathToContours(path):
@@ -239,12 +268,7 @@ def pathToContours(path):
     contours = []
 
     for polygon in path.toSubpathPolygons():
-        n_points = len(polygon)
-        contour = np.empty([n_points, 2], dtype=np.int32)
-        for i in range(n_points):
-            contour[i, 0] = polygon[i].x()
-            contour[i, 1] = polygon[i].y()
-        contours.append(contour)
+        contours.append(polygonToArray(polygon).astype(np.int32))
 
     return contours
 
@@ -253,19 +277,7 @@ def contoursToPath(contours):
     if contours is None:
         return None
 
-    path = QPainterPath()
-    for contour in contours:
-        polygon = QPolygonF()
-        try:
-            # catching the case where there is only a dot
-            for x, y in contour:
-                polygon << QPointF(x, y)
-        except TypeError:
-            x, y = contour
-            polygon << QPointF(x, y)
-        path.addPolygon(polygon)
-
-    return path
+    return polygonsToPath(contoursToPolgons(contours))
 
 
 def polygonsToPath(polys):
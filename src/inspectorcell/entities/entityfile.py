@@ -6,6 +6,22 @@ import io
 import json
 # import IPython as ip
 
+from .contourstore import ContourStore
+
+
+def _roundedPoints(contour):
+    """Rounds all points of a contour in one go
+
+    Returns
+    -------
+    points : list of list
+        list of `[x, y]` int points
+    """
+    if len(contour) == 0:
+        return []
+    points = np.round(np.asarray(contour, float)).astype(int)
+    return points.reshape(-1, 2).tolist()
+
 
 class _ObjPropertieTable():
 
@@ -84,11 +100,7 @@ class _ObjTable():
             obj['scalars'].append((idx, sc_val))
 
         for cnt in contours:
-            cur_cnt = []
-            for pnt in cnt:
-                pnt = tuple(int(c) for c in np.round(pnt))
-                cur_cnt.append(pnt)
-            obj['contours'].append(cur_cnt)
+            obj['contours'].append(_roundedPoints(cnt))
 
         for anc in ancestors:
             obj['ancestors'].append(int(anc))
@@ -99,7 +111,11 @@ class _ObjTable():
 
     def fromDicts(self, json_dicts):
         self.tags = set([])
-        for obj in json_dicts:
+        json_dicts = list(json_dicts)
+        # all contours of the file are rounded at once in a packed store
+        store = ContourStore.fromContours(
+            obj['contours'] for obj in json_dicts)
+        for obj, contours in zip(json_dicts, store.toLists()):
             tags = []
             for idx in obj['tags']:
                 a_tag = self._prop.get_prop(int(idx))
@@ -116,13 +132,6 @@ class _ObjTable():
                 # scalarName, scalarType = eval(keyString)
                 obj['scalars'][keyString] = val
             
-            contours = []
-            for cnt in obj['contours']:
-                cur_cnt = []
-                for pnt in cnt:
-                    pnt = tuple(int(c) for c in np.round(pnt))
-                    cur_cnt.append(pnt)
-                contours.append(cur_cnt)
             obj['contours'] = contours
 
             self._objects.append(obj)
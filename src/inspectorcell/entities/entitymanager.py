@@ -17,6 +17,7 @@ from miscmics.processing.entities.extract import get_sliced_mask, mask_to_contou
 # this
 from .entity import Entity
 from .entityfile import EntityFile
+from .contourstore import ContourStore
 
 
 class EntityManager:
@@ -24,6 +25,11 @@ class EntityManager:
     def __init__(self):
         self._factory = EntityFactory()
         self._usedObjIds = set([])
+        self._contourStore = None
+        self._packedEntities = []
+        self._packedContours = []
+        self._derivedStale = False
+        self._byObjectId = {}
         self.clear()
 
     def __len__(self):
@@ -51,6 +57,7 @@ class EntityManager:
     def iter_all(self):
         """Convinience iterator over all entities that are active
         """
+        self._refreshDerived()
         def _iter():
             for entity in self._factory.ledger.entities.values():
                 yield entity
@@ -111,6 +118,7 @@ class EntityManager:
 
         popee = self.lookupEntity(objectId=eid)
         self._usedObjIds.remove(popee.objectId)
+        self._byObjectId.pop(popee.objectId, None)
 
         # translate the eid to uniqueid...
         self._factory.ledger.remove_entity(popee)
@@ -144,24 +152,149 @@ class EntityManager:
             entity.scalars.update(dict(entry['scalars']))
             entity.historical = bool(entry['historical'])
 
+            # GFX are made by the viewer, if it draws one per entity
             if not entity.historical:
                 try:
                     entity.from_contours(contour)
-                    entity.makeGFX()
+                    hasContour = any(len(cnt) for cnt in entity.contours)
                 except ValueError as e:
                     if not 'polygons' in str(e):
                         raise e
+                    hasContour = False
+                if not hasContour:
                     msg = 'Entity {} has no segment/contour. Will be' +\
                           ' marked historic'
                     warnings.warn(msg.format(objectId))
                     entity.historical = True
-                    entity.contours = []
+                    entity.contour = []
 
     def clear(self):
         """reset the whole entity manager, mainly for testabiliy
         """
         self._factory.ledger.clear()
         self._usedObjIds = set([0])
+        self._byObjectId = {}
+        self._contourStore = None
+        self._packedEntities = []
+        self._packedContours = []
+        self._derivedStale = False
+
+    def packContours(self):
+        """Packs the contours of all entities into one ContourStore
+
+        Each entity gets a list of views into the store as contour. The
+        store holds int32 points, so contours with non-integer points are
+        rounded. Only then derived data like the bounding box is rebuilt,
+        lazily as after EntityManager.translate
+
+        Returns
+        -------
+        store : ContourStore
+            Store with one entry for every entity, in iteration order
+        """
+        entities = list(self.iter_all())
+        rounded = any(
+            not np.issubdtype(np.asarray(cnt).dtype, np.integer) \
+            for ent in entities for cnt in ent.contours)
+        store = ContourStore.fromEntities(entities)
+        packedContours = []
+        for i, ent in enumerate(entities):
+            ent.contour = store.contours(i)
+            packedContours.append(ent.contour)
+
+        self._contourStore = store
+        self._packedEntities = entities
+        self._packedContours = packedContours
+        self._derivedStale = rounded
+        return store
+
+    def _refreshDerived(self):
+        """Rebuilds bounding boxes, masks etc. of all entities after bulk
+        operations on the ContourStore. Does nothing if nothing changed
+        """
+        if not self._derivedStale:
+            return
+        # reset first, update_contour must not trigger a second refresh
+        self._derivedStale = False
+        store = self._contourStore
+        for i, ent in enumerate(self._packedEntities):
+            contours = store.contours(i)
+            if contours:
+                ent.update_contour(contours)
+            # the cache of polygons and path compares contours by identity
+            # and misses changes of the store
+            ent.invalidateCache()
+            # keep the store current, even if update_contour copies
+            self._packedContours[i] = ent.contour
+
+    def translate(self, dx, dy):
+        """Moves all entities by an offset
+
+        Parameters
+        ----------
+        dx : int
+            Number of pixels to move along the horizontal image axis
+        dy : int
+            Number of pixels to move along the vertical image axis
+
+        Note
+        ----
+        Operates on all contours at once. Derived data of the entities is
+        rebuilt lazily, when the entities are accessed next time
+        """
+        self.contourStore.translate(dx, dy)
+        self._derivedStale = True
+
+    def clip(self, xres, yres):
+        """Clips all entity contours to the image extents `[0, xres]` and
+        `[0, yres]`, see EntityManager.translate for details
+        """
+        self.contourStore.clip(xres, yres)
+        self._derivedStale = True
+
+    def scale(self, factor):
+        """Scales all entity contours relative to the image origin, see
+        EntityManager.translate for details
+        """
+        self.contourStore.scale(factor)
+        self._derivedStale = True
+
+    def _storeIsCurrent(self):
+        """Tests if the packed store still backs all entities
+        """
+        if self._contourStore is None:
+            return False
+        if len(self._packedEntities) != len(self):
+            return False
+        # any entity that got a new contour since packing has replaced
+        # its list of views
+        for ent, packed in zip(self._packedEntities, self._packedContours):
+            if not ent.contour is packed or not ent.eid in \
+                    self._factory.ledger.entities:
+                return False
+        return True
+
+    @property
+    def contourStore(self):
+        """ContourStore backing all entity contours, packed on demand
+        """
+        if not self._storeIsCurrent():
+            self.packContours()
+        return self._contourStore
+
+    def bboxes(self):
+        """Bounding boxes of all entities, see ContourStore.bboxes
+
+        Returns
+        -------
+        objectIds : ndarray
+            objectId of each entity
+        bboxes : ndarray
+            Array with the shape `(e, 2, 2)` with the bounding boxes in the
+            same order as `objectIds`
+        """
+        store = self.contourStore
+        return store.objectIds, store.bboxes()
 
     def generateFromContours(self, contourData):
         """Encapsulate the usage of the entity generator
@@ -215,10 +348,12 @@ class EntityManager:
     def getEntities(self):
         """Return iterator over all entities
         """
+        self._refreshDerived()
         return iter(self._factory.ledger.entities.values())
 
     def lookupEntity(self, eid=None, objectId=None):
         # return self._factory.ledger.entities.get(eid)
+        self._refreshDerived()
         hasEid, hasObjId = eid is not None, objectId is not None
 
         if not ((hasEid or hasObjId) and (not (hasEid and hasObjId))):
@@ -229,6 +364,9 @@ class EntityManager:
                 raise ValueError(f'eid must be an UUID instance!')
             return self._factory.ledger.entities.get(eid)
         elif hasObjId:
+            indexed = self._byObjectId.get(objectId)
+            if not indexed is None and indexed.objectId == objectId:
+                return indexed
             ents = self._factory.ledger.entities.values()
             ents = [ent for ent in ents if ent.objectId == objectId]
             if not ents:
@@ -240,6 +378,28 @@ class EntityManager:
                 warnings.warn(msg)
                 return ents[0]
 
+    def lookupEntities(self, objectIds):
+        """Looks up many entities by objectId at once
+
+        Parameters
+        ----------
+        objectIds : iterable of int
+            objectIds to look up
+
+        Returns
+        -------
+        entities : list
+            Entity for each objectId, `None` if not found
+        """
+        self._refreshDerived()
+        found = []
+        for objectId in objectIds:
+            entity = self._byObjectId.get(int(objectId))
+            if not entity is None and entity.objectId != objectId:
+                entity = self.lookupEntity(objectId=int(objectId))
+            found.append(entity)
+        return found
+
     def getObjectId(self, objectId=None):
         if self._is_valid(objectId):
             return objectId
@@ -268,5 +428,6 @@ class EntityManager:
             self._factory.ledger.add_entity(entity)
             # set eid to object id
             self._usedObjIds.add(entity.objectId)
+            self._byObjectId[entity.objectId] = entity
         else:
             raise ValueError(f'Invalid entity to add: {entity}')
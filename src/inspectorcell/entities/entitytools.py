@@ -5,9 +5,12 @@ import numpy as np
 import cv2
 from pathlib import Path
 from functools import partial
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from ..util.image import getImagedata
-from ..entities import EntityManager, EntityFile
+from ..util.raster import rasterize, stroke_margin
+from ..entities import EntityManager, EntityFile, ContourStore
 from .entity import dilatedEntity
 
 
@@ -449,38 +452,134 @@ def draw_entities(canvas, eman, color_func, stroke=3, mode='set'):
         With `set` a black stroke is drawn and filled with the entity.
         Everything under the entity segment will be overdrawn
         With `add` only the entity is added to the canvas
+
+    Note
+    ----
+    The entities are rasterized from their contours by `util.raster` and
+    are not changed
     """
-    # min_vals = {'row': np.inf, 'col': -np.inf}
-    # max_vals = {'row': np.inf, 'col': -np.inf}
-    # for entitiy in eman:
-    #     rvals, cvals = entitiy.mask_slice
+    if not mode in ('set', 'add'):
+        raise ValueError('Invalid mode: {}'.format(mode))
 
-    for entity in eman:
-        color = color_func(entity)
-        try:
-            ch = len(color)
-        except:
-            ch = 1
+    entities = list(eman)
+    store = ContourStore.fromEntities(entities)
+
+    for entity, contours in zip(entities, store):
         try:
-            stroke_sl = entity.mask_slice[::]
-            stroke_mk = entity.mask.copy()
-            if mode == 'set':
-                if stroke == 0:
-                    canvas[stroke_sl][stroke_mk] = color
-                elif stroke > 0:
-                    dilatedEntity(entity, stroke)
-                    canvas[entity.mask_slice][entity.mask] = 0
-                    canvas[stroke_sl][stroke_mk] = color
-                elif stroke < 0:
-                    dilatedEntity(entity, -stroke)
-                    keep = canvas[stroke_sl][stroke_mk].copy()
-                    canvas[entity.mask_slice][entity.mask] = color
-                    canvas[stroke_sl][stroke_mk] = keep
-            elif mode == 'add':
-                canvas[stroke_sl][stroke_mk] += color
-            else:
-                raise ValueError('Invalid mode: {}'.format(mode))
+            rasterize(canvas, [contours], [color_func(entity)],
+                      stroke=stroke, mode=mode)
         except Exception as e:
             msg = 'Could not paint entity {} with error {}'
             warnings.warn(msg.format(entity.eid, str(e)))
     return canvas
+
+def _bin_to_tiles(bboxes, tilesize, ntiles):
+    """Assigns entity indices to all tiles their bounding box touches
+
+    Returns
+    -------
+    bins : dict
+        Maps `(tile_row, tile_col)` to an ascending list of entity indices
+    """
+    nrows, ncols = ntiles
+    lower = bboxes[:, 0] // tilesize
+    upper = bboxes[:, 1] // tilesize
+    valid = np.all(bboxes[:, 1] >= bboxes[:, 0], axis=1)
+    valid &= np.all(upper >= 0, axis=1)
+    valid &= (lower[:, 0] < ncols) & (lower[:, 1] < nrows)
+    lower = np.maximum(lower, 0)
+    upper = np.minimum(upper, (ncols - 1, nrows - 1))
+
+    bins = {}
+    for idx in np.flatnonzero(valid):
+        (tx0, ty0), (tx1, ty1) = lower[idx], upper[idx]
+        for trow in range(ty0, ty1 + 1):
+            for tcol in range(tx0, tx1 + 1):
+                bins.setdefault((trow, tcol), []).append(idx)
+    return bins
+
+def draw_entities_tiled(tiffile, eman, color_func, shape, dtype, stroke=0,
+                        tilesize=512, workers=1):
+    """Draws all entities tile by tile into a tiled BigTIFF
+
+    Works like `draw_entities` on a canvas of the given shape, but only
+    a single tile is held in memory per worker. Each entity is rasterized
+    only into the tiles its bounding box touches.
+
+    Parameters
+    ----------
+    tiffile : str, pathlib.Path
+        Path to the tif file to write to
+    eman : EntityManager
+        EntityManager instance with entities to be drawn
+    color_func : callable
+        `color_func(entity) -> color`, see `draw_entities`
+    shape : tuple
+        Shape `(y, x)` or `(y, x, c)` of the image written
+    dtype : numpy.dtype
+        Datatype of the image written
+    stroke : int
+        Stroke width of drawn segments in pixels
+    tilesize : int
+        Edge length of the square tiles in pixel, must be a multiple of 16
+    workers : int
+        Number of tiles rasterized in parallel
+
+    Note
+    ----
+    Requires the package tifffile
+    """
+    import tifffile
+
+    if tilesize % 16:
+        raise ValueError('tilesize must be a multiple of 16')
+
+    entities = list(eman)
+    store = ContourStore.fromEntities(entities)
+    values = [color_func(ent) for ent in entities]
+
+    bboxes = store.bboxes().astype(np.int64)
+    empty = np.any(bboxes[:, 1] < bboxes[:, 0], axis=1)
+    bboxes[:, 0] -= stroke_margin(stroke)
+    bboxes[:, 1] += stroke_margin(stroke)
+    bboxes[empty] = ((0, 0), (-1, -1))
+
+    height, width = shape[:2]
+    ntiles = (-(-height // tilesize), -(-width // tilesize))
+    bins = _bin_to_tiles(bboxes, tilesize, ntiles)
+    tileShape = (tilesize, tilesize) + tuple(shape[2:])
+
+    def render(tileIndex):
+        trow, tcol = tileIndex
+        tile = np.zeros(tileShape, dtype)
+        indices = bins.get(tileIndex, [])
+        rasterize(tile, (store.contours(idx) for idx in indices),
+                  (values[idx] for idx in indices), stroke=stroke,
+                  offset=(-tcol * tilesize, -trow * tilesize))
+        return tile
+
+    tileIndices = [(trow, tcol) for trow in range(ntiles[0]) \
+                   for tcol in range(ntiles[1])]
+
+    def tiles():
+        if workers <= 1:
+            for tileIndex in tileIndices:
+                yield render(tileIndex)
+            return
+
+        # keep the number of tiles in flight bounded, Executor.map would
+        # submit all of them at once
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for tileIndex in tileIndices:
+                pending.append(pool.submit(render, tileIndex))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    photometric = 'rgb' if len(shape) == 3 and shape[2] == 3 \
+                  else 'minisblack'
+    with tifffile.TiffWriter(str(tiffile), bigtiff=True) as tif:
+        tif.write(tiles(), shape=tuple(shape), dtype=dtype,
+                  tile=(tilesize, tilesize), photometric=photometric)
@@ -0,0 +1,57 @@
+"""Selection of entities kept on the entity side, independent of the
+graphics items representing them.
+
+The selection is a set of objectIds, which remembers the order of
+selection.
+"""
+
+
+class SelectionModel():
+    """Ordered set of selected objectIds
+    """
+
+    def __init__(self):
+        # dict as ordered set, objectId -> None
+        self._order = {}
+
+    def __len__(self):
+        return len(self._order)
+
+    def __iter__(self):
+        """Iterates over the objectIds in the order they were selected
+        """
+        return iter(list(self._order))
+
+    def __contains__(self, objectId):
+        return objectId in self._order
+
+    def select(self, objectIds):
+        """Adds objectIds to the selection, keeps the order of already
+        selected ones
+        """
+        for oid in objectIds:
+            self._order.setdefault(int(oid))
+
+    def deselect(self, objectIds):
+        """Removes objectIds from the selection
+        """
+        for oid in objectIds:
+            self._order.pop(int(oid), None)
+
+    def clear(self):
+        self._order = {}
+
+    def setSelection(self, objectIds):
+        """Replaces the selection. objectIds that were already selected
+        keep their position in the order of selection
+        """
+        objectIds = [int(oid) for oid in objectIds]
+        keep = set(objectIds)
+        retained = [oid for oid in self._order if oid in keep]
+        self.clear()
+        self.select(retained + objectIds)
+
+    def first(self, n):
+        """The n objectIds selected first
+        """
+        return list(self._order)[:max(n, 0)]
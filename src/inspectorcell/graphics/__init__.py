@@ -1,4 +1,5 @@
 from .gfx import GFX
+from .layer import EntityLayer
 from .infobox import InfoBox
 from .crosshair import CrossHair
 from .highlight import HighlightFrame
@@ -136,6 +136,18 @@ class ColorManager():
             tag used to decide for highlighting and color selection.
             If `None`, all tags in entity are tested
         """
+        styles = self.getStyles(entity, tag)
+        entity.GFX.defaultStyle, entity.GFX.selectedStyle = styles
+
+    def getStyles(self, entity, tag=None):
+        """Styles for Entity, see ColorManager.setColor
+
+        Returns
+        -------
+        styles : tuple
+            `(defaultStyle, selectedStyle)` shared by all entities with
+            the same colouring
+        """
         if not tag is None:
             styles = self.styles.get(tag, self.defaults)
         elif entity.tags:
@@ -148,7 +160,7 @@ class ColorManager():
         else:
             styles = self.defaults
 
-        entity.GFX.defaultStyle, entity.GFX.selectedStyle = styles
+        return styles
 
     @property
     def allBrushes(self):
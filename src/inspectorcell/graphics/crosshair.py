@@ -106,6 +106,22 @@ class CrossHair(pg.GraphicsObject):
         brect.moveTo(self.pos().x(), self.pos().y())
         return brect
 
+    def deviceRect(self, scale=(1, 1)):
+        """Rect covered when painted with scale, including the pen and the
+        circle, in the device coordinates the crosshair is painted in
+        """
+        margin = self._pen.widthF() + 1
+        rect = self.boundingRect().adjusted(-margin, -margin, margin, margin)
+        if self._radius > 0:
+            pos = self.pos()
+            center = qc.QPointF(pos.x() + self._width/2,
+                                pos.y() + self._height/2)
+            radx = abs(self._radius * scale[0]) + margin
+            rady = abs(self._radius * scale[1]) + margin
+            rect = rect.united(qc.QRectF(center.x() - radx, center.y() - rady,
+                                         2 * radx, 2 * rady))
+        return rect
+
     def _drawCircle(self, painter, scale):
         pos = self.pos()
         center = qc.QPointF(
@@ -1,3 +1,6 @@
+import numpy as np
+import cv2
+
 import pyqtgraph as pg
 from AnyQt.QtGui import QPolygonF
 from AnyQt.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem as SOGI
@@ -6,61 +9,190 @@ import AnyQt.QtCore as qc
 from ..event import ActiveEntity
 
 
-class PolyMaker(qc.QRunnable):
-    """Buddy of GFX
+def simplifiedContours(contours, tolerance):
+    """Douglas-Peucker simplification of closed contours
+
+    Parameters
+    ----------
+    contours : list of array_like
+        Contours as `(x, y)` points
+    tolerance : float
+        Maximal distance in pixels of the simplified to the original
+        contour. With `0` the contours are returned unchanged
+
+    Returns
+    -------
+    contours : list of ndarray
+        int32 arrays with the shape `(k, 2)`
+    """
+    simplified = []
+    for cnt in contours:
+        # catching the case where there is only a dot
+        cnt = np.asarray(cnt, np.int32).reshape(-1, 1, 2)
+        if tolerance > 0 and len(cnt) > 3:
+            cnt = cv2.approxPolyDP(cnt, tolerance, True)
+        simplified.append(cnt.reshape(-1, 2))
+    return simplified
+
+def arrayToPolygon(points):
+    """Converts points into a QPolygonF
+
+    The polygon is allocated with its final size and its point data is
+    written through the buffer protocol in a single numpy assignment,
+    instead of appending one QPointF after the other.
+
+    Parameters
+    ----------
+    points : array_like
+        `(x, y)` points with the shape `(n, 2)` or `(2,)` for a single dot
+
+    Returns
+    -------
+    polygon : QPolygonF
+        Polygon with n points
+    """
+    points = np.asarray(points, np.float64).reshape(-1, 2)
+    polygon = QPolygonF(len(points))
+    if len(points):
+        # QPointF is two doubles, so the vector is a (n, 2) double array
+        ptr = polygon.data()
+        ptr.setsize(points.nbytes)
+        np.frombuffer(ptr, np.float64).reshape(-1, 2)[:] = points
+    return polygon
+
+def polygonToArray(polygon):
+    """Converts a QPolygonF into an array, reading its point data through
+    the buffer protocol in one copy
+
+    Parameters
+    ----------
+    polygon : QPolygonF
+        Polygon with n points
+
+    Returns
+    -------
+    points : ndarray
+        float64 array with the shape `(n, 2)`, independent of polygon
+    """
+    n_points = len(polygon)
+    if not n_points:
+        return np.empty((0, 2), np.float64)
+    ptr = polygon.data()
+    ptr.setsize(n_points * 2 * np.dtype(np.float64).itemsize)
+    return np.frombuffer(ptr, np.float64).reshape(-1, 2).copy()
+
+def contoursToQPolygons(contours):
+    """One QPolygonF per contour
+    """
+    return [arrayToPolygon(cnt) for cnt in contours]
+
+
+class LodMaker(qc.QRunnable):
+    """Computes the simplified polygons of a batch of GFX off the GUI
+    thread
+
+    Works only on copies of the contours. The results are handed back by
+    emitting `finished`, which is connected to a QObject living in the GUI
+    thread, so they are applied there by a queued connection
     """
 
-    def __init__(self, gfx, factor, pen, brush):
+    def __init__(self, batch, tolerances, finished):
+        """
+        Parameters
+        ----------
+        batch : list of tuple
+            `(gfx, generation, contours)` for each GFX
+        tolerances : list of float
+            Douglas-Peucker tolerances of the levels to compute
+        finished : pyqtBoundSignal
+            Emitted with a list of `(gfx, generation, levels)`
+        """
         super().__init__()
-        self._gfx = gfx
-        self._factor = factor
-
-    # def run(self):
-    #     polygons = []
-    #     for entityPoly in self._gfx.entity.path.toSubpathPolygons():
-    #         cachePoly = QPolygonF()
-    #         for i, point in enumerate(entityPoly):
-    #             if i % self._factor == 0:
-    #                 cachePoly << point
-    #         polygons.append(cachePoly)
-
-    #     self._gfx._cache[self._factor] = polygons
-
-    def _getPolygons(self):
-        polygons = []
-        for entityPoly in self._gfx.entity.path.toSubpathPolygons():
-            cachePoly = QPolygonF()
-            for i, point in enumerate(entityPoly):
-                if i % self._factor == 0:
-                    cachePoly << point
-            polygons.append(cachePoly)
-
-        return polygons
+        self._batch = batch
+        self._tolerances = tolerances
+        self._finished = finished
 
     def run(self):
-        # pixmap should be fastest
-        # rect = self._gfx.boundingRect()
-        # width, height = rect.width(), rect.height()
-        # prerender = QPixmap(width, height)
+        results = []
+        for gfx, generation, contours in self._batch:
+            levels = [contoursToQPolygons(simplifiedContours(contours, tol)) \
+                      for tol in self._tolerances]
+            results.append((gfx, generation, levels))
+        self._finished.emit(results)
 
-        # Picture gives little advantage
-        # prerender = QPicture()
-        # painter = QPainter()
 
-        # painter.begin(prerender)
-        # painter.setBrush(self._brush)
-        # painter.setPen(self._pen)
-        # for poly in self._getPolygons():
-        #     painter.drawPolygon(poly)
-        # painter.end()
+class LodScheduler(qc.QObject):
+    """Collects LOD requests of GFX items and computes them batched in the
+    global thread pool
+    """
 
-        self._gfx._cache[self._factor] = self._getPolygons()
+    finished = qc.pyqtSignal(object)
+
+    def __init__(self, batchSize=256, parent=None):
+        super().__init__(parent)
+        self.batchSize = batchSize
+        self._pending = {}
+
+        # flush once control returns to the event loop, so all GFX changed
+        # in one go end up in the same batches
+        self._timer = qc.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._flush)
+        self.finished.connect(self._apply)
+
+    def request(self, gfx):
+        self._pending[id(gfx)] = gfx
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _flush(self):
+        pending = list(self._pending.values())
+        self._pending.clear()
+
+        pool = qc.QThreadPool.globalInstance()
+        for start in range(0, len(pending), self.batchSize):
+            batch = []
+            for gfx in pending[start:start + self.batchSize]:
+                contours = [np.array(cnt) for cnt in gfx.entity.contours]
+                batch.append((gfx, gfx.lodGeneration, contours))
+            tolerances = [tol for _, tol in GFX.lodTolerances[1:]]
+            pool.start(LodMaker(batch, tolerances, self.finished))
+
+    def _apply(self, results):
+        for gfx, generation, levels in results:
+            try:
+                gfx.setLodLevels(generation, levels)
+            except RuntimeError:
+                # the item was deleted meanwhile
+                pass
+
+
+_scheduler = None
+
+def lodScheduler():
+    """The LodScheduler shared by all GFX
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LodScheduler()
+    return _scheduler
 
 
 class GFX(pg.GraphicsObject):
     """A graphic object, which is defined by path
     """
 
+    # (min. level of detail, Douglas-Peucker tolerance in pixels), the
+    # tolerance times the upper bound of the lod range stays below half a
+    # pixel on screen. Below the last level a box or point is drawn
+    lodTolerances = (
+        (0.5, 0.),
+        (0.25, 1.),
+        (0.1, 2.),
+        (0.05, 4.),
+    )
+
     def __init__(self, entity, defaultStyle=None, selectedStyle=None):
         """Graphical representation in the scene for the Qt backend
 
@@ -96,15 +228,11 @@ class GFX(pg.GraphicsObject):
 
         self._boundingRect = None
 
-        # caching the shape, get invalidated after updates to be redrawn
-        self._cache = {}
-        # list to preserve ordering
-        self._polyQuality = [
-            # min. LOD: PointFactor
-            (0.5, 1),
-            (0.3, 8),
-            (0.05, 15),
-        ]
+        # polygons per level of lodTolerances, None while pending
+        self._lodLevels = None
+        self._lodRequested = False
+        self.lodGeneration = 0
+        self.invalidateLod()
 
     def boundingRect(self):
         if self._boundingRect is None:
@@ -121,60 +249,107 @@ class GFX(pg.GraphicsObject):
     def shape(self):
         return self.entity.path
 
+    def itemChange(self, change, value):
+        ret = super().itemChange(change, value)
+        if change == QGraphicsItem.ItemSelectedHasChanged:
+            # keeps the SelectionModel of the scene up to date per item
+            notify = getattr(self.scene(), 'gfxSelectionChanged', None)
+            if not notify is None:
+                notify(self, bool(value))
+        return ret
+
+    def updateGeometry(self):
+        """Updates the item inplace after the contour of the entity changed
+
+        The scene is notified about the new bounding rect. The item, its
+        selection state and its styles are kept
+        """
+        self.prepareGeometryChange()
+        self._boundingRect = None
+        self.invalidateLod()
+
+    def invalidateLod(self):
+        """Drops all levels of detail, after the contour of the entity
+        changed. The simplified levels are recomputed off the GUI thread
+        """
+        self.lodGeneration += 1
+        self._lodLevels = [None] * len(self.lodTolerances)
+        self._lodRequested = False
+        self._requestLod()
+        self.update()
+
+    def _requestLod(self):
+        """Schedules the computation of the simplified levels. Without an
+        application, e.g. in scripts, nothing would ever process the
+        requests, so they are made on the first paint instead
+        """
+        if qc.QCoreApplication.instance() is None:
+            return
+        self._lodRequested = True
+        lodScheduler().request(self)
+
+    def setLodLevels(self, generation, levels):
+        """Sets the simplified levels computed by LodMaker
+
+        Parameters
+        ----------
+        generation : int
+            `lodGeneration` the levels were computed for. Outdated levels
+            are dropped
+        levels : list
+            Polygons for each but the first level in `lodTolerances`
+        """
+        if generation != self.lodGeneration:
+            return
+        self._lodLevels[1:] = levels
+        self.update()
+
+    def _polygonsForLod(self, lod):
+        """Polygons of the coarsest level fine enough for lod or None, if
+        even the coarsest level is too detailed
+        """
+        for index, (minLod, _) in enumerate(self.lodTolerances):
+            if lod >= minLod:
+                break
+        else:
+            return None
+
+        # while simplification is pending, the next finer level is used
+        for level in range(index, 0, -1):
+            polygons = self._lodLevels[level]
+            if not polygons is None:
+                return polygons
+
+        if self._lodLevels[0] is None:
+            self._lodLevels[0] = self.entity.polygons
+        return self._lodLevels[0]
+
     def paint(self, painter, *args):
 
-        #TODO improve me. Only set pen when other than
-        # the pen found in painter. or just set change the
-        # color of the pen and set the golbal pens in channel
         if self.isSelected():
-            pen = self.selectedStyle.pen
-            brush = self.selectedStyle.brush
+            style = self.selectedStyle
         else:
-            pen = self.defaultStyle.pen
-            brush = self.defaultStyle.brush
-        
-        #TODO look if needed, otherwise remove caching pictures
-        # if self._cacheHI is None:
-        #     print('Caching HI')
-        #     self._cacheHI = QPicture()
-        #     painter.save()
-        #     # painter.begin(self._cacheHI)
-        #     for poly in self.entity.path.toSubpathPolygons():
-        #         painter.drawPolygon(poly)
-        #     # painter.end()
-        #     painter.restore()
-
-        # # painter.drawPicture(0, 0, self._cacheHI)
-        # self._cacheHI.play(painter)
-
-        #TODO calculate globally
+            style = self.defaultStyle
+
+        painter.setPen(style.pen)
+        painter.setBrush(style.brush)
+
+        if not self._lodRequested:
+            self._requestLod()
+
         lod = SOGI.levelOfDetailFromTransform(painter.worldTransform())
-        # lod = 100
-        for minLod, factor in self._polyQuality:
-            if lod >= minLod: # draw the full thing
-                cached_polygons = self._cache.get(factor, None)
-
-                if cached_polygons is None:
-                    runable = PolyMaker(self, factor, pen, brush)
-                    thr = qc.QThreadPool.globalInstance()
-                    thr.start(runable)
-                    polygons = self.entity.path.toSubpathPolygons()
-                else:
-                    polygons = cached_polygons
-
-                # if cached is None:
-                painter.setPen(pen)
-                painter.setBrush(brush)
-
-                for poly in polygons:
-                    painter.drawPolygon(poly)
-                # else:
-                #     # painter.drawPixmap(
-                #     #     self.boundingRect(), cached, qc.QRectF(cached.rect()))
-                #     painter.drawPicture(0, 0, cached)
-
-                # as soon as the correct detail was found stop
-                break
+        polygons = self._polygonsForLod(lod)
+        if polygons is None:
+            # too small for any outline, fall back to the box or a point
+            rect = self.boundingRect()
+            if max(rect.width(), rect.height()) * lod < 2:
+                painter.drawPoint(rect.center())
+            else:
+                painter.drawRect(rect)
+            return
+
+        for poly in polygons:
+            painter.drawPolygon(poly)
 
     def hoverEnterEvent(self, event):
         # import IPython as ip
@@ -186,10 +361,6 @@ class GFX(pg.GraphicsObject):
         activation = ActiveEntity(self.entity, False)
         qc.QCoreApplication.postEvent(self.parent(), activation)
 
-    def update(self, *args, **kwargs):
-        self._cache = {}
-        super().update(*args, **kwargs)
-
 def convertToInt(rect):
     x, y, w, h = rect
     w = int(w)
@@ -66,6 +66,13 @@ class InfoBox(pg.GraphicsObject):
     def boundingRect(self):
         return self._canvas
 
+    def deviceRect(self):
+        """Rect covered by background and text, in the device coordinates
+        the infobox is painted in
+        """
+        text = self._content.boundingRect().translated(self.pos())
+        return self._canvas.united(text)
+
     def paint(self, painter, rect):
         painter.setBrush(self._bgbrush)
         painter.drawRect(self._canvas)
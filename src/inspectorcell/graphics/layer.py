@@ -0,0 +1,376 @@
+"""Single graphics item drawing all entities of a scene
+"""
+import pyqtgraph as pg
+from AnyQt.QtGui import QPainterPath
+from AnyQt.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem as SOGI
+import AnyQt.QtCore as qc
+
+from ..event import ActiveEntity
+
+
+class EntityLayer(pg.GraphicsObject):
+    """Alternative to one GFX per entity. Draws all visible entities in
+    a single paint call, grouped by style, and does its own culling and
+    picking on a regular grid
+
+    Each entity is drawn from the grid cell its boundingbox starts in.
+    Per cell and style one QPainterPath of all entities is cached, so a
+    repaint is one `drawPath` per cell and style. Styles are shared and
+    only referenced, so changing their pens or brushes, e.g. the opacity,
+    only needs a repaint
+    """
+
+    # entities selected, entities deselected
+    sigSelectionChanged = qc.pyqtSignal(object, object)
+
+    def __init__(self, cellSize=512, margin=2):
+        """
+        Parameters
+        ----------
+        cellSize : int
+            Edge length in scene units of the grid cells used for culling
+            and picking
+
+        margin : float
+            Added to each entity boundingbox to account for pen widths
+        """
+        super().__init__()
+
+        self.setFlag(QGraphicsItem.ItemIsFocusable, True)
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)
+        self.setAcceptHoverEvents(True)
+
+        self._cellSize = cellSize
+        self._margin = margin
+
+        # all keyed by entity eid
+        self._entities = {}
+        self._styles = {}
+        self._polygons = {}
+        self._rects = {}
+
+        # grid cell (col, row) -> set of eids touching the cell
+        self._grid = {}
+        self._bounds = qc.QRectF()
+
+        # drawing: eid -> cell drawn from, cell -> eids drawn from it,
+        # cell -> extent of these eids, cell -> cached batches
+        self._drawCell = {}
+        self._cellMembers = {}
+        self._cellBounds = {}
+        self._batches = {}
+
+        self.selected = set()
+        self.hidden = set()
+        self._hovered = None
+
+        # below this level of detail only boundingboxes are drawn
+        self.minPolygonLod = 0.05
+
+    def __len__(self):
+        return len(self._entities)
+
+    def __contains__(self, entity):
+        return entity.eid in self._entities
+
+    def boundingRect(self):
+        return self._bounds
+
+    def _cells(self, rect):
+        """Grid cells covered by rect
+        """
+        size = self._cellSize
+        col0, col1 = int(rect.left() // size), int(rect.right() // size)
+        row0, row1 = int(rect.top() // size), int(rect.bottom() // size)
+        return ((col, row) for col in range(col0, col1 + 1) \
+                for row in range(row0, row1 + 1))
+
+    def entitiesIn(self, rect):
+        """Eids of all entities whose boundingbox intersects rect
+        """
+        found = set()
+        for cell in self._cells(rect):
+            found.update(self._grid.get(cell, ()))
+        return [eid for eid in found if self._rects[eid].intersects(rect)]
+
+    def addEntity(self, entity, styles):
+        """Adds or replaces an entity
+
+        Parameters
+        ----------
+        entity : Entity
+            Entity to draw, its polygons and boundingbox are read once
+
+        styles : tuple
+            `(defaultStyle, selectedStyle)` as handed out by ColorManager
+        """
+        if entity.eid in self._entities:
+            self.removeEntity(entity, keepSelection=True)
+
+        eid = entity.eid
+        rect = entity.boundingbox.adjusted(
+            -self._margin, -self._margin, self._margin, self._margin)
+
+        self._entities[eid] = entity
+        self._styles[eid] = styles
+        self._polygons[eid] = entity.polygons
+        self._rects[eid] = rect
+        for cell in self._cells(rect):
+            self._grid.setdefault(cell, set()).add(eid)
+
+        cell = (int(rect.left() // self._cellSize),
+                int(rect.top() // self._cellSize))
+        self._drawCell[eid] = cell
+        self._cellMembers.setdefault(cell, set()).add(eid)
+        self._cellBounds[cell] = self._cellBounds.get(
+            cell, qc.QRectF()).united(rect)
+        self._batches.pop(cell, None)
+
+        if not self._bounds.contains(rect):
+            self.prepareGeometryChange()
+            self._bounds = self._bounds.united(rect)
+        self.update(rect)
+
+    def removeEntity(self, entity, keepSelection=False):
+        """Removes entity, if it is in the layer
+        """
+        eid = entity.eid
+        if not eid in self._entities:
+            return
+        rect = self._rects.pop(eid)
+        for cell in self._cells(rect):
+            self._grid.get(cell, set()).discard(eid)
+        del self._entities[eid]
+        del self._styles[eid]
+        del self._polygons[eid]
+
+        cell = self._drawCell.pop(eid)
+        members = self._cellMembers[cell]
+        members.discard(eid)
+        if members:
+            bounds = qc.QRectF()
+            for member in members:
+                bounds = bounds.united(self._rects[member])
+            self._cellBounds[cell] = bounds
+        else:
+            del self._cellMembers[cell]
+            del self._cellBounds[cell]
+        self._batches.pop(cell, None)
+
+        # only an entity on the border can shrink the bounds
+        border = self._bounds
+        if rect.left() <= border.left() or rect.top() <= border.top() or \
+                rect.right() >= border.right() or \
+                rect.bottom() >= border.bottom():
+            bounds = qc.QRectF()
+            for cellBounds in self._cellBounds.values():
+                bounds = bounds.united(cellBounds)
+            self.prepareGeometryChange()
+            self._bounds = bounds
+        if not keepSelection:
+            self.hidden.discard(eid)
+            if eid in self.selected:
+                self.selected.discard(eid)
+                self.sigSelectionChanged.emit([], [entity])
+        if self._hovered is entity:
+            self._hovered = None
+        self.update(rect)
+
+    def clear(self):
+        deselected = self.selectedEntities()
+        self.prepareGeometryChange()
+        self._entities.clear()
+        self._styles.clear()
+        self._polygons.clear()
+        self._rects.clear()
+        self._grid.clear()
+        self._drawCell.clear()
+        self._cellMembers.clear()
+        self._cellBounds.clear()
+        self._batches.clear()
+        self.selected.clear()
+        self.hidden.clear()
+        self._hovered = None
+        self._bounds = qc.QRectF()
+        if deselected:
+            self.sigSelectionChanged.emit([], deselected)
+
+    def setStyles(self, entity, styles):
+        """Sets `(defaultStyle, selectedStyle)` of an entity
+        """
+        if not entity.eid in self._entities:
+            return
+        self._styles[entity.eid] = styles
+        self._invalidate([entity.eid])
+        self.update(self._rects[entity.eid])
+
+    def _invalidate(self, eids):
+        """Drops the cached batches of the cells eids are drawn from
+        """
+        for eid in eids:
+            cell = self._drawCell.get(eid)
+            if not cell is None:
+                self._batches.pop(cell, None)
+
+    def selectedEntities(self):
+        return [self._entities[eid] for eid in self.selected \
+                if eid in self._entities]
+
+    def setSelected(self, entities, selected=True):
+        """Adds entities to or removes them from the selection
+        """
+        eids = set(ent.eid for ent in entities)
+        if selected:
+            eids = (eids & set(self._entities)) | self.selected
+        else:
+            eids = self.selected - eids
+        self._setSelection(eids)
+
+    def _setSelection(self, eids):
+        eids = set(eids)
+        added = eids - self.selected
+        removed = self.selected - eids
+        if not added and not removed:
+            return
+        self.selected = eids
+        self._invalidate(added | removed)
+        self.update()
+        self.sigSelectionChanged.emit(
+            [self._entities[eid] for eid in added],
+            [self._entities[eid] for eid in removed if eid in self._entities])
+
+    def clearSelection(self):
+        if self.selected:
+            self._setSelection(())
+
+    def selectArea(self, path):
+        """Selects all entities intersecting the QPainterPath path,
+        replacing the current selection
+        """
+        self._setSelection(
+            eid for eid in self.entitiesIn(path.boundingRect()) \
+            if not eid in self.hidden and path.intersects(self._rects[eid]))
+
+    def hideSelected(self):
+        """Hides and deselects all selected entities
+        """
+        self.hidden.update(self.selected)
+        self._setSelection(())
+
+    def showAll(self):
+        """Shows all hidden entities again
+        """
+        self._invalidate(self.hidden)
+        self.hidden.clear()
+        self.update()
+
+    def entityAt(self, pos):
+        """Topmost visible entity containing the scene point pos or None
+        """
+        cell = (int(pos.x() // self._cellSize),
+                int(pos.y() // self._cellSize))
+        hit = None
+        for eid in self._grid.get(cell, ()):
+            if eid in self.hidden or not self._rects[eid].contains(pos):
+                continue
+            # even-odd over all contours, a point in a hole is outside
+            inside = sum(poly.containsPoint(pos, qc.Qt.OddEvenFill) \
+                         for poly in self._polygons[eid])
+            if inside % 2:
+                hit = self._entities[eid]
+        return hit
+
+    def _batchesFor(self, cell):
+        """Cached `(selected, style, path, rects)` for all visible
+        entities drawn from cell, one entry per style
+        """
+        batches = self._batches.get(cell)
+        if not batches is None:
+            return batches
+
+        groups = {}
+        for eid in self._cellMembers.get(cell, ()):
+            if eid in self.hidden:
+                continue
+            selected = eid in self.selected
+            style = self._styles[eid][1 if selected else 0]
+            group = groups.get((selected, style))
+            if group is None:
+                group = groups[(selected, style)] = []
+            group.append(eid)
+
+        batches = []
+        for (selected, style), eids in groups.items():
+            path = QPainterPath()
+            path.setFillRule(qc.Qt.WindingFill)
+            for eid in eids:
+                for poly in self._polygons[eid]:
+                    path.addPolygon(poly)
+                    path.closeSubpath()
+            rects = [self._rects[eid] for eid in eids]
+            batches.append((selected, style, path, rects))
+
+        self._batches[cell] = batches
+        return batches
+
+    def paint(self, painter, option, widget=None):
+        exposed = option.exposedRect
+        lod = SOGI.levelOfDetailFromTransform(painter.worldTransform())
+        drawPolygons = lod >= self.minPolygonLod
+
+        batches = []
+        for cell, bounds in self._cellBounds.items():
+            if bounds.intersects(exposed):
+                batches.extend(self._batchesFor(cell))
+
+        # selected entities are drawn last, so they stay on top. Sorting by
+        # style sets each pen and brush once
+        batches.sort(key=lambda batch: (batch[0], id(batch[1])))
+
+        style = None
+        for selected, batchStyle, path, rects in batches:
+            if not batchStyle is style:
+                style = batchStyle
+                painter.setPen(style.pen)
+                painter.setBrush(style.brush)
+            if drawPolygons:
+                painter.drawPath(path)
+            else:
+                painter.drawRects(rects)
+
+    def _setHovered(self, entity):
+        if entity is self._hovered:
+            return
+        if not self._hovered is None:
+            qc.QCoreApplication.postEvent(
+                self.parent(), ActiveEntity(self._hovered, False))
+        self._hovered = entity
+        if not entity is None:
+            activation = ActiveEntity(entity, True,
+                                      rect=self._rects[entity.eid])
+            qc.QCoreApplication.postEvent(self.parent(), activation)
+
+    def hoverMoveEvent(self, event):
+        self._setHovered(self.entityAt(event.pos()))
+
+    def hoverLeaveEvent(self, event):
+        self._setHovered(None)
+
+    def mousePressEvent(self, event):
+        if event.button() != qc.Qt.LeftButton:
+            event.ignore()
+            return
+
+        entity = self.entityAt(event.pos())
+        if entity is None:
+            if not event.modifiers() & qc.Qt.ControlModifier:
+                self.clearSelection()
+            event.ignore()
+            return
+
+        if event.modifiers() & qc.Qt.ControlModifier:
+            self._setSelection(self.selected.symmetric_difference(
+                [entity.eid]))
+        else:
+            self._setSelection([entity.eid])
+        event.accept()
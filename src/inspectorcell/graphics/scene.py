@@ -1,5 +1,6 @@
 # built-ins
 # import warnings
+from contextlib import contextmanager
 
 # GUI stuff
 import pyqtgraph as pg
@@ -10,18 +11,15 @@ from PyQt5.QtGui import QPainterPath
 import numpy as np
 
 from ..event import ScalarAssignmentChanged, EntityChangedEvent
+from .stroke import applyStroke, StrokePreview
+from ..util.raster import merge_contours
+from ..entities.selection import SelectionModel
 
 RADIUS_MAX = 100
 RADIUS_MIN = 1
 RADIUS_DEFAULT = 10
 RADIUS_CHANGE = 1
 
-def merge2Paths(pathA, pathB):
-    if pathA.intersects(pathB):
-        pathA.setFillRule(Qt.WindingFill)
-        return pathA.united(pathB).simplified()
-    return None
-
 def mapContur(contours, mapping):
     newConts = []
     for cont in contours:
@@ -35,39 +33,6 @@ def mapContur(contours, mapping):
         newConts.append(np.array(cur_cont).astype(int))
     return newConts
 
-def merge2Entities(entA, entB):
-    pathA = entA.path
-    pathB = entB.path
-    newPath = merge2Paths(pathA, pathB)
-    if not newPath is None:
-        return newPath
-    return None
-
-def alignedMerge(selectedItems):
-    mergedItems = set()
-    pairwieseMergedPathes = []
-
-    for i, itemA in enumerate(selectedItems, 0):
-        for j, itemB in enumerate(selectedItems, 1):
-            # print('intersect', 
-            #        itemA.entity.path.intersects(itemB.entity.path))
-            newPath = merge2Entities(itemA.entity,
-                                     itemB.entity)
-            if newPath is not None:
-                mergedItems.add(itemA)
-                mergedItems.add(itemB)
-                pairwieseMergedPathes.append(newPath)
-
-    # reducing merged paths
-    newPath = pairwieseMergedPathes[0]
-    for i in range(1, len(pairwieseMergedPathes)):
-        newPath = merge2Paths(newPath, pairwieseMergedPathes[i])
-
-        if newPath is None:
-            return None, set([])
-
-    return newPath, mergedItems
-
 
 class ViewContextScene(pg.GraphicsScene):
 
@@ -84,8 +49,104 @@ class ViewContextScene(pg.GraphicsScene):
         # 'E'rasing mode
         self.mode = 'N'
         self.mouseDrawingPath = []
+        self.strokePreview = None
+        # max. distance in pixels of entities still merged
+        self.mergeGap = 0
         self.isDisabledScene = isDisabled
         self.entityManager = entityManager
+        self.entityLayer = None
+
+        # selection by objectId of the selected GFX and the entities
+        # selected in the EntityLayer, updated per change
+        self.selection = SelectionModel()
+        self._trackSelection = True
+        self._hiddenItems = set()
+
+    def gfxSelectionChanged(self, gfx, selected):
+        """Called by a GFX of this scene after it was (de)selected
+        """
+        if not self._trackSelection:
+            return
+        if selected:
+            self.selection.select([gfx.entity.objectId])
+        else:
+            self.selection.deselect([gfx.entity.objectId])
+
+    def _layerSelectionChanged(self, selected, deselected):
+        self.selection.deselect(ent.objectId for ent in deselected)
+        self.selection.select(ent.objectId for ent in selected)
+
+    def _selectedInModel(self):
+        """Selected entities in order of selection
+        """
+        entities = self.entityManager.lookupEntities(self.selection)
+        return [ent for ent in entities if not ent is None]
+
+    def selectedGFX(self):
+        """GFX of the selected entities, in order of selection
+        """
+        if self.entityManager is None:
+            return [item for item in self.selectedItems() \
+                    if hasattr(item, 'entity')]
+        return [ent.GFX for ent in self._selectedInModel() \
+                if not ent.GFX is None and ent.GFX.scene() is self]
+
+    @contextmanager
+    def bulkUpdate(self):
+        """Changes many items with a single repaint at the end
+
+        Selection changes of single items are not tracked meanwhile, the
+        SelectionModel has to be updated by the caller
+        """
+        views = self.views()
+        self._trackSelection = False
+        for view in views:
+            view.setUpdatesEnabled(False)
+        try:
+            yield
+        finally:
+            self._trackSelection = True
+            for view in views:
+                view.setUpdatesEnabled(True)
+            self.update()
+
+    def setEntityLayer(self, layer):
+        """Uses an EntityLayer to draw all entities instead of one GFX
+        per entity
+        """
+        layer.setParent(self.parent())
+        self.addItem(layer)
+        self.entityLayer = layer
+        layer.sigSelectionChanged.connect(self._layerSelectionChanged)
+
+    def selectedEntities(self):
+        """All selected entities, regardless of how they are drawn, in
+        order of selection
+        """
+        if not self.entityManager is None:
+            return self._selectedInModel()
+        selected = [item.entity for item in self.selectedGFX()]
+        if not self.entityLayer is None:
+            selected.extend(self.entityLayer.selectedEntities())
+        return selected
+
+    def _inLayer(self, entity):
+        """Whether the EntityLayer draws entity, instead of a GFX
+        """
+        return not self.entityLayer is None and entity in self.entityLayer
+
+    def _editedEntity(self):
+        """The entity edited by strokes, if exactly one is selected
+        """
+        selected = self.selectedEntities()
+        if len(selected) != 1:
+            return None
+        return selected[0]
+
+    def setSelectionArea(self, path, *args, **kwargs):
+        super().setSelectionArea(path, *args, **kwargs)
+        if not self.entityLayer is None:
+            self.entityLayer.selectArea(path)
 
     def mouseDoubleClickEvent(self, event):
         if self.isDisabledScene:
@@ -105,8 +166,13 @@ class ViewContextScene(pg.GraphicsScene):
     def mouseMoveEvent(self, event):
         """ remember mouse movement path only if one object is selected and we are in a drawing mode
         """
-        if self.mode in 'DE' and len(self.selectedItems()) == 1:
+        if self.mode in 'DE' and not self._editedEntity() is None:
             self.mouseDrawingPath.append(event.scenePos())
+            if self.strokePreview is None:
+                self.strokePreview = StrokePreview(self.drawingRadius,
+                                                   erase=self.mode == 'E')
+                self.addItem(self.strokePreview)
+            self.strokePreview.addPoint(event.scenePos())
         else:
             itemUnderMouse = self.itemAt(event.scenePos().x(), event.scenePos().y(), self.views()[0].transform())
             # if itemUnderMouse is not None:
@@ -124,8 +190,12 @@ class ViewContextScene(pg.GraphicsScene):
     def mouseReleaseEvent(self, event):
         """ if we are in a drawing mode and selected one object draw or eraise
         """
+        self._removeStrokePreview()
+
+        entity = None if self.mode == 'N' else self._editedEntity()
+
         #TODO this function deselects
-        if len(self.selectedItems()) != 1 or self.mode == 'N':
+        if entity is None:
             self.mouseDrawingPath = []
             event.ignore()
             #FIXME Fishi part that somehow introduces bug for
@@ -136,52 +206,44 @@ class ViewContextScene(pg.GraphicsScene):
                 super().mouseReleaseEvent(event)
                 return
 
-        item = self.selectedItems()[0]
-
         # handles the case when instantly clicked on segment
         if len(self.mouseDrawingPath) == 0:
             self.mouseDrawingPath.append(event.scenePos())
 
-        extendedPath = QPainterPath()
-        for p in self.mouseDrawingPath:
-            extendedPath.addEllipse(
-                QPointF(p), self.drawingRadius, self.drawingRadius)
-
-        extendedPath.setFillRule(Qt.WindingFill)
-        entityPath = item.entity.path
-        if self._intersect(entityPath, extendedPath):
-            # They intersect, lets erase what is there!
-            if self.mode == 'E':
-                item.entity.path = item.entity.path.subtracted(extendedPath)
-            # only draw mode left. Do it if not fully contained
-            elif not self._contained(entityPath, extendedPath):
-                item.entity.path = item.entity.path.united(extendedPath)
-
-            item.entity.path = item.entity.path.simplified()
-            self.removeItem(item)
-            qc.QCoreApplication.postEvent(
-                self.parent(), EntityChangedEvent(item.entity))
-        
-        event.accept()
+        # the GFX follows the new contour inplace, see GFX.updateGeometry,
+        # entities drawn by the layer are added to it again
+        points = [(pos.x(), pos.y()) for pos in self.mouseDrawingPath]
+        changed = applyStroke(entity, points, self.drawingRadius,
+                              erase=self.mode == 'E')
+        if changed and self._inLayer(entity):
+            qc.QCoreApplication.postEvent(self.parent(),
+                EntityChangedEvent(entity))
+        self.mouseDrawingPath = []
 
-    def _intersect(self, path0, path1):
-        return path0.intersects(path1)
+        event.accept()
 
-    def _contained(self, path0, path1):
-        return path1.subtracted(path0.intersected(path1)).isEmpty()
+    def _removeStrokePreview(self):
+        if not self.strokePreview is None:
+            self.removeItem(self.strokePreview)
+            self.strokePreview = None
 
     def deselectFirstNSelectedObjects(self, n):
-
-        numberOfSelectedObjects = len(self.selectedItems())
-        numberOfLeavedObjects = numberOfSelectedObjects - n
-
-        if numberOfLeavedObjects < 0:
-            # de-select all objects
-            numberOfLeavedObjects = 0
-
-        while len(self.selectedItems()) > numberOfLeavedObjects:
-            self.selectedItems()[0].setSelected(False)
-            self.selectedItems()[0].update()
+        """Deselects the n entities selected first
+        """
+        objectIds = self.selection.first(n)
+        entities = self.entityManager.lookupEntities(objectIds)
+        inLayer = []
+        with self.bulkUpdate():
+            for entity in entities:
+                if entity is None:
+                    continue
+                if self._inLayer(entity):
+                    inLayer.append(entity)
+                elif not entity.GFX is None:
+                    entity.GFX.setSelected(False)
+            self.selection.deselect(objectIds)
+        if inLayer:
+            self.entityLayer.setSelected(inLayer, False)
 
     def keyPressEvent(self, event):
         if event.key() == qc.Qt.Key_M:
@@ -224,8 +286,8 @@ class ViewContextScene(pg.GraphicsScene):
             self.mode = 'D'
             self.mouseDrawingPath = []
             # if drawing mode is on, the only one object can to be selected. Leave only last selected object
-            if mode and len(self.selectedItems()) > 1:
-                self.deselectFirstNSelectedObjects(len(self.selectedItems()) - 1)
+            if mode and len(self.selection) > 1:
+                self.deselectFirstNSelectedObjects(len(self.selection) - 1)
         elif mode == 'E':
             self.mode = 'E'
         else:
@@ -264,41 +326,44 @@ class ViewContextScene(pg.GraphicsScene):
         """
         Remove all selected items
         """
-        for item in self.selectedItems():
-            item.entity.removeGFX()
-            # send signal to orange
-            #self.gfxDeleted.emit(item.entity.eid)
-            self.removeItem(item)
-
-        self.update()
+        items = self.selectedGFX()
+        with self.bulkUpdate():
+            for item in items:
+                item.entity.removeGFX()
+                # send signal to orange
+                #self.gfxDeleted.emit(item.entity.eid)
+                self.removeItem(item)
+                self._hiddenItems.discard(item)
+            self.selection.clear()
+
+        if not self.entityLayer is None:
+            for entity in self.entityLayer.selectedEntities():
+                entity.removeGFX()
+                self.entityLayer.removeEntity(entity)
 
     def changeVisible(self, visible=False):
-        """ Change visibility of selected entities. If None are selected
-        show all entities
+        """ Change visibility of entities. Hides the selected entities
+        or shows all hidden entities again
         """
-        selectedItems = self.selectedItems()
-
-        # # if there is a selection, set visible False
-        # if selectedItems:
-        #     visible = False
-        # # select all cells and they shoudl be visible again
-        # else:
-        #     selectedItems = self.items()
-        #     visible = True
-
-        # make the changes
-        if not visible:
-            for item in selectedItems:
-                item.setVisible(visible)
-        elif visible:
-            selectedItems = self.items()
-            for item in selectedItems:
-                item.setVisible(visible)
-
-        # make the changes
-        for item in selectedItems:
-            item.setVisible(visible)
-            return
+        layer = self.entityLayer
+        if not layer is None:
+            if not visible:
+                layer.hideSelected()
+            else:
+                layer.showAll()
+
+        with self.bulkUpdate():
+            if not visible:
+                items = self.selectedGFX()
+                for item in items:
+                    item.setSelected(False)
+                    item.setVisible(False)
+                self._hiddenItems.update(items)
+                self.selection.clear()
+            else:
+                for item in self._hiddenItems:
+                    item.setVisible(True)
+                self._hiddenItems.clear()
 
     def merge(self):
         #TODO shoudl happen in entity manager
@@ -309,19 +374,19 @@ class ViewContextScene(pg.GraphicsScene):
             In the 1st use-case we use union of contours
             In the 2nd use-case we not allow merging
         """
-        selectedItems = self.selectedItems()
-        selectedEids = [itm.entity.eid for itm in selectedItems]
+        mergedEntities = self.selectedEntities()
 
         # do nothing, as on item can not be merged with itself
-        if len(selectedItems) < 2:
+        if len(mergedEntities) < 2:
             return
 
-        newPath, mergedItems = alignedMerge(selectedItems)
-        if newPath is None:
+        mergedContours = merge_contours(
+            [ent.contours for ent in mergedEntities], gap=self.mergeGap)
+        if mergedContours is None:
             return
 
         newEntity = self.entityManager.make_entity()
-        newEntity.from_polygons(newPath.toFillPolygons())
+        newEntity.from_contours(mergedContours)
         parents = newEntity.generic['parents'] = []
 
         mergedScalars = {}
@@ -329,9 +394,9 @@ class ViewContextScene(pg.GraphicsScene):
         scalarValueContributions = {}
         #TODO handle ancestors
         # merged_ancestors = set([])
-        for item in mergedItems:
+        for entity in mergedEntities:
             # process scalars
-            for sig, val in item.entity.scalars.items():
+            for sig, val in entity.scalars.items():
                 cont = scalarValueContributions.get(sig, 0)
                 scalarValueContributions[sig] = cont + 1
 
@@ -342,15 +407,21 @@ class ViewContextScene(pg.GraphicsScene):
                 mergedScalars[sig] /= count
 
             # process tags
-            mergedTags.update(item.entity.tags)
+            mergedTags.update(entity.tags)
 
-            # remove the GFX
-            item.entity.removeGFX()
-            parents.append(item.entity.eid.hex)
+            # remove the GFX or the entity from the layer
+            gfx = entity.GFX
+            entity.removeGFX()
+            parents.append(entity.eid.hex)
 
             # send signal to orange
-            #self.gfxDeleted.emit(item.entity.eid)
-            self.removeItem(item)
+            #self.gfxDeleted.emit(entity.eid)
+            if self._inLayer(entity):
+                self.entityLayer.removeEntity(entity)
+            elif not gfx is None and gfx.scene() is self:
+                self.removeItem(gfx)
+                self._hiddenItems.discard(gfx)
+        self.selection.deselect(ent.objectId for ent in mergedEntities)
 
         # send signal to orange
         #self.gfxAdded.emit(newGFX)
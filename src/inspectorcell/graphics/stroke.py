@@ -0,0 +1,184 @@
+"""Brush strokes for drawing and erasing entities
+
+A stroke is the brush swept along the recorded mouse positions. It is
+rasterized into a bitmask in the frame of the edited entity, combined with
+the entity mask and the contour is extracted once. The cost depends on the
+size of that frame, not on the number of recorded positions.
+"""
+import numpy as np
+import cv2
+
+import pyqtgraph as pg
+from AnyQt.QtGui import QColor, QPen, QPolygonF
+import AnyQt.QtCore as qc
+
+from ..util.raster import local_mask, mask_contours
+
+
+def strokeBBox(points, radius):
+    """Bounding box `((xmin, ymin), (xmax, ymax))` of the stroke
+    """
+    points = np.asarray(points).reshape(-1, 2)
+    radius = int(np.ceil(radius))
+    return np.array([points.min(0).round() - radius,
+                     points.max(0).round() + radius], np.int64)
+
+def strokeMask(points, radius, bbox=None):
+    """Rasterizes the brush swept along points
+
+    Consecutive points are connected by capsules, a line of width
+    `2 * radius + 1` with round caps, so the mask is closed even for fast
+    mouse movements.
+
+    Parameters
+    ----------
+    points : array_like
+        `(x, y)` positions of the brush center, shape `(n, 2)`
+    radius : int
+        Radius of the brush in pixels
+    bbox : ndarray
+        `((xmin, ymin), (xmax, ymax))` of the mask. Defaults to the
+        bounding box of the stroke
+
+    Returns
+    -------
+    mask_slice : tuple of slice
+        `(rows, cols)` slice of the mask in image coordinates
+    mask : ndarray
+        bool mask of the stroke
+    """
+    points = np.asarray(points, np.float64).reshape(-1, 2)
+    radius = int(round(radius))
+    if bbox is None:
+        bbox = strokeBBox(points, radius)
+
+    (xmin, ymin), (xmax, ymax) = bbox
+    canvas = np.zeros((ymax - ymin + 1, xmax - xmin + 1), np.uint8)
+    local = (points.round() - (xmin, ymin)).astype(np.int32)
+
+    cv2.circle(canvas, tuple(int(val) for val in local[0]), radius, 1, -1)
+    if len(local) > 1:
+        cv2.polylines(canvas, [local.reshape(-1, 1, 2)], False, 1,
+                      thickness=2 * radius + 1)
+
+    mask_slice = (slice(ymin, ymax + 1), slice(xmin, xmax + 1))
+    return mask_slice, canvas.astype(bool)
+
+def applyStroke(entity, points, radius, erase=False):
+    """Draws or erases a brush stroke on entity inplace
+
+    Nothing is changed if the stroke does not overlap the entity, if
+    drawing adds no pixel or if erasing would remove the whole entity.
+
+    Parameters
+    ----------
+    entity : Entity
+        Entity to edit, its contour is updated
+    points : array_like
+        `(x, y)` positions of the brush center, shape `(n, 2)`
+    radius : int
+        Radius of the brush in pixels
+    erase : bool
+        If `True` the stroke is removed from the entity, otherwise added
+
+    Returns
+    -------
+    changed : bool
+        `True` if the contour of entity was updated
+    """
+    strokeBox = strokeBBox(points, radius)
+    contours = [np.asarray(cnt).reshape(-1, 2) for cnt in entity.contours]
+    contours = [cnt for cnt in contours if len(cnt)]
+    if not contours:
+        return False
+
+    # common frame of entity and stroke
+    entityBox = np.concatenate(contours)
+    bbox = np.array([np.minimum(entityBox.min(0), strokeBox[0]),
+                     np.maximum(entityBox.max(0), strokeBox[1])])
+
+    mask_slice, entityMask = local_mask(contours, bbox=bbox)
+    _, brushMask = strokeMask(points, radius, bbox=bbox)
+
+    if not (entityMask & brushMask).any():
+        return False
+
+    if erase:
+        newMask = entityMask & ~brushMask
+    else:
+        newMask = entityMask | brushMask
+
+    if not newMask.any() or np.array_equal(newMask, entityMask):
+        return False
+
+    entity.update_contour(mask_contours(mask_slice, newMask))
+    return True
+
+
+class StrokePreview(pg.GraphicsObject):
+    """Overlay showing the brush stroke while the mouse is moved
+
+    Each new position only repaints the capsule between it and the
+    previous position. The stroke is applied to the entity on release,
+    see `applyStroke`
+    """
+
+    def __init__(self, radius, erase=False):
+        """
+        Parameters
+        ----------
+        radius : int
+            Radius of the brush in pixels
+
+        erase : bool
+            Colours the preview for erasing instead of drawing
+        """
+        super().__init__()
+        self.radius = radius
+        self._polygon = QPolygonF()
+        self._bounds = qc.QRectF()
+
+        colour = QColor('#E62B38' if erase else '#10AA00')
+        colour.setAlpha(120)
+        self._pen = QPen(colour, 2 * radius + 1, qc.Qt.SolidLine,
+                         qc.Qt.RoundCap, qc.Qt.RoundJoin)
+
+        # above all entities
+        self.setZValue(1e6)
+
+    def boundingRect(self):
+        return self._bounds
+
+    @property
+    def points(self):
+        """Recorded `(x, y)` positions
+        """
+        return [(pos.x(), pos.y()) for pos in self._polygon]
+
+    def addPoint(self, pos):
+        """Extends the stroke to pos and repaints the new segment only
+        """
+        pos = qc.QPointF(pos)
+        if len(self._polygon):
+            last = self._polygon.last()
+            if last == pos:
+                return
+        else:
+            last = pos
+        self._polygon.append(pos)
+
+        margin = self.radius + 1
+        dirty = qc.QRectF(last, pos).normalized().adjusted(
+            -margin, -margin, margin, margin)
+        if not self._bounds.contains(dirty):
+            self.prepareGeometryChange()
+            self._bounds = self._bounds.united(dirty)
+        self.update(dirty)
+
+    def paint(self, painter, *args):
+        painter.setPen(self._pen)
+        painter.setBrush(qc.Qt.NoBrush)
+        if len(self._polygon) == 1:
+            painter.drawPoint(self._polygon.first())
+        else:
+            painter.drawPolyline(self._polygon)
@@ -15,9 +15,27 @@ class Enhancer(qc.QObject):
         self.auto_thresh_factor = 1e-4
         self.auto_limit_factor = 0.1
 
-    def getScalingLUT(self):
-        # lower * m - b = to_lower
-        # upper * m - b = to_upper
+        # reused between calls, see getScalingLUT
+        self._ramp = None
+        self._work = None
+
+    def getScalingLUT(self, out=None):
+        """Lookup table mapping adjustFrom linearly onto adjustTo, clipped
+        below and above
+
+        Parameters
+        ----------
+        out : ndarray
+            Buffer the lut is written into, e.g. the lut returned by the
+            previous call. A new one is allocated, if it does not match
+            imgDesc
+
+        Returns
+        -------
+        lut : ndarray
+            Array with `imgDesc[0] + 1` entries, one for each input value,
+            or `None` if the mapping is the identity or invalid
+        """
         if self.adjustFrom == self.adjustTo:
             return None
 
@@ -25,61 +43,52 @@ class Enhancer(qc.QObject):
         low1, up1 = self.adjustTo
         maxInVal, dtype = self.imgDesc
 
-        if (low0 - up0) == 0:
+        low0, up0 = int(low0), int(up0)
+        if low0 >= up0:
             return None
 
-        m = (low1 - up1) / (low0 - up0)
-        b0 = low0 * m - low1
-        b1 = up0 * m - up1
+        size = maxInVal + 1
+        if out is None or out.shape != (size,) or out.dtype != dtype:
+            out = np.empty(size, dtype=dtype)
+        if self._ramp is None or len(self._ramp) != size:
+            self._ramp = np.arange(size, dtype=np.float32)
+            self._work = np.empty(size, dtype=np.float32)
 
-        low0, up0 = int(low0), int(up0)
-        if int(low0) >= int(up0):
-            return None
+        # (ramp - low0) * m + low1 without temporary arrays
+        work = self._work
+        np.subtract(self._ramp, low0, out=work)
+        work *= (up1 - low1) / (up0 - low0)
+        work += low1
+        np.clip(work, min(low1, up1), max(low1, up1), out=work)
+        out[:] = work
+
+        return out
+
+    def getAutoBounds(self, hist, lower=0.001, upper=0.999):
+        """Input values at the lower and upper percentiles of a histogram,
+        e.g. from `util.image.imageHistogram`
+
+        Parameters
+        ----------
+        hist : ndarray
+            Counts, one bin per input value
+        lower, upper : float
+            Fraction of pixels mapped below, respectively not above the
+            returned bounds
+
+        Returns
+        -------
+        bounds : tuple
+            `(minVal, maxVal)` with `minVal < maxVal`
+        """
+        maxInVal = self.imgDesc[0]
+        cumulative = np.cumsum(hist)
+        total = cumulative[-1] if len(cumulative) else 0
+        if total == 0:
+            return 0, maxInVal
 
-        lut = np.zeros(maxInVal, dtype=dtype)
-        lut[low0:up0] = np.linspace(low1, up1, up0-low0)
-        lut[up0:] = up1
-
-        return lut
-
-#     def get_autobounds(self, img, bincount=0xfff, sat_trgt=1e-6,
-#                        under_trgt=0.002):
-#         if img is None:
-#             return 0, 0xff
-# 
-#         counts, bins = np.histogram(img.ravel(), bins=bincount)
-#         bins = bins[1:]
-# 
-#         # sat_trgt = sat_trgt * img.size
-#         sat_trgt = 1
-#         under_trgt = under_trgt * img.size
-#         sat_px = 0
-#         under_px = counts[0]
-#         sat_edge = None
-#         under_edge = None
-# 
-#         for i in range(1, len(bins)):
-# 
-#             if sat_px <= sat_trgt:
-#                 sat_px += counts[-i]
-#                 sat_edge = bins[-i]
-# 
-#             if under_px <= under_trgt:
-#                 under_px += counts[i]
-#                 under_edge = bins[i]
-# 
-#         if sat_edge is None:
-#             sat_edge = 0xfff
-# 
-#         if under_edge is None:
-#             under_edge = 0
-# 
-#         if under_edge > sat_edge:
-#             under_edge = 0
-# 
-#         if under_edge > sat_edge:
-#             sat_edge = 0xfff
-#         
-#         print(under_edge, sat_edge)
-#         print(under_px, sat_px)
-#         return under_edge, sat_edge
+        minVal = int(np.searchsorted(cumulative, lower * total, side='right'))
+        maxVal = int(np.searchsorted(cumulative, upper * total, side='left'))
+        minVal = min(minVal, maxInVal - 1)
+        maxVal = min(max(maxVal, minVal + 1), maxInVal)
+        return minVal, maxVal
@@ -10,8 +10,9 @@ import numpy as np
 from PIL import Image
 
 from inspectorcell.entities.entitytools import (extract_to_table, read_into_manager,
-                                                draw_entities)
+                                                draw_entities, draw_entities_tiled)
 from inspectorcell.entities import EntityFile
+from inspectorcell.util.lookup import IdIndex, label_lut, colourize
 
 
 class DryrunWrapper():
@@ -89,14 +90,16 @@ def merge_csv(args):
         warnings.warn(msg.format(args.incsv, str(dframe.columns)))
         return
 
-    for ent in eman:
-        rmask = dframe[args.idcol] == ent.eid
-        try:
-            tag, = dframe[rmask][args.tagcol]
+    entities = list(eman)
+    index = IdIndex(dframe[args.idcol].values)
+    tags, found = index.join([ent.objectId for ent in entities],
+                             dframe[args.tagcol].values)
+    for ent, tag, isFound in zip(entities, tags, found):
+        if isFound:
             ent.tags.add(tag)
-        except ValueError:
+        else:
             msg = 'Could not find Entity-ID {} in table'
-            warnings.warn(msg.format(ent.eid))
+            warnings.warn(msg.format(ent.objectId))
 
     def write_json(entities, jsonfile):
         all_ents = list(entities.iter_all())
@@ -113,29 +116,25 @@ def to_pixmap(args):
     yres = int(args.yres)
     
     print('Clipping Entities...')
-    for ent in eman:
-        new_cont = []
-        for cont in ent.contours:
-            cur_cont = []
-            new_cont.append(cur_cont)
-            for (p0, p1) in cont:
-                p0 = min(max(p0, 0), xres)
-                p1 = min(max(p1, 0), yres)
-                cur_cont.append((p0, p1))
-
-        ent.from_contours(new_cont)
+    eman.clip(xres, yres)
     
     def make_pixmap(xres, yres, tiffile):
-        col_fn = lambda ent: ent.eid
+        col_fn = lambda ent: ent.objectId
         img = np.zeros((yres, xres, 1), np.uint16)
         draw_entities(img, eman, col_fn, stroke=0)
         pic = Image.fromarray(img[..., 0])
         pic.save(tiffile)
+
+    def make_tiled(xres, yres, tiffile):
+        col_fn = lambda ent: ent.objectId
+        draw_entities_tiled(tiffile, eman, col_fn, (yres, xres), np.uint16,
+                            stroke=0, tilesize=args.tilesize,
+                            workers=args.workers)
     
     tiffile = Path(args.outtif)
     wrapper = DryrunWrapper(args)
-    wrapper.perform(make_pixmap, (), dict(xres=xres, yres=yres,
-                    tiffile=args.outtif))
+    wrapper.perform(make_tiled if args.tiled else make_pixmap, (),
+                    dict(xres=xres, yres=yres, tiffile=args.outtif))
 
 def draw_cluster(args):
     eman = read_into_manager(args.injson, strip=True)
@@ -143,19 +142,8 @@ def draw_cluster(args):
     yres = int(args.yres)
     stroke = int(args.stroke)
     
-    #TODO Make me a function and REUSE ME!
     print('Clipping Entities...')
-    for ent in eman:
-        new_cont = []
-        for cont in ent.contours:
-            cur_cont = []
-            new_cont.append(cur_cont)
-            for (p0, p1) in cont:
-                p0 = min(max(p0, 0), xres)
-                p1 = min(max(p1, 0), yres)
-                cur_cont.append((p0, p1))
-
-        ent.from_contours(new_cont)
+    eman.clip(xres, yres)
     
     def get_colorfun(colorcsv):
         colscheme = pd.read_csv(colorcsv)
@@ -182,18 +170,41 @@ def draw_cluster(args):
 
     def make_pixmap(xres, yres, stroke, colorcsv, tiffile):
         col_fn = get_colorfun(colorcsv)
-        img = np.zeros((yres, xres, 3), np.uint8)
-        draw_entities(img, eman, col_fn, stroke=stroke)
-        pic = Image.fromarray(img)
+        entities = list(eman)
+        lut = label_lut([ent.objectId for ent in entities],
+                        [col_fn(ent) for ent in entities])
+        # draw labels once and colour all pixels in one lookup
+        labels = np.zeros((yres, xres), np.int32)
+        draw_entities(labels, eman, lambda ent: ent.objectId, stroke=stroke)
+        pic = Image.fromarray(colourize(labels, lut))
         pic.save(tiffile)
+
+    def make_tiled(xres, yres, stroke, colorcsv, tiffile):
+        col_fn = get_colorfun(colorcsv)
+        draw_entities_tiled(tiffile, eman, col_fn, (yres, xres, 3), np.uint8,
+                            stroke=stroke, tilesize=args.tilesize,
+                            workers=args.workers)
     
     tiffile = Path(args.outtif)
     wrapper = DryrunWrapper(args)
-    wrapper.perform(make_pixmap, (), dict(xres=xres, yres=yres,
+    wrapper.perform(make_tiled if args.tiled else make_pixmap, (),
+                    dict(xres=xres, yres=yres,
                     stroke=stroke, colorcsv=args.colorcsv,
                     tiffile=args.outtif))
 
 
+def _add_tiled_arguments(parser):
+    """Options for tiled BigTIFF output shared by image exports
+    """
+    parser.add_argument('--tiled', action='store_true',
+                        help='Write a tiled BigTIFF tile by tile ' +\
+                             '(needs tifffile)')
+    parser.add_argument('--tilesize', type=int, help='tile edge length',
+                        nargs='?', default=512)
+    parser.add_argument('--workers', type=int, nargs='?', default=1,
+                        help='Number of tiles rendered in parallel')
+
+
 def main(*args, **kwargs):
     entitycli = argparse.ArgumentParser(
         prog='Entity CLI tool',
@@ -249,6 +260,7 @@ def main(*args, **kwargs):
                        default=2048)
     totif.add_argument('--yres', type=int, help='tif pixel hight', nargs='?',
                        default=2048)
+    _add_tiled_arguments(totif)
     totif.add_argument('-n', '--dryrun', action='store_true')
     totif.set_defaults(func=to_pixmap)
 
@@ -267,6 +279,7 @@ def main(*args, **kwargs):
                         default=2048)
     drawme.add_argument('--yres', type=int, help='tif pixel hight', nargs='?',
                        default=2048)
+    _add_tiled_arguments(drawme)
 
     drawme.add_argument('-n', '--dryrun', action='store_true')
     drawme.set_defaults(func=draw_cluster)
@@ -0,0 +1,152 @@
+"""Local contrast filters for background images
+
+A filter chain is a tuple of filters, each a tuple `(name, *params)`, e.g.
+`(('subtract', 25), ('clahe', 2.0, 64), ('gamma', 0.8))`. Chains are
+hashable, so they can key caches, and are stored as nested lists in the
+view state.
+
+All filters work on 16 bit images, keep the dtype and only depend on a
+bounded neighbourhood, given by `filterMargin`. Thus they can be applied
+to tiles of an image, see `filterTile`.
+"""
+import math
+
+import cv2
+import numpy as np
+
+
+def clahe(image, clipLimit=2.0, window=64):
+    """Contrast limited adaptive histogram equalization
+
+    Parameters
+    ----------
+    image : ndarray
+        2D uint8 or uint16 image
+    clipLimit : float
+        Contrast limit, relative to a uniform histogram
+    window : int
+        Edge length of the regions equalized together in pixels
+    """
+    rows, cols = image.shape[:2]
+    window = max(int(window), 2)
+    gridX, gridY = math.ceil(cols / window), math.ceil(rows / window)
+
+    # padded to whole regions, as cv2 would shrink the regions otherwise
+    padded = cv2.copyMakeBorder(
+        np.ascontiguousarray(image), 0, gridY * window - rows,
+        0, gridX * window - cols, cv2.BORDER_REFLECT_101)
+    equalizer = cv2.createCLAHE(clipLimit=float(clipLimit),
+                                tileGridSize=(gridX, gridY))
+    return equalizer.apply(padded)[:rows, :cols]
+
+def gamma(image, value=1.0):
+    """Gamma correction over the full range of the dtype
+    """
+    maxVal = np.iinfo(image.dtype).max
+    lut = np.linspace(0, 1, maxVal + 1) ** float(value) * maxVal
+    return np.take(lut.astype(image.dtype), image)
+
+def subtractBackground(image, radius=25):
+    """Removes background larger than radius with a white top-hat
+    """
+    radius = max(int(radius), 1)
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE,
+                                       (2 * radius + 1, 2 * radius + 1))
+    return cv2.morphologyEx(image, cv2.MORPH_TOPHAT, kernel)
+
+# name -> (function, indices of params given in pixels)
+FILTERS = {
+    'clahe': (clahe, (1,)),
+    'gamma': (gamma, ()),
+    'subtract': (subtractBackground, (0,)),
+}
+
+def normalized(filters):
+    """Filter chain as tuple of tuples, e.g. after loading the view state
+    """
+    if not filters:
+        return ()
+    chain = tuple(tuple(flt) for flt in filters)
+    for flt in chain:
+        if not flt[0] in FILTERS:
+            raise ValueError('Invalid filter: {}'.format(flt[0]))
+    return chain
+
+def scaledFilters(filters, scale):
+    """Filter chain for an image downsampled by scale, e.g. `2 ** level`
+    of an ImagePyramid, with all sizes in pixels divided by scale
+    """
+    scaled = []
+    for name, *params in filters:
+        for index in FILTERS[name][1]:
+            params[index] = max(int(round(params[index] / scale)), 1)
+        scaled.append((name, *params))
+    return tuple(scaled)
+
+def filterMargin(filters):
+    """Pixels around a tile needed to filter it like the whole image
+
+    Returns
+    -------
+    margin : int
+        Sum of the neighbourhoods of all filters in the chain
+    align : int
+        Region starts must be a multiple of align, so the CLAHE regions
+        of a tile are the ones of the whole image
+    """
+    margin, align = 0, 1
+    for name, *params in filters:
+        if name == 'clahe':
+            window = max(int(params[1]), 2)
+            margin += window
+            align = window
+        elif name == 'subtract':
+            margin += 2 * max(int(params[0]), 1)
+    return margin, align
+
+def applyFilters(image, filters):
+    """Applies the filter chain to image in order
+
+    Images of other dtypes than uint8 and uint16 are clipped to uint16
+    """
+    if filters and not image.dtype in (np.uint8, np.uint16):
+        image = np.clip(image, 0, 0xffff).astype(np.uint16)
+    for name, *params in filters:
+        image = FILTERS[name][0](image, *params)
+    return image
+
+def filterTile(image, rows, cols, filters):
+    """Filters the tile `image[rows, cols]` as part of the whole image
+
+    The tile is filtered with a margin around it, aligned to the CLAHE
+    regions, which is cropped again afterwards
+
+    Parameters
+    ----------
+    image : ndarray
+        2D image the tile is cut from
+    rows, cols : slice
+        Tile of image, with start and stop within the image
+    filters : tuple
+        Filter chain
+
+    Returns
+    -------
+    tile : ndarray
+        Filtered tile with the shape of `image[rows, cols]`
+    """
+    if not filters:
+        return image[rows, cols]
+
+    margin, align = filterMargin(filters)
+    height, width = image.shape[:2]
+
+    def extended(span, size):
+        start = max((span.start - margin) // align * align, 0)
+        stop = min(-(-(span.stop + margin) // align) * align, size)
+        return slice(start, stop)
+
+    outerRows, outerCols = extended(rows, height), extended(cols, width)
+    filtered = applyFilters(image[outerRows, outerCols], filters)
+    return filtered[rows.start - outerRows.start:rows.stop - outerRows.start,
+                    cols.start - outerCols.start:cols.stop - outerCols.start]
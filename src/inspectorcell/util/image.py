@@ -1,5 +1,9 @@
 """Just some imageing function to ensure consistent access to images in the project
 """
+# built-ins
+from collections import OrderedDict
+from pathlib import Path
+import threading
 
 # extern
 import cv2
@@ -22,3 +26,205 @@ def getImagedata(imgPath):
 
 def getFlippedImagedata(imgPath):
     return flipped(getImagedata(imgPath))
+
+def imageHistogram(image, maxSamples=2**22):
+    """16 bit histogram of an image, from a regular grid of samples
+
+    Parameters
+    ----------
+    image : ndarray
+        2D image. Values outside of `[0, 0xffff]` are clipped
+    maxSamples : int
+        The image is sampled with the same step along both axes, such that
+        at most maxSamples pixels are counted
+
+    Returns
+    -------
+    hist : ndarray
+        int64 counts with `0x10000` bins, one for each 16 bit value
+    """
+    step = max(int(np.ceil(np.sqrt(image.size / maxSamples))), 1)
+    sample = image[::step, ::step].ravel()
+    if sample.dtype.kind != 'u' or sample.dtype.itemsize > 2:
+        sample = np.clip(sample, 0, 0xffff).astype(np.uint16)
+    return np.bincount(sample, minlength=0x10000)
+
+
+class ImageCache():
+    """Decoded images shared by all channels and view contexts
+
+    Images are keyed by their resolved path and modification time, so a
+    changed file is decoded again. The least recently used images are
+    evicted once the cached bytes exceed the budget. Cached arrays are
+    read-only, as they are shared.
+
+    Parameters
+    ----------
+    budget : int
+        Maximal number of bytes kept. The most recently used image is
+        always kept, even if it alone exceeds the budget
+    loader : callable
+        Decodes the image at a path, defaults to `getImagedata`, which
+        keeps the row-major layout of the decoded buffer
+    """
+
+    def __init__(self, budget=2 * 1024**3, loader=getImagedata):
+        self.budget = budget
+        self.loader = loader
+        self._images = OrderedDict()
+        self._histograms = {}
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._images)
+
+    @property
+    def nbytes(self):
+        """Bytes held by all cached images
+        """
+        return self._nbytes
+
+    @staticmethod
+    def _key(imgPath):
+        imgPath = Path(imgPath)
+        return str(imgPath.resolve()), imgPath.stat().st_mtime_ns
+
+    def get(self, imgPath):
+        """Cached image at imgPath, decoded on first access
+
+        Parameters
+        ----------
+        imgPath : str, pathlib.Path
+            Path to the image
+
+        Returns
+        -------
+        image : ndarray
+            Read-only image as returned by the loader
+        """
+        try:
+            key = self._key(imgPath)
+        except OSError:
+            raise ValueError('No valid image at {}'.format(str(imgPath)))
+
+        with self._lock:
+            image = self._images.get(key)
+            if not image is None:
+                self._images.move_to_end(key)
+                return image
+
+        # decode outside the lock, other images stay accessible
+        image = self.loader(imgPath)
+        image.flags.writeable = False
+
+        with self._lock:
+            if not key in self._images:
+                self._images[key] = image
+                self._nbytes += image.nbytes
+                self._evict()
+            return self._images[key]
+
+    def histogram(self, imgPath):
+        """Cached `imageHistogram` of the image at imgPath. It is kept as
+        long as the image is cached
+
+        Parameters
+        ----------
+        imgPath : str, pathlib.Path
+            Path to the image, which is decoded if not cached yet
+
+        Returns
+        -------
+        hist : ndarray
+            Read-only counts with `0x10000` bins
+        """
+        image = self.get(imgPath)
+        key = self._key(imgPath)
+        with self._lock:
+            hist = self._histograms.get(key)
+        if hist is None:
+            hist = imageHistogram(image)
+            hist.flags.writeable = False
+            with self._lock:
+                if key in self._images:
+                    hist = self._histograms.setdefault(key, hist)
+        return hist
+
+    def __contains__(self, imgPath):
+        try:
+            key = self._key(imgPath)
+        except OSError:
+            return False
+        with self._lock:
+            return key in self._images
+
+    def _evict(self):
+        while self._nbytes > self.budget and len(self._images) > 1:
+            key, image = self._images.popitem(last=False)
+            self._histograms.pop(key, None)
+            self._nbytes -= image.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self._histograms.clear()
+            self._nbytes = 0
+
+
+imageCache = ImageCache()
+
+def readPreview(imgPath, maxSize=1024):
+    """Reduced resolution version of an image, read without decoding the
+    full resolution image
+
+    Uses the smallest level of a pyramidal TIFF still larger than maxSize
+    or a strided read of a memory mappable TIFF. Needs `tifffile`
+
+    Parameters
+    ----------
+    imgPath : str, pathlib.Path
+        Path to the image
+    maxSize : int
+        Targeted size of the longer side of the preview
+
+    Returns
+    -------
+    preview : tuple or None
+        `(image, extent)` with the preview and the `(width, height)` of the
+        full resolution image. `None`, if there is no cheap way to read a
+        preview
+    """
+    try:
+        import tifffile
+    except ImportError:
+        return None
+
+    try:
+        with tifffile.TiffFile(str(imgPath)) as tif:
+            series = tif.series[0]
+            shape = series.shape
+            if len(shape) != 2:
+                return None
+            levels = list(getattr(series, 'levels', [series]))
+            # coarse to fine, the first one large enough is used
+            levels = [lvl for lvl in levels[1:] if max(lvl.shape) >= maxSize]
+            if levels:
+                preview = levels[-1].asarray()
+            else:
+                data = tifffile.memmap(str(imgPath))
+                step = max(int(np.ceil(max(shape) / maxSize)), 1)
+                if step == 1:
+                    return None
+                preview = np.array(data[::step, ::step])
+    except Exception:
+        # no cheap preview, the full image is loaded anyways
+        return None
+
+    return preview, shape[::-1]
+
+def getCachedImagedata(imgPath):
+    """Image at imgPath from the shared ImageCache, as decoded with the
+    shape `(rows, cols)`
+    """
+    return imageCache.get(imgPath)
@@ -0,0 +1,142 @@
+"""Joins of per-id table data onto entities and label images
+
+Instead of scanning a table once per entity, an `IdIndex` is built once
+from the id column and then queried for all ids at once.
+"""
+import numpy as np
+
+
+class IdIndex():
+    """Sorted index from ids to table rows
+
+    Parameters
+    ----------
+    ids : array_like
+        id of each table row. Ids found more than once are treated as
+        missing, as they can not be resolved unambigously
+    """
+
+    def __init__(self, ids):
+        ids = np.asarray(ids)
+        order = np.argsort(ids, kind='stable')
+        sortedIds = ids[order]
+
+        unique = np.ones(len(sortedIds), bool)
+        if len(sortedIds) > 1:
+            dupes = sortedIds[1:] == sortedIds[:-1]
+            unique[1:] &= ~dupes
+            unique[:-1] &= ~dupes
+
+        self._sortedIds = sortedIds[unique]
+        self._rows = order[unique]
+
+    def __len__(self):
+        return len(self._sortedIds)
+
+    def rows(self, query):
+        """Table rows for all ids in query
+
+        Parameters
+        ----------
+        query : array_like
+            ids to look up
+
+        Returns
+        -------
+        rows : ndarray
+            int64 array with the row of each id in query, `-1` if the id is
+            not found
+        """
+        query = np.asarray(query)
+        if not len(self._sortedIds):
+            return np.full(query.shape, -1, np.int64)
+
+        pos = np.searchsorted(self._sortedIds, query)
+        pos = np.minimum(pos, len(self._sortedIds) - 1)
+        found = self._sortedIds[pos] == query
+        return np.where(found, self._rows[pos], -1)
+
+    def join(self, query, values, default=None):
+        """Values of the table rows for all ids in query
+
+        Parameters
+        ----------
+        query : array_like
+            ids to look up
+        values : array_like
+            Column of the table, one entry per id the index was built from
+        default : object
+            Value used for ids not found
+
+        Returns
+        -------
+        joined : ndarray
+            `values` for each id in query
+        found : ndarray
+            bool array, `False` for each id not found
+        """
+        rows = self.rows(query)
+        found = rows >= 0
+        values = np.asarray(values)
+        dtype = np.result_type(values.dtype, np.asarray(default).dtype)
+        joined = np.full(rows.shape, default, dtype)
+        joined[found] = values[rows[found]]
+        return joined, found
+
+
+def label_lut(labels, colours, default=(0, 0, 0), background=(0, 0, 0),
+              dtype=np.uint8):
+    """Colour lookup table keyed by label
+
+    Parameters
+    ----------
+    labels : array_like
+        int labels, e.g. the objectIds drawn into a label image
+    colours : array_like
+        Colour of each label with the shape `(n, c)`
+    default : tuple
+        Colour of labels not in `labels`
+    background : tuple
+        Colour of label 0
+    dtype : numpy.dtype
+        Datatype of the lut
+
+    Returns
+    -------
+    lut : ndarray
+        Array with the shape `(max(labels) + 1, c)`, such that `lut[label]`
+        is the colour of label
+    """
+    labels = np.asarray(labels, np.int64)
+    if not len(labels):
+        return np.array([background], dtype)
+    colours = np.asarray(colours).reshape(len(labels), -1)
+    lut = np.empty((int(labels.max()) + 1, colours.shape[1]), dtype)
+    lut[:] = default
+    lut[labels] = colours
+    lut[0] = background
+    return lut
+
+def colourize(labelImage, lut):
+    """Maps a label image to colours in one fancy indexing step
+
+    Parameters
+    ----------
+    labelImage : ndarray
+        int label image with the shape `(y, x)` or `(y, x, 1)`
+    lut : ndarray
+        Lookup table as returned by `label_lut`. Labels beyond the lut are
+        treated as background
+
+    Returns
+    -------
+    image : ndarray
+        Array with the shape `(y, x, c)`
+    """
+    labelImage = np.asarray(labelImage)
+    if labelImage.ndim == 3:
+        labelImage = labelImage[..., 0]
+    outside = labelImage >= len(lut)
+    if outside.any():
+        labelImage = np.where(outside, 0, labelImage)
+    return lut[labelImage]
@@ -0,0 +1,74 @@
+"""Memory profile of loading and rendering a channel background
+
+Compares the former path, decoding, orienting with `flipped` and
+rendering the whole image into one QImage, with the current one, which
+keeps the decoded buffer and renders the visible tiles of the pyramid.
+Traced are the numpy allocations, as reported by tracemalloc.
+
+Run with `QT_QPA_PLATFORM=offscreen` on machines without display.
+"""
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pyqtgraph as pg
+from AnyQt.QtCore import QRectF
+from AnyQt.QtGui import QImage, QPainter
+from AnyQt.QtWidgets import QApplication
+
+from inspectorcell.util.image import getImagedata, flipped, ImageCache
+from inspectorcell.viewer.pyramid import TiledBackgroundImage
+
+
+def profile(name, func):
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('{:40s} peak {:8.1f} MiB'.format(name, peak / 2**20))
+
+
+def main(size=8192):
+    app = QApplication(sys.argv)
+    lut = np.linspace(0, 255, 0x10000).astype(np.uint8)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        imgPath = Path(tmpdir) / 'channel.tif'
+        rng = np.random.default_rng(0)
+        cv2.imwrite(str(imgPath),
+                    rng.integers(0, 0xffff, (size, size), np.uint16))
+        print('Image {0}x{0} uint16, {1:.1f} MiB'.format(
+            size, size * size * 2 / 2**20))
+
+        def former():
+            image = flipped(getImagedata(imgPath))
+            item = pg.ImageItem(image, levels=(0, 0xffff),
+                                autoLevels=False, autoDownsample=False)
+            item.setLookupTable(lut)
+            item.render()
+
+        def current(viewSize=1024, zoom=1.):
+            cache = ImageCache()
+            background = TiledBackgroundImage()
+            background.setImage(cache.get(imgPath))
+            background.setLookupTable(lut)
+
+            target = QImage(viewSize, viewSize, QImage.Format_RGB32)
+            painter = QPainter(target)
+            painter.scale(zoom, zoom)
+            background.paint(painter, QRectF(0, 0, viewSize / zoom,
+                                             viewSize / zoom))
+            painter.end()
+
+        profile('former: flipped + full QImage', former)
+        profile('current: zoomed in, 1:1', lambda: current(zoom=1.))
+        profile('current: whole image', lambda: current(zoom=1024 / size))
+
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -8,29 +8,44 @@ from inspectorcell.entities.entitytools import (
     draw_entities, read_into_manager)
 
 from inspectorcell.entities import EntityManager, EntityFile
+from inspectorcell.util.lookup import IdIndex, label_lut, colourize
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from PIL import Image
 
 
+RED = np.array([1, 0, 0], float)
+GREY = np.array([.3, .3, .3], float)
+
+
 def get_colorpicker(dframe, mapping):
-    red = np.array([1, 0, 0], float)
-    black = np.array([0, 0, 0], float)
-    grey = np.array([.3, .3, .3], float)
+    index = IdIndex(dframe['CellID'].values)
+    clusters = dframe['Cluster'].values
     def colorpicker(entity):
-        rmask = dframe['CellID'] == entity.eid
-        try:
-            tag, = dframe[rmask]['Cluster']
-        except ValueError:
+        row, = index.rows([entity.objectId])
+        if row < 0:
             msg = 'Could not find ID {} in table'
-            warnings.warn(msg.format(entity.eid))
-            return red
+            warnings.warn(msg.format(entity.objectId))
+            return RED
 
-        return mapping.get(tag, grey)
+        return mapping.get(clusters[row], GREY)
 
     return colorpicker
 
+def get_colorlut(dframe, mapping, entities):
+    """Colour for each entity, keyed by objectId, in one table join
+    """
+    ids = [ent.objectId for ent in entities]
+    index = IdIndex(dframe['CellID'].values)
+    clusters, found = index.join(ids, dframe['Cluster'].values)
+    colours = [mapping.get(tag, GREY) if isFound else RED \
+               for tag, isFound in zip(clusters, found)]
+    if not found.all():
+        msg = 'Could not find {} IDs in table'
+        warnings.warn(msg.format((~found).sum()))
+    return label_lut(ids, colours, dtype=float)
+
 
 root = Path('~/fileserver/R&D_Reagents/$Central_Documents',
             '1a_Studenten/Andre_Gosselink/colabsegmentation',
@@ -53,9 +68,10 @@ mapping = dict(C1=np.array([70, 190, 250], float), # (Fibroblasts)
                C9=np.array([0, 128, 255], float), # (CD25+ CD4+ T cells)
                C10=np.array([255, 223, 128], float), # (CD8+ T cells)
 )
-img = np.zeros((2100, 2100, 3), float)
+labels = np.zeros((2100, 2100), np.int32)
 
-draw_entities(img, eman, get_colorpicker(dframe, mapping))
+draw_entities(labels, eman, lambda ent: ent.objectId)
+img = colourize(labels, get_colorlut(dframe, mapping, list(eman)))
 # plt.imshow(img)
 # plt.show()
 
@@ -0,0 +1,302 @@
+"""Rasterization of contours into label or colour images
+
+Contours are lists of `(x, y)` point arrays, as used by entities. All
+functions draw with OpenCV directly into the canvas and never need a mask
+materialized by an entity.
+"""
+import numpy as np
+import cv2
+
+
+def _polygons(contours):
+    """Contours in the layout cv2 expects
+    """
+    return [np.asarray(cnt, np.int32).reshape(-1, 1, 2) for cnt in contours]
+
+def _cvvalue(value):
+    """Converts a scalar or colour into a cv2 scalar
+    """
+    return tuple(float(val) for val in np.ravel(value))
+
+def contours_bbox(contours):
+    """Bounding box of contours
+
+    Returns
+    -------
+    bbox : ndarray or None
+        Array `((xmin, ymin), (xmax, ymax))` or `None` if there are
+        no points
+    """
+    points = [np.asarray(cnt).reshape(-1, 2) for cnt in contours]
+    points = [pts for pts in points if len(pts)]
+    if not points:
+        return None
+    points = np.concatenate(points)
+    return np.array([points.min(0), points.max(0)], np.int64)
+
+def fill_contours(canvas, contours, value, offset=(0, 0)):
+    """Fills contours inplace with value
+
+    Parameters
+    ----------
+    canvas : ndarray
+        Contiguous array with the shape `(y, x)` or `(y, x, c)`, `c <= 4`
+    contours : list of ndarray
+        Contours to fill, all of them are filled in one call
+    value : scalar or array
+        Value or colour to fill with
+    offset : tuple of int
+        `(dx, dy)` added to each point before drawing
+    """
+    if contours:
+        cv2.fillPoly(canvas, _polygons(contours), _cvvalue(value),
+                     offset=tuple(int(off) for off in offset))
+    return canvas
+
+def stroke_contours(canvas, contours, value, thickness, offset=(0, 0)):
+    """Draws the outline of contours inplace
+
+    Parameters
+    ----------
+    canvas : ndarray
+        Contiguous array with the shape `(y, x)` or `(y, x, c)`, `c <= 4`
+    contours : list of ndarray
+        Closed contours to draw
+    value : scalar or array
+        Value or colour of the outline
+    thickness : int
+        Width of the outline in pixels, centered on the contour
+    offset : tuple of int
+        `(dx, dy)` added to each point before drawing
+    """
+    if not contours:
+        return canvas
+    dx, dy = offset
+    polygons = [poly + np.array([dx, dy], np.int32) for poly in \
+                _polygons(contours)]
+    cv2.polylines(canvas, polygons, True, _cvvalue(value),
+                  thickness=int(thickness))
+    return canvas
+
+def stroke_margin(stroke):
+    """Pixels an outline of the stroke width, as drawn by `rasterize`,
+    reaches beyond its contours. cv2 draws thick lines one pixel wider
+    than their nominal half width
+    """
+    return abs(int(stroke)) + 1 if stroke else 0
+
+def local_mask(contours, pad=0, bbox=None):
+    """Boolean mask of the filled contours in their bounding box
+
+    Parameters
+    ----------
+    contours : list of ndarray
+        Contours to rasterize
+    pad : int
+        Number of pixels added around the bounding box
+    bbox : ndarray
+        `((xmin, ymin), (xmax, ymax))` used instead of the bounding box of
+        the contours, e.g. to rasterize several entities in the same frame
+
+    Returns
+    -------
+    mask_slice : tuple of slice
+        `(rows, cols)` slice of the mask in image coordinates. Can contain
+        negative starts, if the contours are close to the image border
+    mask : ndarray
+        bool mask of the shape given by `mask_slice`, or `None` if the
+        contours have no points
+    """
+    if bbox is None:
+        bbox = contours_bbox(contours)
+    if bbox is None:
+        return None, None
+
+    (xmin, ymin), (xmax, ymax) = bbox
+    xmin, ymin = xmin - pad, ymin - pad
+    xmax, ymax = xmax + pad, ymax + pad
+    canvas = np.zeros((ymax - ymin + 1, xmax - xmin + 1), np.uint8)
+    fill_contours(canvas, contours, 1, offset=(-xmin, -ymin))
+    mask_slice = (slice(ymin, ymax + 1), slice(xmin, xmax + 1))
+    return mask_slice, canvas.astype(bool)
+
+def mask_contours(mask_slice, mask):
+    """Contours of a local mask, the inverse of `local_mask`
+
+    Parameters
+    ----------
+    mask_slice : tuple of slice
+        `(rows, cols)` slice of the mask in image coordinates
+    mask : ndarray
+        bool mask
+
+    Returns
+    -------
+    contours : list of ndarray
+        int32 arrays of `(x, y)` points with the shape `(k, 2)`, the outer
+        contour of each connected component and the contour of each of
+        its holes. Filling them with `fill_contours` restores the mask
+    """
+    rows, cols = mask_slice
+    found = cv2.findContours(mask.astype(np.uint8), cv2.RETR_CCOMP,
+                             cv2.CHAIN_APPROX_SIMPLE)
+    # OpenCV 3 returns (image, contours, hierarchy), 4 (contours, hierarchy)
+    contours = found[-2]
+    offset = np.array([cols.start, rows.start], np.int32)
+    return [cnt.reshape(-1, 2).astype(np.int32) + offset for cnt in contours]
+
+def merge_contours(contourLists, gap=0):
+    """Merges the shapes of several entities into one
+
+    All shapes are filled into their joint bounding box. They are only
+    merged, if their union, dilated by `gap`, is a single connected
+    component. The cost is linear in the number of shapes.
+
+    Parameters
+    ----------
+    contourLists : iterable
+        One list of contours per entity
+    gap : int
+        Maximal distance in pixels between shapes still considered
+        connected. The gap is closed in the merged shape. With `0` the
+        shapes must overlap or touch
+
+    Returns
+    -------
+    contours : list of ndarray or None
+        Contours of the merged shape, `None` if the shapes are not
+        connected or have no points
+    """
+    contours = [np.asarray(cnt).reshape(-1, 2) for contours in contourLists \
+                for cnt in contours]
+    bbox = contours_bbox(contours)
+    if bbox is None:
+        return None
+
+    mask_slice, union = local_mask(contours, pad=gap + 1, bbox=bbox)
+    union = union.astype(np.uint8)
+    if gap > 0:
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE,
+                                           (2 * gap + 1, 2 * gap + 1))
+        connected = cv2.dilate(union, kernel)
+    else:
+        connected = union
+
+    n_labels, _ = cv2.connectedComponents(connected, connectivity=8)
+    # label 0 is the background
+    if n_labels != 2:
+        return None
+
+    if gap > 0:
+        union |= cv2.morphologyEx(union, cv2.MORPH_CLOSE, kernel)
+
+    return mask_contours(mask_slice, union.astype(bool))
+
+def _clipped(mask_slice, shape):
+    """Part of a mask slice within the canvas shape
+
+    Returns
+    -------
+    canvas_slice : tuple of slice
+        Slice of the canvas or `None`, if the mask is outside of it
+    crop : tuple of slice
+        The same region in mask coordinates
+    """
+    rows, cols = mask_slice
+    r0, r1 = max(rows.start, 0), min(rows.stop, shape[0])
+    c0, c1 = max(cols.start, 0), min(cols.stop, shape[1])
+    if r0 >= r1 or c0 >= c1:
+        return None, None
+    crop = (slice(r0 - rows.start, r1 - rows.start),
+            slice(c0 - cols.start, c1 - cols.start))
+    return (slice(r0, r1), slice(c0, c1)), crop
+
+def rasterize(canvas, contourLists, values, stroke=0, mode='set',
+              offset=(0, 0)):
+    """Draws filled contours of many entities inplace into a canvas
+
+    Parameters
+    ----------
+    canvas : ndarray
+        Contiguous array with the shape `(y, x)` or `(y, x, c)`. Drawing
+        is done directly by cv2 for `c <= 4` channels
+    contourLists : iterable
+        One list of contours per entity, e.g. a ContourStore
+    values : iterable
+        One value or colour per entity in `contourLists`
+    stroke : int
+        Stroke width in pixels, see `entitytools.draw_entities`
+    mode : str either `set` or `add`
+        With `set` the entities are drawn over each other in order, with
+        `add` the values are added to the canvas
+    offset : tuple of int
+        `(dx, dy)` added to each point before drawing, e.g. to draw into
+        an image tile
+
+    Returns
+    -------
+    canvas : ndarray
+        The canvas drawn into
+    """
+    if not mode in ('set', 'add'):
+        raise ValueError('Invalid mode: {}'.format(mode))
+
+    direct = canvas.ndim == 2 or canvas.shape[2] <= 4
+    for contours, value in zip(contourLists, values):
+        # cv2 clips polygons at the canvas border, which moves their
+        # edges. Crossing contours are drawn unclipped into a local mask,
+        # so e.g. tiles of an image match the whole image drawn at once
+        drawSet = mode == 'set' and direct and \
+            _inside(contours, stroke_margin(stroke), offset, canvas.shape)
+        if drawSet and stroke == 0:
+            fill_contours(canvas, contours, value, offset)
+        elif drawSet and stroke > 0:
+            stroke_contours(canvas, contours, 0, 2 * stroke + 1, offset)
+            fill_contours(canvas, contours, value, offset)
+        else:
+            _rasterizeMasked(canvas, contours, value, stroke, mode, offset)
+
+    return canvas
+
+def _inside(contours, pad, offset, shape):
+    """Whether the contours, padded by pad, lie within a canvas of shape
+    """
+    bbox = contours_bbox(contours)
+    if bbox is None:
+        return True
+    (xmin, ymin), (xmax, ymax) = bbox + np.asarray(offset, np.int64)
+    return xmin - pad >= 0 and ymin - pad >= 0 and \
+        xmax + pad < shape[1] and ymax + pad < shape[0]
+
+def _rasterizeMasked(canvas, contours, value, stroke, mode, offset):
+    """Fallback for modes or canvases cv2 can not draw into directly and
+    contours crossing the canvas border
+    """
+    dx, dy = offset
+    contours = [np.asarray(cnt).reshape(-1, 2) + (dx, dy) for cnt in contours]
+    mask_slice, inner = local_mask(contours, pad=stroke_margin(stroke))
+    if inner is None:
+        return
+
+    if mode == 'set' and stroke != 0:
+        rows, cols = mask_slice
+        outline = np.zeros(inner.shape, np.uint8)
+        stroke_contours(outline, contours, 1, 2 * abs(stroke) + 1,
+                        offset=(-cols.start, -rows.start))
+        outline = outline.astype(bool) & ~inner
+
+    # cropped only after drawing the whole contours
+    canvas_slice, crop = _clipped(mask_slice, canvas.shape)
+    if canvas_slice is None:
+        return
+    inner = inner[crop]
+
+    if mode == 'add':
+        canvas[canvas_slice][inner] += value
+    elif stroke == 0:
+        canvas[canvas_slice][inner] = value
+    elif stroke > 0:
+        canvas[canvas_slice][outline[crop]] = 0
+        canvas[canvas_slice][inner] = value
+    else:
+        canvas[canvas_slice][outline[crop]] = value
@@ -0,0 +1,111 @@
+"""Renders 50k entities once with one GFX-like item per entity and once
+with the EntityLayer, and times an opacity change for both.
+
+Run with `QT_QPA_PLATFORM=offscreen` on machines without display.
+"""
+import time
+import uuid
+
+import numpy as np
+from AnyQt.QtCore import QRectF
+from AnyQt.QtGui import QImage, QPainter
+from AnyQt.QtWidgets import (QApplication, QGraphicsScene, QGraphicsItem,
+                             QStyleOptionGraphicsItem as SOGI)
+
+from inspectorcell.graphics import EntityLayer, ColorManager
+from inspectorcell.graphics.gfx import arrayToPolygon
+
+N_ENTITIES = 50000
+N_POINTS = 40
+EXTENT = 20000
+
+
+class FakeEntity():
+    """Duck types the parts of Entity used by EntityLayer
+    """
+
+    def __init__(self, center, radius):
+        angles = np.linspace(0, 2 * np.pi, N_POINTS, endpoint=False)
+        points = np.stack([np.cos(angles), np.sin(angles)], 1) * radius
+        points = np.round(points + center)
+        self.eid = uuid.uuid4()
+        self.polygons = [arrayToPolygon(points)]
+        (xmin, ymin), (xmax, ymax) = points.min(0), points.max(0)
+        self.boundingbox = QRectF(xmin, ymin, xmax - xmin, ymax - ymin)
+
+
+class PerItem(QGraphicsItem):
+    """Stand-in for GFX, sets pen and brush for every item
+    """
+
+    def __init__(self, entity, styles):
+        super().__init__()
+        self.entity = entity
+        self.styles = styles
+
+    def boundingRect(self):
+        return self.entity.boundingbox
+
+    def paint(self, painter, *args):
+        style = self.styles[0]
+        painter.setPen(style.pen)
+        painter.setBrush(style.brush)
+        for poly in self.entity.polygons:
+            painter.drawPolygon(poly)
+
+
+def render(scene, repeat=5):
+    image = QImage(1024, 1024, QImage.Format_ARGB32_Premultiplied)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        painter = QPainter(image)
+        scene.render(painter, QRectF(0, 0, 1024, 1024),
+                     QRectF(0, 0, EXTENT, EXTENT))
+        painter.end()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    app = QApplication([])
+    colorManager = ColorManager()
+    styles = colorManager.defaults
+
+    rng = np.random.default_rng(0)
+    centers = rng.uniform(0, EXTENT, (N_ENTITIES, 2))
+    radii = rng.uniform(5, 20, N_ENTITIES)
+    entities = [FakeEntity(ctr, rad) for ctr, rad in zip(centers, radii)]
+
+    itemScene = QGraphicsScene()
+    items = [PerItem(ent, styles) for ent in entities]
+    for item in items:
+        itemScene.addItem(item)
+
+    layerScene = QGraphicsScene()
+    layer = EntityLayer()
+    layerScene.addItem(layer)
+    for ent in entities:
+        layer.addEntity(ent, styles)
+
+    print('Entities', N_ENTITIES)
+    print('Render per item     {:.4f}s'.format(render(itemScene)))
+    print('Render layer, cold  {:.4f}s'.format(render(layerScene, 1)))
+    print('Render layer, warm  {:.4f}s'.format(render(layerScene)))
+
+    start = time.perf_counter()
+    colorManager.changeOpacity(50)
+    for item in items:
+        item.update()
+    print('Opacity per item    {:.4f}s'.format(
+        time.perf_counter() - start + render(itemScene, 1)))
+
+    start = time.perf_counter()
+    colorManager.changeOpacity(100)
+    layer.update()
+    print('Opacity layer       {:.4f}s'.format(
+        time.perf_counter() - start + render(layerScene, 1)))
+
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Compares the per point conversion between contours and QPolygonF with
+the buffer based one in graphics.gfx
+"""
+import timeit
+
+setup = """
+import numpy as np
+from AnyQt.QtCore import QPointF
+from AnyQt.QtGui import QPolygonF
+
+from inspectorcell.graphics.gfx import arrayToPolygon, polygonToArray
+
+angles = np.linspace(0, 2 * np.pi, {n_points}, endpoint=False)
+contour = np.stack([np.cos(angles), np.sin(angles)], 1) * 1000 + 1000
+contour = contour.astype(np.int32)
+polygon = arrayToPolygon(contour)
+
+def loop_to_polygon():
+    poly = QPolygonF()
+    for x, y in contour:
+        poly << QPointF(x, y)
+    return poly
+
+def loop_to_array():
+    n_points = len(polygon)
+    cnt = np.empty([n_points, 2], dtype=np.int32)
+    for i in range(n_points):
+        cnt[i, 0] = polygon[i].x()
+        cnt[i, 1] = polygon[i].y()
+    return cnt
+
+def buffer_to_polygon():
+    return arrayToPolygon(contour)
+
+def buffer_to_array():
+    return polygonToArray(polygon).astype(np.int32)
+"""
+
+for n_points in (100, 1000, 10000):
+    print('Points', n_points)
+    for stmt in ('loop_to_polygon()', 'buffer_to_polygon()',
+                 'loop_to_array()', 'buffer_to_array()'):
+        perf = timeit.timeit(stmt=stmt, setup=setup.format(n_points=n_points),
+                             number=100)
+        print('  {:20s} {:.4f}'.format(stmt, perf))
@@ -12,7 +12,8 @@ class ViewContext():
     """
 
     __slots__ = ['rows', 'cols', 'cross', 'backgrounds', 'enhancments',
-                 'globalAlpha', 'foregrounds', '_key']
+                 'filters', 'composites', 'globalAlpha', 'foregrounds',
+                 '_key']
 
     def __init__(self, key=None):
         self._key = key
@@ -43,6 +44,16 @@ class ViewContext():
         #   value: enhancement values
         self.enhancments = {}
 
+        # filter chains key-value-store, see util.filters
+        #     key: name
+        #   value: tuple of filters
+        self.filters = {}
+
+        # composite backgrounds key-value-store.
+        #     key: channel index
+        #   value: dict with the blended image 'names' and 'blend' mode
+        self.composites = {}
+
     def __getitem__(self, key):
         """Mimic dict getitem
         """
@@ -79,9 +90,12 @@ class ViewContext():
                'cross': self.cross,
                'globalAlpha': self.globalAlpha,
                'enhancments': self.enhancments,
+               'filters': {k: [list(flt) for flt in v]
+                           for k, v in self.filters.items()},
                # 'enhancments': {str(k):v for k,v in  self.enhancments.items()},
                'backgrounds': list(self.backgrounds.items()),
                'foregrounds': list(self.foregrounds.items()),
+               'composites': list(self.composites.items()),
                }
         return ret
 
@@ -90,9 +104,12 @@ class ViewContext():
         self.cols  = other['cols']
         self.cross = other['cross']
         self.enhancments = other['enhancments']
+        self.filters = {k: tuple(tuple(flt) for flt in v)
+                        for k, v in other.get('filters', {}).items()}
         # self.enhancments = {eval(k):v for k, v in other['enhancments'].items()}
         self.backgrounds = {tuple(k):v for k, v in other['backgrounds']}
         self.foregrounds = {tuple(k):v for k, v in other['foregrounds']}
+        self.composites = {tuple(k):v for k, v in other.get('composites', [])}
 
 class ViewContextManager():
     """Proxis all calls to different ViewContexts
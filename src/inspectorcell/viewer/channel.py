@@ -19,10 +19,94 @@ from AnyQt.QtWidgets import (QGraphicsRectItem, QGraphicsTextItem, QRubberBand,
 from pyqtgraph import Point
 
 from ..event import ResetZoomEvent, ZoomEvent
-from .image import BackgroundImage
+from .pyramid import TiledBackgroundImage
+from .tilefilter import filteredTileCache
 from .label import ChannelLabel
 
 
+class RepaintScheduler(qc.QObject):
+    """Collects dirty rects of a widget and repaints their union at most
+    once per frame
+
+    Parameters
+    ----------
+    widget : QWidget
+        Widget to repaint, e.g. the viewport of a view
+    interval : int
+        Minimal time between repaints in ms
+    """
+
+    def __init__(self, widget, interval=16, parent=None):
+        super().__init__(parent)
+        self._widget = widget
+        self._region = qg.QRegion()
+
+        self._timer = qc.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self._flush)
+
+    def schedule(self, rect=None):
+        """Marks rect, in device coordinates, as dirty. None marks the
+        whole widget
+        """
+        if rect is None:
+            rect = self._widget.rect()
+        elif isinstance(rect, qc.QRectF):
+            rect = rect.toAlignedRect()
+        if rect.isEmpty():
+            return
+        self._region += rect
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _flush(self):
+        region, self._region = self._region, qg.QRegion()
+        if not region.isEmpty():
+            self._widget.update(region)
+
+
+class RangeModel(qc.QObject):
+    """View range shared by synchronized channels
+
+    Range changes are collected and published at most once per interval.
+    Channels apply the latest range lazily, right before they are
+    painted next, see `Channel.setRangeModel`
+
+    Parameters
+    ----------
+    interval : int
+        Minimal time between published changes in ms
+    """
+
+    # version of the published range
+    sigChanged = qc.pyqtSignal(int)
+
+    def __init__(self, interval=16, parent=None):
+        super().__init__(parent)
+        self.range = None
+        self.source = None
+        self.version = 0
+
+        self._timer = qc.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self._publish)
+
+    def setRange(self, source, rect):
+        """Sets the range shown by source, the other channels follow with
+        the next published change
+        """
+        self.range = qc.QRectF(rect)
+        self.source = source
+        self.version += 1
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _publish(self):
+        self.sigChanged.emit(self.version)
+
+
 class Channel(pg.GraphicsView):
     """A single channel showing all objects in a scene and some channel
     dependen background
@@ -32,7 +116,8 @@ class Channel(pg.GraphicsView):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.background = BackgroundImage()
+        self.background = TiledBackgroundImage()
+        filteredTileCache().sigReady.connect(self._tileFiltered)
 
         self.enableMouse(True)
         self.setAspectLocked(True)
@@ -50,6 +135,17 @@ class Channel(pg.GraphicsView):
         self._origin = None
         self._frame = None
 
+        # foreground repaints, see updateForeground
+        self._repaint = RepaintScheduler(self.viewport(), parent=self)
+        self._lastForeground = qc.QRectF()
+
+        # synchronized range, see setRangeModel
+        self._rangeModel = None
+        self._rangeVersion = 0
+        self._rangeStale = False
+        self._applyingRange = False
+        self._filteredWindow = None
+
         # initialize last mouse pos
         self.lastMousePos = Point(0, 0)
 
@@ -68,9 +164,78 @@ class Channel(pg.GraphicsView):
         else:
             self._dynamicMouseMode = True
     
+    def setRangeModel(self, model):
+        """Follows the range of the RangeModel model. Published ranges are
+        applied just before the window is painted, so a channel is laid
+        out at most once per paint, and hidden channels not at all
+        """
+        if not self._rangeModel is None:
+            self._rangeModel.sigChanged.disconnect(self._rangeChanged)
+        self._rangeModel = model
+        if not model is None:
+            model.sigChanged.connect(self._rangeChanged)
+
+    @qc.pyqtSlot(int)
+    def _rangeChanged(self, version):
+        if self._rangeModel.source is self:
+            # the range is already shown
+            self._rangeVersion = version
+            self._rangeStale = False
+            return
+        self._rangeStale = True
+        # requests a paint, before which the range is applied
+        self.viewport().update()
+
+    def applyPendingRange(self):
+        """Applies the latest range of the RangeModel, if it is not shown
+        yet. Does not propagate the range again
+        """
+        model = self._rangeModel
+        if not self._rangeStale or model is None or model.range is None:
+            return
+        self._rangeStale = False
+        if model.version == self._rangeVersion:
+            return
+        self._rangeVersion = model.version
+        # setRange emits sigDeviceRangeChanged regardless of propagate
+        self._applyingRange = True
+        try:
+            self.setRange(model.range, padding=0, propagate=False)
+        finally:
+            self._applyingRange = False
+
+    @property
+    def isApplyingRange(self):
+        """Whether the range of the RangeModel is applied right now. Range
+        changes emitted meanwhile must not be published again
+        """
+        return self._applyingRange
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        window = self.window()
+        if not window is self._filteredWindow:
+            if not self._filteredWindow is None:
+                self._filteredWindow.removeEventFilter(self)
+            window.installEventFilter(self)
+            self._filteredWindow = window
+        self.applyPendingRange()
+
+    def eventFilter(self, obj, event):
+        # the window paints all dirty widgets on UpdateRequest. Changing the
+        # range before marks the viewport dirty within the same paint
+        if event.type() == qc.QEvent.UpdateRequest and self.isVisible():
+            self.applyPendingRange()
+        return super().eventFilter(obj, event)
+
+    def paintEvent(self, event):
+        # fallback, if the range was not applied on the UpdateRequest
+        self.applyPendingRange()
+        super().paintEvent(event)
+
     def drawBackground(self, painter, rect):
         super().drawBackground(painter, rect)
-        self.background.paint(painter)
+        self.background.paint(painter, rect)
 
     def drawForeground(self, painter, rect):
         # super().drawForeground(painter, rect)
@@ -95,6 +260,11 @@ class Channel(pg.GraphicsView):
     def setHighlightFrame(self, frame):
         """sets the highlighting frame
         """
+        if frame is self._frame:
+            return None
+        # the frame runs along the edges of the view
+        self._repaint.schedule()
+
         if frame is None:
             self._frame = None
             return None
@@ -166,15 +336,36 @@ class Channel(pg.GraphicsView):
                                 qw.QGraphicsScene.BackgroundLayer)
         self.scene().update()
 
+    @qc.pyqtSlot(object, int, object, object)
+    def _tileFiltered(self, pyramid, level, rows, cols):
+        """Repaints only the tile that got filtered
+        """
+        if pyramid is self.background.pyramid:
+            rect = self.background.levelRect(level, rows, cols)
+            self.scene().invalidate(rect, qw.QGraphicsScene.BackgroundLayer)
+
+    def foregroundRect(self):
+        """Device rect covered by crosshair, infobox and label
+        """
+        rect = qc.QRectF()
+        if self.chanLabel.isVisible():
+            rect = rect.united(self.chanLabel.boundingRect())
+        if not self._infoBox is None:
+            rect = rect.united(self._infoBox.deviceRect())
+        if not self._crossHair is None:
+            transf = self.transform()
+            rect = rect.united(
+                self._crossHair.deviceRect((transf.m11(), transf.m22())))
+        return rect
+
     def updateForeground(self):
-        """Triggers update of scene, only in the areas where
-        foreground elements are located
+        """Schedules a repaint of the areas foreground elements are
+        located in, before and after they changed. Repaints are coalesced
+        per frame and only affect this channel
         """
-        # TODO not hole scene, but only the relevant areas
-        # infobox mapped to scene and text mapped to scene
-        self.scene().invalidate(self.range,
-                                qw.QGraphicsScene.ForegroundLayer)
-        self.scene().update()
+        rect = self.foregroundRect()
+        self._repaint.schedule(self._lastForeground.united(rect))
+        self._lastForeground = rect
 
     def mousePressEvent(self, ev):
         #XXX unify usage. For now overwriting modes on the fly
@@ -6,11 +6,18 @@ class ContextMenu(qw.QMenu):
     sigSelected = qc.pyqtSignal(str, str)
     sigShowItems = qc.pyqtSignal(bool)
     sigEnhanceSelected = qc.pyqtSignal()
+    sigCompositeBlend = qc.pyqtSignal(str)
 
     def __init__(self):
         super().__init__()
 
         menuBg = self.addMenu('Select &Background...')
+        menuComposite = self.addMenu('&Composite...')
+
+        self.compositeMax = self.addAction(
+            'Composite &max blend', self.compositeBlendChanged)
+        self.compositeMax.setCheckable(True)
+        self.compositeMax.setChecked(False)
 
         self.addSeparator()
 
@@ -40,6 +47,7 @@ class ContextMenu(qw.QMenu):
         # self.alpha_slider.valueChanged.connect(self._new_alpha)
 
         self._menus = {'channelBg': menuBg,
+                       'composite': menuComposite,
                        'tags': menuTag,}
 
     def updateSelection(self, names, selector):
@@ -71,11 +79,25 @@ class ContextMenu(qw.QMenu):
     def updateVisible(self, isVisible):
         self.showItems.setChecked(isVisible)
 
+    def updateComposite(self, names, blend='add'):
+        """checks the images blended in the composite of the clicked
+        channel
+        """
+        for action in self._menus['composite'].actions():
+            action.setCheckable(True)
+            action.setChecked(action.callbackInfo[1] in names)
+        self.compositeMax.setChecked(blend == 'max')
+
     @qc.pyqtSlot()
     def onSelection(self):
         aName, selector = self.sender().callbackInfo
         self.sigSelected.emit(selector, aName)
 
+    @qc.pyqtSlot()
+    def compositeBlendChanged(self):
+        self.sigCompositeBlend.emit(
+            'max' if self.compositeMax.isChecked() else 'add')
+
     @qc.pyqtSlot()
     def showItemsChanged(self):
         self.sigShowItems.emit(self.showItems.isChecked())
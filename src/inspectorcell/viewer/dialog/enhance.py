@@ -3,17 +3,31 @@
 import AnyQt.QtCore as qc
 import AnyQt.QtGui as qg
 import AnyQt.QtWidgets as qw
+import numpy as np
+import pyqtgraph as pg
 
 from ...util import Enhancer
 
 
 class EnhanceHistDialog(qw.QDialog):
 
-    def __init__(self, callback, parent=None):
+    def __init__(self, callback, filterCallback=None, parent=None):
         super().__init__(parent=parent)
         self.resize(255, 267)
 
         self.callback = callback
+        self.filterCallback = filterCallback
+
+        # slider changes are coalesced and passed to callback at most once
+        # per interval. While a slider is dragged, they are passed as draft
+        self._throttle = qc.QTimer(self)
+        self._throttle.setSingleShot(True)
+        self._throttle.setInterval(30)
+        self._pending = None
+
+        # auto contrast from the histogram of the shown image
+        self.enhancer = Enhancer()
+        self.histogram = None
 
         self._build_ui()
         self._connect()
@@ -24,9 +38,48 @@ class EnhanceHistDialog(qw.QDialog):
         """
         self.adjust.min_slide.setValue(minVal)
         self.adjust.max_slide.setValue(maxVal)
+        self.hist.min_line.setValue(minVal)
+        self.hist.max_line.setValue(maxVal)
         if not name is None:
             self.setWindowTitle(name)
 
+    def setHistogram(self, hist, bins=256):
+        """Shows the 16 bit histogram hist, as returned by
+        `util.image.imageHistogram`, and uses it for auto contrast.
+        Without histogram, auto contrast is disabled
+        """
+        self.histogram = hist
+        self.adjust.auto.setEnabled(not hist is None)
+        if hist is None:
+            self.hist.curve.setData([0, 1], [0])
+            return
+
+        # summing neighbouring bins is O(bins), log counts to see the tails
+        counts = np.asarray(hist).reshape(bins, -1).sum(1)
+        edges = np.linspace(0, len(hist), bins + 1)
+        self.hist.curve.setData(edges, np.log1p(counts))
+
+    def _get_hist_plot(self):
+        plot = pg.PlotWidget(parent=self)
+        plot.setMinimumHeight(80)
+        plot.hideAxis('left')
+        plot.setMouseEnabled(False, False)
+        plot.setMenuEnabled(False)
+        plot.hideButtons()
+        plot.setXRange(0, 0xffff, padding=0)
+
+        plot.curve = pg.PlotCurveItem(
+            [0, 1], [0], stepMode=True, fillLevel=0,
+            brush=(160, 160, 160, 150))
+        plot.addItem(plot.curve)
+
+        plot.min_line = pg.InfiniteLine(0, angle=90, pen='#10AA00')
+        plot.max_line = pg.InfiniteLine(0xffff, angle=90, pen='#E62B38')
+        plot.addItem(plot.min_line)
+        plot.addItem(plot.max_line)
+
+        return plot
+
     def _get_adjust_slide(self, parent, value=0xffff, vmin=0,
                           vmax=0xffff, step=10, page=100):
         layout = qw.QHBoxLayout()
@@ -90,9 +143,49 @@ class EnhanceHistDialog(qw.QDialog):
 
         return gbox
 
+    def updateFilters(self, filters):
+        """Sets the filter controls to the filter chain, see
+        `util.filters`, without passing it to filterCallback
+        """
+        params = {name: values for name, *values in filters}
+        clahe = self.clahe
+        widgets = [clahe.apply, clahe.clip, clahe.win_size, clahe.gamma_apply,
+                   clahe.gamma, clahe.sub_apply, clahe.radius]
+        for widget in widgets:
+            widget.blockSignals(True)
+
+        clahe.apply.setChecked('clahe' in params)
+        if 'clahe' in params:
+            clahe.clip.setValue(params['clahe'][0])
+            clahe.win_size.setValue(params['clahe'][1])
+        clahe.gamma_apply.setChecked('gamma' in params)
+        if 'gamma' in params:
+            clahe.gamma.setValue(params['gamma'][0])
+        clahe.sub_apply.setChecked('subtract' in params)
+        if 'subtract' in params:
+            clahe.radius.setValue(params['subtract'][0])
+
+        for widget in widgets:
+            widget.blockSignals(False)
+
+    def filters(self):
+        """Filter chain set in the dialog, background subtraction first and
+        gamma last
+        """
+        clahe = self.clahe
+        filters = []
+        if clahe.sub_apply.isChecked():
+            filters.append(('subtract', clahe.radius.value()))
+        if clahe.apply.isChecked():
+            filters.append(('clahe', clahe.clip.value(),
+                            clahe.win_size.value()))
+        if clahe.gamma_apply.isChecked():
+            filters.append(('gamma', clahe.gamma.value()))
+        return tuple(filters)
+
     def _get_clahe_box(self):
         gbox = qw.QGroupBox(self)
-        gbox.setTitle('CLAHE')
+        gbox.setTitle('Filters')
 
         win_label = qw.QLabel(gbox)
         win_label.setText('Size')
@@ -100,6 +193,7 @@ class EnhanceHistDialog(qw.QDialog):
         win_box.setMinimum(8)
         win_box.setMaximum(512)
         win_box.setSingleStep(8)
+        win_box.setProperty('value', 64)
 
         clip_label = qw.QLabel(gbox)
         clip_label.setText('Clip')
@@ -108,23 +202,57 @@ class EnhanceHistDialog(qw.QDialog):
         clip_box.setSingleStep(0.1)
         clip_box.setProperty('value', 2.0)
 
-        # apply_label = qw.QLabel(gbox)
-        # apply_label.setText('Apply')
-        # apply_box = qw.QCheckBox(gbox)
+        apply_label = qw.QLabel(gbox)
+        apply_label.setText('CLAHE')
+        apply_box = qw.QCheckBox(gbox)
+
+        gamma_label = qw.QLabel(gbox)
+        gamma_label.setText('Gamma')
+        gamma_apply = qw.QCheckBox(gbox)
+        gamma_box = qw.QDoubleSpinBox(gbox)
+        gamma_box.setMinimum(0.1)
+        gamma_box.setMaximum(5.0)
+        gamma_box.setSingleStep(0.1)
+        gamma_box.setProperty('value', 1.0)
+        gamma_layout = qw.QHBoxLayout()
+        gamma_layout.addWidget(gamma_apply)
+        gamma_layout.addWidget(gamma_box)
+
+        sub_label = qw.QLabel(gbox)
+        sub_label.setText('Subtract BG')
+        sub_apply = qw.QCheckBox(gbox)
+        radius_box = qw.QSpinBox(gbox)
+        radius_box.setMinimum(1)
+        radius_box.setMaximum(256)
+        radius_box.setProperty('value', 25)
+        radius_box.setSuffix(' px')
+        sub_layout = qw.QHBoxLayout()
+        sub_layout.addWidget(sub_apply)
+        sub_layout.addWidget(radius_box)
 
         form = qw.QFormLayout(gbox)
-        form.setWidget(0, qw.QFormLayout.LabelRole, win_label)
-        form.setWidget(0, qw.QFormLayout.FieldRole, win_box)
+        form.setWidget(0, qw.QFormLayout.LabelRole, apply_label)
+        form.setWidget(0, qw.QFormLayout.FieldRole, apply_box)
+
+        form.setWidget(1, qw.QFormLayout.LabelRole, win_label)
+        form.setWidget(1, qw.QFormLayout.FieldRole, win_box)
+
+        form.setWidget(2, qw.QFormLayout.LabelRole, clip_label)
+        form.setWidget(2, qw.QFormLayout.FieldRole, clip_box)
 
-        form.setWidget(1, qw.QFormLayout.LabelRole, clip_label)
-        form.setWidget(1, qw.QFormLayout.FieldRole, clip_box)
+        form.setWidget(3, qw.QFormLayout.LabelRole, gamma_label)
+        form.setLayout(3, qw.QFormLayout.FieldRole, gamma_layout)
 
-        form.setWidget(2, qw.QFormLayout.LabelRole, apply_label)
-        form.setWidget(2, qw.QFormLayout.FieldRole, apply_box)
+        form.setWidget(4, qw.QFormLayout.LabelRole, sub_label)
+        form.setLayout(4, qw.QFormLayout.FieldRole, sub_layout)
 
         gbox.win_size = win_box
         gbox.clip = clip_box
-        # gbox.apply = apply_box
+        gbox.apply = apply_box
+        gbox.gamma = gamma_box
+        gbox.gamma_apply = gamma_apply
+        gbox.radius = radius_box
+        gbox.sub_apply = sub_apply
 
         return gbox
 
@@ -133,15 +261,18 @@ class EnhanceHistDialog(qw.QDialog):
         self.vert_layout = qw.QVBoxLayout(self)
         self.setLayout(self.vert_layout)
 
+        self.hist = self._get_hist_plot()
         self.adjust = self._get_adjust_box()
-        # self.clahe = self._get_clahe_box()
+        self.adjust.auto.setEnabled(False)
+        self.clahe = self._get_clahe_box()
 
         self.button_box = qw.QDialogButtonBox(self)
         self.button_box.setOrientation(qc.Qt.Horizontal)
         self.button_box.setStandardButtons(qw.QDialogButtonBox.Ok)
 
+        self.vert_layout.addWidget(self.hist)
         self.vert_layout.addWidget(self.adjust)
-        # self.vert_layout.addWidget(self.clahe)
+        self.vert_layout.addWidget(self.clahe)
         self.vert_layout.addWidget(self.button_box)
 
         self.button_box.accepted.connect(self.accept)
@@ -149,7 +280,20 @@ class EnhanceHistDialog(qw.QDialog):
     def _connect(self):
         self.adjust.min_slide.valueChanged.connect(self._adjust)
         self.adjust.max_slide.valueChanged.connect(self._adjust)
-        # self.adjust.auto.clicked.connect(self._adjust_auto)
+        self.adjust.min_slide.sliderReleased.connect(self._release)
+        self.adjust.max_slide.sliderReleased.connect(self._release)
+        self._throttle.timeout.connect(self._emitPending)
+        self.adjust.auto.clicked.connect(self._adjust_auto)
+
+        clahe = self.clahe
+        for box in (clahe.apply, clahe.gamma_apply, clahe.sub_apply):
+            box.toggled.connect(self._filter)
+        for box in (clahe.clip, clahe.win_size, clahe.gamma, clahe.radius):
+            box.editingFinished.connect(self._filter)
+
+    def _dragging(self):
+        return self.adjust.min_slide.isSliderDown() or \
+            self.adjust.max_slide.isSliderDown()
 
     @qc.pyqtSlot()
     def _adjust(self):
@@ -161,16 +305,39 @@ class EnhanceHistDialog(qw.QDialog):
             minVal = maxVal - 1
         self.updateGui(minVal, maxVal)
 
-        self.callback(minVal, maxVal)
+        self._pending = (minVal, maxVal)
+        if not self._throttle.isActive():
+            self._throttle.start()
 
-    # @qc.pyqtSlot()
-    # def _adjust_auto(self):
-    #     img = self.img_item
-    #     enhancer = self.enhancer
-    #     
-    #     enhancer.adjust_from = enhancer.get_autobounds(img.image)
+    @qc.pyqtSlot()
+    def _emitPending(self):
+        if self._pending is None:
+            return
+        minVal, maxVal = self._pending
+        self._pending = None
+        self.callback(minVal, maxVal, draft=self._dragging())
 
-    #     self.set_controls()
+    @qc.pyqtSlot()
+    def _release(self):
+        """Applies the final values at full resolution
+        """
+        self._throttle.stop()
+        self._pending = None
+        minVal = self.adjust.min_slide.value()
+        maxVal = self.adjust.max_slide.value()
+        self.callback(minVal, maxVal, draft=False)
 
-    #     self._adjust()
+    @qc.pyqtSlot()
+    def _filter(self):
+        if not self.filterCallback is None:
+            self.filterCallback(self.filters())
 
+    @qc.pyqtSlot()
+    def _adjust_auto(self):
+        """Sets the bounds to the 0.1 and 99.9 percentiles of the histogram
+        """
+        if self.histogram is None:
+            return
+        minVal, maxVal = self.enhancer.getAutoBounds(self.histogram)
+        self.updateGui(minVal, maxVal)
+        self._release()
@@ -0,0 +1,99 @@
+"""Loads background images off the GUI thread
+"""
+# GUI stuff
+from AnyQt import QtCore as qc
+
+# project
+from ..util.image import imageCache, readPreview
+
+
+class _LoadTask(qc.QRunnable):
+    """Reads preview and full resolution image of one channel
+    """
+
+    def __init__(self, loader, index, name, path, generation):
+        super().__init__()
+        self._loader = loader
+        self._args = (index, name, generation)
+        self._path = path
+
+    def run(self):
+        loader = self._loader
+        index, name, generation = self._args
+        if not loader.isCurrent(index, generation):
+            return
+
+        try:
+            if not self._path in imageCache:
+                preview = readPreview(self._path)
+                if not preview is None and \
+                        loader.isCurrent(index, generation):
+                    image, extent = preview
+                    loader._result.emit(self._args + (image, extent))
+
+            # cancelled while the preview was read
+            if not loader.isCurrent(index, generation):
+                return
+            image = imageCache.get(self._path)
+            if not loader.isCurrent(index, generation):
+                return
+            # ready for auto contrast, before it is asked for
+            imageCache.histogram(self._path)
+        except Exception as err:
+            loader._failed.emit(self._args + (self._path, err))
+            return
+
+        height, width = image.shape[:2]
+        loader._result.emit(self._args + (image, (width, height)))
+
+
+class ImageLoader(qc.QObject):
+    """Loads images for channels in a thread pool
+
+    A preview is delivered first, if the image allows to read one cheaply,
+    then the full resolution image. Each new load for a channel cancels
+    the previous one, stale results are never delivered.
+    """
+
+    # channel index, image name, image, extent
+    sigLoaded = qc.pyqtSignal(object, str, object, object)
+    # channel index, image name, path, error message
+    sigFailed = qc.pyqtSignal(object, str, object, str)
+
+    # results from the workers, handed to the GUI thread
+    _result = qc.pyqtSignal(object)
+    _failed = qc.pyqtSignal(object)
+
+    def __init__(self, parent=None, maxThreads=2):
+        super().__init__(parent)
+        self._pool = qc.QThreadPool(self)
+        self._pool.setMaxThreadCount(maxThreads)
+        self._generations = {}
+
+        self._result.connect(self._deliver)
+        self._failed.connect(self._deliverFailure)
+
+    def isCurrent(self, index, generation):
+        return self._generations.get(index) == generation
+
+    def load(self, index, name, path):
+        """Starts loading the image at path for the channel at index
+        """
+        generation = self._generations.get(index, 0) + 1
+        self._generations[index] = generation
+        self._pool.start(_LoadTask(self, index, name, path, generation))
+
+    def cancel(self, index):
+        """Drops any pending load for the channel at index
+        """
+        self._generations[index] = self._generations.get(index, 0) + 1
+
+    def _deliver(self, result):
+        index, name, generation, image, extent = result
+        if self.isCurrent(index, generation):
+            self.sigLoaded.emit(index, name, image, extent)
+
+    def _deliverFailure(self, result):
+        index, name, generation, path, err = result
+        if self.isCurrent(index, generation):
+            self.sigFailed.emit(index, name, path, str(err))
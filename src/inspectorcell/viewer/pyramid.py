@@ -0,0 +1,380 @@
+"""Tiled multi-resolution background images
+
+Instead of rendering the full resolution image into one QImage, the image
+is kept as a pyramid of downsampled levels. Only the tiles visible at the
+current zoom are rendered, with the active lookup table applied per tile,
+and kept in a LRU cache.
+
+Images are kept in the row-major layout `image[y, x]` they are decoded
+in, so neither the pyramid nor the tiles need oriented copies.
+"""
+# built-ins
+from collections import OrderedDict
+import math
+import threading
+import weakref
+
+import warnings
+
+# extern
+import cv2
+import numpy as np
+
+# GUI Stuff
+from AnyQt import QtCore as qc, QtGui as qg
+from AnyQt.QtWidgets import QStyleOptionGraphicsItem as SOGI
+
+# project
+from .tilefilter import filteredTileCache
+
+
+class ImagePyramid():
+    """Lazily computed downsampled levels of an image
+
+    Parameters
+    ----------
+    image : ndarray
+        2D image with the shape `(rows, cols)`
+    minSize : int
+        No level smaller than minSize along both axes is made
+    """
+
+    def __init__(self, image, minSize=256):
+        self._levels = [image]
+        self._lock = threading.Lock()
+        self.minSize = minSize
+
+        rows, cols = image.shape[:2]
+        self.levelCount = 1
+        while max(rows, cols) > minSize:
+            rows, cols = math.ceil(rows / 2), math.ceil(cols / 2)
+            self.levelCount += 1
+
+    @property
+    def shape(self):
+        return self._levels[0].shape
+
+    def level(self, index):
+        """Image downsampled by `2 ** index`, computed on first access
+        from the next finer level with area interpolation
+        """
+        index = min(max(index, 0), self.levelCount - 1)
+        if index < len(self._levels):
+            return self._levels[index]
+        # levels are also read by the workers filtering tiles
+        with self._lock:
+            while len(self._levels) <= index:
+                finer = self._levels[-1]
+                rows, cols = finer.shape[:2]
+                # cv2 sizes are (cols, rows)
+                dsize = (math.ceil(cols / 2), math.ceil(rows / 2))
+                self._levels.append(
+                    cv2.resize(finer, dsize, interpolation=cv2.INTER_AREA))
+        return self._levels[index]
+
+    def levelForLod(self, lod):
+        """Coarsest level with at least one image pixel per screen pixel
+
+        Parameters
+        ----------
+        lod : float
+            Screen pixels per image pixel of the full resolution image
+        """
+        if lod <= 0:
+            return self.levelCount - 1
+        index = int(math.floor(math.log2(1 / lod))) if lod < 1 else 0
+        return min(max(index, 0), self.levelCount - 1)
+
+
+_pyramids = weakref.WeakValueDictionary()
+
+def sharedPyramid(image, minSize=256):
+    """ImagePyramid of image, shared by all channels showing the very same
+    array, e.g. from the ImageCache
+    """
+    key = (id(image), minSize)
+    pyramid = _pyramids.get(key)
+    # the pyramid keeps image alive, so its id can not have been reused
+    if pyramid is None or not pyramid.level(0) is image:
+        pyramid = ImagePyramid(image, minSize=minSize)
+        _pyramids[key] = pyramid
+    return pyramid
+
+
+class TiledBackgroundImage():
+    """Background of a Channel, drawn from the tiles of an ImagePyramid
+
+    Parameters
+    ----------
+    tileSize : int
+        Edge length of the tiles in pixels of their level
+    cacheSize : int
+        Number of rendered tiles kept
+    draftLevels : int
+        Number of pyramid levels coarser than needed used for draft lookup
+        tables, e.g. while a contrast slider is dragged
+    """
+
+    def __init__(self, tileSize=256, cacheSize=512, draftLevels=2):
+        self.tileSize = tileSize
+        self.cacheSize = cacheSize
+        self.draftLevels = draftLevels
+
+        self.image = None
+        self.pyramid = None
+        self._extent = (0, 0)
+        self._lut = None
+        self._draft = False
+        self._filters = ()
+        self._layers = []
+        self._blend = 'add'
+        self._levels = (0, 0xffff)
+        self._bgpos = (0, 0)
+        self._tiles = OrderedDict()
+
+    def setBGPos(self, x, y):
+        self._bgpos = (x, y)
+
+    def setImage(self, image=None, extent=None):
+        """Sets a new image, `image[y, x]`, and drops all tiles
+
+        Parameters
+        ----------
+        image : ndarray
+            Image to show
+        extent : tuple
+            `(width, height)` in scene units the image is stretched to,
+            e.g. for previews of reduced resolution. Defaults to the shape
+            of image
+        """
+        self.image = image
+        self._layers = []
+        if image is None:
+            self.pyramid = None
+            self._extent = (0, 0)
+        else:
+            self.pyramid = sharedPyramid(image, minSize=self.tileSize)
+            if extent is None:
+                extent = image.shape[1], image.shape[0]
+            self._extent = tuple(extent)
+        self._tiles.clear()
+
+    @property
+    def lookupTable(self):
+        """Current lookup table, which can be handed to
+        `Enhancer.getScalingLUT` as buffer for the next one
+        """
+        return self._lut
+
+    def setLookupTable(self, lut, update=True, draft=False):
+        """Sets the lookup table applied to each tile. Rendered tiles are
+        dropped and only the visible ones are rendered again on the next
+        paint
+
+        With draft, tiles are rendered from `draftLevels` coarser levels,
+        so each change only maps a fraction of the pixels. The next lut
+        set without draft renders at full resolution again
+        """
+        self._lut = lut
+        self._draft = draft
+        self._tiles.clear()
+
+    def setComposite(self, images, luts, colours, blend='add', extent=None,
+                     draft=False):
+        """Shows several images of the same shape, blended in colour
+
+        Each image is mapped to 8 bit by its lut, scaled by its colour and
+        blended with the others per tile. Filters are not applied. Setting
+        a single image with `setImage` ends the composite
+
+        Parameters
+        ----------
+        images : list of ndarray
+            Images with the same shape. The first one defines the extent
+        luts : list of ndarray
+            Lookup table for each image, None scales the levels to 8 bit
+        colours : list
+            `(r, g, b)` colour for each image
+        blend : str either `add` or `max`
+            With `add` the colours are summed and saturate at 255, with
+            `max` the brightest colour of each pixel is kept
+        extent, draft
+            See `setImage` and `setLookupTable`
+        """
+        if not blend in ('add', 'max'):
+            raise ValueError('Invalid blend mode: {}'.format(blend))
+
+        layers = []
+        for image, lut, colour in zip(images, luts, colours):
+            if layers and image.shape[:2] != layers[0][0].shape[:2]:
+                warnings.warn('Composite layers must have the same shape')
+                continue
+            pyramid = sharedPyramid(image, minSize=self.tileSize)
+            colour = np.asarray(colour, np.float32)[:3] / 255.
+            layers.append((pyramid, lut, colour))
+
+        self.setImage(images[0] if layers else None, extent=extent)
+        self._layers = layers
+        self._blend = blend
+        self._draft = draft
+
+    @property
+    def isComposite(self):
+        return bool(self._layers)
+
+    @property
+    def filters(self):
+        return self._filters
+
+    def setFilters(self, filters):
+        """Sets the filter chain, see `util.filters`, applied to each tile
+        before the lookup table. Filtered tiles are computed by the shared
+        FilteredTileCache, until they are ready tiles are shown unfiltered
+        """
+        filters = tuple(filters)
+        if filters != self._filters:
+            self._filters = filters
+            self._tiles.clear()
+
+    def boundingRect(self):
+        if self.image is None:
+            return qc.QRectF()
+        width, height = self._extent
+        return qc.QRectF(self._bgpos[0], self._bgpos[1], width, height)
+
+    def levelRect(self, level, rows, cols):
+        """Scene rect of `pyramid.level(level)[rows, cols]`, e.g. of a tile
+        """
+        data = self.pyramid.level(level)
+        width, height = self._extent
+        scaleX, scaleY = width / data.shape[1], height / data.shape[0]
+        return qc.QRectF(self._bgpos[0] + cols.start * scaleX,
+                         self._bgpos[1] + rows.start * scaleY,
+                         (cols.stop - cols.start) * scaleX,
+                         (rows.stop - rows.start) * scaleY)
+
+    def _toUbyte(self, data, lut):
+        """Applies the lookup table lut or, without one, scales the levels
+        to 8 bit
+        """
+        if not lut is None:
+            return np.take(lut, data, mode='clip').astype(np.uint8)
+        low, up = self._levels
+        scaled = (data.astype(np.float32) - low) * (255. / (up - low))
+        return np.clip(scaled, 0, 255).astype(np.uint8)
+
+    def _renderTile(self, level, tx, ty):
+        """8 bit tile and a QImage using its buffer, and whether the tile
+        is final or still waits for its filters
+        """
+        data = self.pyramid.level(level)
+        size = self.tileSize
+        rows = slice(ty * size, min((ty + 1) * size, data.shape[0]))
+        cols = slice(tx * size, min((tx + 1) * size, data.shape[1]))
+        if self._layers:
+            return self._renderComposite(level, rows, cols)
+
+        tile, final = data[rows, cols], True
+        if self._filters:
+            filtered = filteredTileCache().tile(
+                self.pyramid, level, rows, cols, self._filters)
+            if filtered is None:
+                final = False
+            else:
+                tile = filtered
+
+        # the only copy, which is needed anyways to apply the lut
+        gray = np.ascontiguousarray(self._toUbyte(tile, self._lut))
+        rows, cols = gray.shape
+        qimage = qg.QImage(gray.ctypes.data, cols, rows, gray.strides[0],
+                           qg.QImage.Format_Grayscale8)
+        return gray, qimage, final
+
+    def _renderComposite(self, level, rows, cols):
+        """RGB tile blended from all layers, see `_renderTile`
+        """
+        shape = (rows.stop - rows.start, cols.stop - cols.start, 3)
+        blended = np.zeros(shape, np.float32)
+        coloured = np.empty(shape, np.float32)
+        for pyramid, lut, colour in self._layers:
+            gray = self._toUbyte(pyramid.level(level)[rows, cols], lut)
+            np.multiply(gray[..., None], colour, out=coloured)
+            if self._blend == 'add':
+                blended += coloured
+            else:
+                np.maximum(blended, coloured, out=blended)
+
+        rgb = np.clip(blended, 0, 255).astype(np.uint8)
+        height, width = rgb.shape[:2]
+        qimage = qg.QImage(rgb.ctypes.data, width, height, rgb.strides[0],
+                           qg.QImage.Format_RGB888)
+        return rgb, qimage, True
+
+    def tile(self, level, tx, ty):
+        """QImage of the tile at `(tx, ty)` of level, from the LRU cache
+        """
+        key = (level, tx, ty)
+        cached = self._tiles.get(key)
+        if cached is None:
+            # the array keeps the buffer of the QImage alive
+            cached = self._renderTile(level, tx, ty)
+            if not cached[2]:
+                # unfiltered placeholders are rendered again on the next
+                # paint, the copy owns its buffer once the array is gone
+                return cached[1].copy()
+            self._tiles[key] = cached
+            while len(self._tiles) > self.cacheSize:
+                self._tiles.popitem(last=False)
+        else:
+            self._tiles.move_to_end(key)
+        return cached[1]
+
+    def paint(self, painter, rect=None):
+        """Draws the visible tiles of the level matching the zoom
+
+        Parameters
+        ----------
+        painter : QPainter
+            Painter in scene coordinates
+        rect : QRectF
+            Exposed scene rect, defaults to the whole image
+        """
+        if self.pyramid is None:
+            return
+
+        bounds = self.boundingRect()
+        if rect is None:
+            rect = bounds
+        rect = rect.intersected(bounds)
+        if rect.isEmpty():
+            return
+
+        # lod in screen pixels per image pixel
+        width, height = self._extent
+        lod = SOGI.levelOfDetailFromTransform(painter.worldTransform())
+        lod *= width / self.image.shape[1]
+        level = self.pyramid.levelForLod(lod)
+        if self._draft:
+            level = min(level + self.draftLevels, self.pyramid.levelCount - 1)
+        data = self.pyramid.level(level)
+
+        # scene units per pixel of the level
+        scaleX, scaleY = width / data.shape[1], height / data.shape[0]
+        size = self.tileSize
+        x0, y0 = self._bgpos
+
+        tx0 = max(int((rect.left() - x0) / scaleX // size), 0)
+        tx1 = int((rect.right() - x0) / scaleX // size)
+        ty0 = max(int((rect.top() - y0) / scaleY // size), 0)
+        ty1 = int((rect.bottom() - y0) / scaleY // size)
+        tx1 = min(tx1, (data.shape[1] - 1) // size)
+        ty1 = min(ty1, (data.shape[0] - 1) // size)
+
+        for tx in range(tx0, tx1 + 1):
+            for ty in range(ty0, ty1 + 1):
+                qimage = self.tile(level, tx, ty)
+                target = qc.QRectF(x0 + tx * size * scaleX,
+                                   y0 + ty * size * scaleY,
+                                   qimage.width() * scaleX,
+                                   qimage.height() * scaleY)
+                painter.drawImage(target, qimage)
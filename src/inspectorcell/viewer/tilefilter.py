@@ -0,0 +1,128 @@
+"""Filtered background tiles, computed off the GUI thread
+
+Tiles are filtered per pyramid level with `util.filters.filterTile` and
+cached per image, tile and filter chain, so all channels showing the same
+image with the same filters share them.
+"""
+# built-ins
+from collections import OrderedDict
+import threading
+import warnings
+import weakref
+
+# GUI stuff
+from AnyQt import QtCore as qc
+
+# project
+from ..util.filters import filterTile, scaledFilters
+
+
+class _FilterTask(qc.QRunnable):
+    """Filters one tile of a pyramid level
+    """
+
+    def __init__(self, cache, key, pyramid, level, rows, cols, filters):
+        super().__init__()
+        self._cache = cache
+        self._key = key
+        self._args = (pyramid, level, rows, cols, filters)
+
+    def run(self):
+        pyramid, level, rows, cols, filters = self._args
+        data = pyramid.level(level)
+        try:
+            tile = filterTile(data, rows, cols,
+                              scaledFilters(filters, 2 ** level))
+        except Exception as err:
+            # shown unfiltered, instead of retrying on each paint
+            warnings.warn('Could not filter tile: {}'.format(err))
+            tile = data[rows, cols]
+        self._cache._done.emit((self._key, self._args[:4], tile))
+
+
+class FilteredTileCache(qc.QObject):
+    """LRU cache of filtered tiles, filled by a thread pool
+
+    Parameters
+    ----------
+    cacheSize : int
+        Number of filtered tiles kept
+    maxThreads : int
+        Number of tiles filtered in parallel
+    """
+
+    # pyramid, level, rows and cols of a tile that got ready
+    sigReady = qc.pyqtSignal(object, int, object, object)
+
+    # results from the workers, handed to the GUI thread
+    _done = qc.pyqtSignal(object)
+
+    def __init__(self, cacheSize=1024, maxThreads=None, parent=None):
+        super().__init__(parent)
+        self.cacheSize = cacheSize
+        self._tiles = OrderedDict()
+        self._pending = set()
+        self._lock = threading.Lock()
+
+        self._pool = qc.QThreadPool(self)
+        if not maxThreads is None:
+            self._pool.setMaxThreadCount(maxThreads)
+
+        self._done.connect(self._store)
+
+    def tile(self, pyramid, level, rows, cols, filters):
+        """Filtered tile `pyramid.level(level)[rows, cols]` or None, if it
+        is not computed yet. Then it is queued and sigReady is emitted,
+        once it is ready
+
+        Parameters
+        ----------
+        pyramid : ImagePyramid
+            Pyramid the tile is part of
+        level : int
+            Level of the pyramid
+        rows, cols : slice
+            Tile within the level
+        filters : tuple
+            Filter chain for the full resolution image, sizes are scaled
+            to the level
+        """
+        key = (id(pyramid), level, rows.start, rows.stop, cols.start,
+               cols.stop, filters)
+        with self._lock:
+            cached = self._tiles.get(key)
+            # tiles do not keep their pyramid alive, its id can be reused
+            if not cached is None and cached[0]() is pyramid:
+                self._tiles.move_to_end(key)
+                return cached[1]
+            if key in self._pending:
+                return None
+            self._pending.add(key)
+
+        self._pool.start(
+            _FilterTask(self, key, pyramid, level, rows, cols, filters))
+        return None
+
+    def _store(self, result):
+        key, (pyramid, level, rows, cols), tile = result
+        with self._lock:
+            self._pending.discard(key)
+            self._tiles[key] = (weakref.ref(pyramid), tile)
+            while len(self._tiles) > self.cacheSize:
+                self._tiles.popitem(last=False)
+        self.sigReady.emit(pyramid, level, rows, cols)
+
+    def clear(self):
+        with self._lock:
+            self._tiles.clear()
+
+
+_cache = None
+
+def filteredTileCache():
+    """The FilteredTileCache shared by all channels
+    """
+    global _cache
+    if _cache is None:
+        _cache = FilteredTileCache()
+    return _cache
@@ -17,15 +17,18 @@ from AnyQt import QtCore as qc, QtWidgets as qw, QtGui as qg
 
 # project
 from ..graphics.scene import ViewContextScene
-from ..graphics import InfoBox, CrossHair, HighlightFrame, ColorManager
+from ..graphics import (InfoBox, CrossHair, HighlightFrame, ColorManager,
+                        EntityLayer)
 from ..util import Enhancer, ViewContextManager
-from ..util.image import getFlippedImagedata
+from ..util.image import imageCache
+from ..util.filters import normalized
 
 from ..event import (ScalarAssignmentChanged, ActiveEntity, ResetZoomEvent,
                      ZoomEvent, EntityChangedEvent)
 from .context import ContextMenu
 from .dialog import ViewSetupDialog, TagEditDialog, EnhanceHistDialog
-from .channel import Channel
+from .channel import Channel, RangeModel
+from .loader import ImageLoader
 
 
 class ViewContext(qw.QWidget):
@@ -40,7 +43,20 @@ class ViewContext(qw.QWidget):
 
     newDrawMode = qc.pyqtSignal(str)
 
-    def __init__(self, parent=None, dataManager=None, entityManager=None):
+    # colours of the images blended in composites, in order
+    compositeColours = ((0, 255, 0), (255, 0, 255), (0, 255, 255),
+                        (255, 255, 0), (255, 0, 0), (0, 0, 255))
+
+    def __init__(self, parent=None, dataManager=None, entityManager=None,
+                 entityLayer=False):
+        """
+        Parameters
+        ----------
+        entityLayer : bool
+            If `True`, all entities are drawn by a single EntityLayer
+            instead of one GFX item per entity. Scales to many more
+            entities
+        """
 
         super().__init__(parent=parent)
 
@@ -67,6 +83,11 @@ class ViewContext(qw.QWidget):
         self.entity_scn = ViewContextScene(parent=self)
         self.entity_scn.entityManager = entityManager
         self.empty_scn = ViewContextScene(isDisabled=True, parent=self)
+        if entityLayer:
+            self.entityLayer = EntityLayer()
+            self.entity_scn.setEntityLayer(self.entityLayer)
+        else:
+            self.entityLayer = None
         self._activeChannel = None
         self._clickedChannel = None
         self._lastActiveEntity = None
@@ -101,6 +122,14 @@ class ViewContext(qw.QWidget):
         # self.state = CallTracker()
 
         self.enhancer = Enhancer()
+        self.imageLoader = ImageLoader(self)
+        self.imageLoader.sigLoaded.connect(self._imageLoaded)
+        self.imageLoader.sigFailed.connect(self._imageFailed)
+        # images of composites being loaded
+        self._compositeLoads = set()
+
+        # range followed by all channels, see syncRanges
+        self.rangeModel = RangeModel(parent=self)
 
         #TODO better names for keys
         self.viewSetup = ViewContextManager()
@@ -145,33 +174,138 @@ class ViewContext(qw.QWidget):
         ### Enhancments
         enhanceHistDialog = EnhanceHistDialog(
             parent=self,
-            callback=self.enhanceContrastClicked)
+            callback=self.enhanceContrastClicked,
+            filterCallback=self.filtersClicked)
 
         self.dialogs = {
             'viewSetup': viewSetupDialog,
             'tagEdit': tagEditDialog,
             'enhanceHist': enhanceHistDialog}
 
-    def enhanceContrastClicked(self, minVal, maxVal):
+    def enhanceContrastClicked(self, minVal, maxVal, draft=False):
         """convenience wrapper that calles enhanceContrast
         for last clicked channel
         """
         index = self._clickedChannel.channelIndex
         bgName = self.viewSetup['backgrounds'].get(index, 'None')
-        self.enhanceImageContrast(minVal, maxVal, bgName)
+        self.enhanceImageContrast(minVal, maxVal, bgName, draft=draft)
 
-    def enhanceImageContrast(self, minVal, maxVal, bgName, update=True):
+    def enhanceImageContrast(self, minVal, maxVal, bgName, update=True,
+                             draft=False):
         self.viewSetup['enhancments'][bgName] = (minVal, maxVal)
+        composites = self.viewSetup['composites']
         for index, showsBG in self.viewSetup['backgrounds'].items():
-            if showsBG != bgName:
+            if showsBG != bgName or index in composites:
                 continue
-            self.enhanceChannelContrast(minVal, maxVal, index, update)
-
-    def enhanceChannelContrast(self, minVal, maxVal, index, update=True):
+            self.enhanceChannelContrast(minVal, maxVal, index, update, draft)
+        for index, composite in list(composites.items()):
+            if bgName in composite['names']:
+                self.updateComposite(index, update=update, draft=draft)
+
+    def enhanceChannelContrast(self, minVal, maxVal, index, update=True,
+                               draft=False):
+        """Sets the contrast of channel at index. The lut of the channel is
+        reused as buffer. With draft, the background is only redrawn at
+        reduced resolution, e.g. while the enhance sliders are dragged
+        """
         self.enhancer.adjustFrom = (minVal, maxVal)
-        lut = self.enhancer.getScalingLUT()
         chan = self.channels[index]
-        chan.background.setLookupTable(lut, update=update)
+        lut = self.enhancer.getScalingLUT(out=chan.background.lookupTable)
+        chan.background.setLookupTable(lut, update=update, draft=draft)
+        if update:
+            chan.updateBackground()
+
+    def filtersClicked(self, filters):
+        """convenience wrapper that calles setImageFilters
+        for last clicked channel
+        """
+        index = self._clickedChannel.channelIndex
+        bgName = self.viewSetup['backgrounds'].get(index, 'None')
+        self.setImageFilters(filters, bgName)
+
+    def setImageFilters(self, filters, bgName, update=True):
+        """Sets the filter chain, see `util.filters`, of all channels
+        showing the background bgName
+        """
+        filters = normalized(filters)
+        self.viewSetup['filters'][bgName] = filters
+        for index, showsBG in self.viewSetup['backgrounds'].items():
+            if showsBG != bgName:
+                continue
+            chan = self.channels[index]
+            chan.background.setFilters(filters)
+            if update:
+                chan.updateBackground()
+
+    def toggleComposite(self, index, name):
+        """Adds or removes the image name to the composite of the channel
+        at index. 'None' ends the composite and shows the background of
+        the channel again
+        """
+        composites = self.viewSetup['composites']
+        composite = composites.setdefault(index, {'names': [], 'blend': 'add'})
+        if name in composite['names']:
+            composite['names'].remove(name)
+        elif name != 'None':
+            composite['names'].append(name)
+
+        if name == 'None' or not composite['names']:
+            del composites[index]
+            self.loadImage(
+                index, self.viewSetup['backgrounds'].get(index, 'None'))
+            return
+
+        # a pending background would replace the composite
+        self.imageLoader.cancel(index)
+        self.updateComposite(index)
+
+    def setCompositeBlend(self, blend):
+        """Sets the blend mode, 'add' or 'max', of the composite in the
+        last clicked channel
+        """
+        index = self._clickedChannel.channelIndex
+        composite = self.viewSetup['composites'].get(index)
+        if composite is None:
+            return
+        composite['blend'] = blend
+        self.updateComposite(index)
+
+    def updateComposite(self, index, update=True, draft=False):
+        """Blends the images of the composite at index, each mapped by the
+        levels in viewSetup['enhancments'] and coloured by
+        compositeColours. Images not loaded yet are loaded in the
+        background and added once they are ready
+        """
+        composite = self.viewSetup['composites'].get(index)
+        chan = self.channels.get(index)
+        if composite is None or chan is None:
+            return
+
+        images, luts, colours = [], [], []
+        for pos, name in enumerate(composite['names']):
+            path = self.imageRepository['background'].get(name)
+            if path is None:
+                continue
+            if not path in imageCache:
+                key = ('composite', index, name)
+                if not key in self._compositeLoads:
+                    self._compositeLoads.add(key)
+                    self.imageLoader.load(key, name, path)
+                continue
+
+            enhancments = self.viewSetup['enhancments']
+            self.enhancer.adjustFrom = enhancments.setdefault(
+                name, (0, 0xffff))
+            images.append(imageCache.get(path))
+            luts.append(self.enhancer.getScalingLUT())
+            colours.append(
+                self.compositeColours[pos % len(self.compositeColours)])
+
+        if images:
+            chan.background.setComposite(images, luts, colours,
+                                         blend=composite['blend'],
+                                         draft=draft)
+        chan.chanLabel.set(0, text=' + '.join(composite['names']))
         if update:
             chan.updateBackground()
 
@@ -205,8 +339,19 @@ class ViewContext(qw.QWidget):
         enh = self.viewSetup['enhancments']
         minVal, maxVal = enh.setdefault(bgname, (0, 0xffff))
         diag = self.dialogs['enhanceHist']
+        diag.setHistogram(self.getHistogram(bgname))
+        diag.updateFilters(self.viewSetup['filters'].get(bgname, ()))
         diag.updateGui(minVal, maxVal, bgname)
 
+    def getHistogram(self, bgName):
+        """16 bit histogram of the background image bgName, or None if it
+        is not loaded yet
+        """
+        path = self.imageRepository['background'].get(bgName)
+        if path is None or not path in imageCache:
+            return None
+        return imageCache.histogram(path)
+
     def _connect(self):
         """connects
         """
@@ -217,6 +362,8 @@ class ViewContext(qw.QWidget):
             self.changeItemVisibility)
         self.contextMenu.sigEnhanceSelected.connect(
             self.showEnhanceDialog)
+        self.contextMenu.sigCompositeBlend.connect(
+            self.setCompositeBlend)
 
     def resetZoom(self, autorange=False):
         """
@@ -294,6 +441,9 @@ class ViewContext(qw.QWidget):
                     bgName, (0, 0xffff))
             self.enhanceImageContrast(*bgEnh, bgName, update=True)
 
+        for index in list(self.viewSetup['composites']):
+            self.updateComposite(index)
+
     def setBackgroundSelection(self, imageSelection):
         """view layout, crosshair and other from
         self.viewSetup
@@ -301,15 +451,39 @@ class ViewContext(qw.QWidget):
         rep = self.imageRepository['background'] = dict(imageSelection)
         rep['None'] = None
         self.contextMenu.updateSelection(rep.keys(), 'channelBg')
+        self.contextMenu.updateSelection(rep.keys(), 'composite')
 
     def addEntity(self, entity):
-        if not entity.GFX is None:
-            self._colorManager.setColor(entity)
-            self.entity_scn.addGFX(entity.GFX)
+        """Draws entity by the EntityLayer or, without one, by a GFX that
+        is made for it if needed
+        """
+        if not self.entityLayer is None:
+            self.entityLayer.addEntity(
+                entity, self._colorManager.getStyles(entity))
+            return
+
+        gfx = entity.GFX
+        if gfx is None:
+            gfx = entity.makeGFX()
+        self._colorManager.setColor(entity)
+        if not gfx.scene() is self.entity_scn:
+            self.entity_scn.addGFX(gfx)
+
+    def applyColor(self, entity, tag=None):
+        """Recolours entity, after its tags changed
+        """
+        if not self.entityLayer is None:
+            self.entityLayer.setStyles(
+                entity, self._colorManager.getStyles(entity, tag))
+        else:
+            self._colorManager.setColor(entity, tag)
+            entity.GFX.update()
 
     def clearEntities(self):
         """Clear all Entities
         """
+        if not self.entityLayer is None:
+            self.entityLayer.clear()
         self.entity_scn.remove()
 
     def setTagSelection(self):
@@ -341,6 +515,7 @@ class ViewContext(qw.QWidget):
                     #TODO find proper parent
                     curChan = Channel(self, useOpenGL=False)
                     curChan.sigDeviceRangeChanged.connect(self.syncRanges)
+                    curChan.setRangeModel(self.rangeModel)
                     curChan.setScene(self.empty_scn)
                     curChan.channelIndex = curIndex
                     curChan.background.setBGPos(-0.5, -0.5)
@@ -357,16 +532,14 @@ class ViewContext(qw.QWidget):
     @qc.pyqtSlot(object, object)
     def syncRanges(self, src_chan, new_range):
         """ Syncronizes the individual views
-        """
-        for curChan in self.channels.values():
-            curChan.blockSignals(True)
-
-        for curChan in self.channels.values():
-            if not curChan is src_chan:
-                curChan.setRange(new_range, padding=0)
 
-        for curChan in self.channels.values():
-            curChan.blockSignals(False)
+        The range is only set in rangeModel, which publishes it once per
+        frame. The other channels apply it just before they are painted,
+        which is not published again
+        """
+        if src_chan.isApplyingRange:
+            return
+        self.rangeModel.setRange(src_chan, new_range)
 
     def mousePressEvent(self, event):
         self.setActiveChannel()
@@ -486,6 +659,11 @@ class ViewContext(qw.QWidget):
         shows = self._activeChannel.scene() is self.entity_scn
         self.contextMenu.updateVisible(shows)
 
+        composite = self.viewSetup['composites'].get(
+            self._activeChannel.channelIndex, {})
+        self.contextMenu.updateComposite(composite.get('names', []),
+                                         composite.get('blend', 'add'))
+
     def setActiveChannel(self):
         """sets the _activeChannel propertie
         never updates
@@ -511,16 +689,20 @@ class ViewContext(qw.QWidget):
             self._activeChannel = activeChannel
         self._activeChannel.setHighlightFrame(self._highlightFrame)
 
-    def setBackground(self, imagedata, name, index=None):
+    def setBackground(self, imagedata, name, index=None, extent=None):
         """Sets the background of channel at index to imagedata
         will silently fail if there is no channel at index
 
         if index is none, use the _activeChannel
         if imagedata is None, make black background
+        extent is the size of the full resolution image, if imagedata is
+        a preview
         """
         chan, index = self.getChan(index)
 
-        chan.background.setImage(imagedata)
+        chan.background.setImage(imagedata, extent=extent)
+        chan.background.setFilters(normalized(
+            self.viewSetup['filters'].get(name, ())))
         chan.chanLabel.set(0, text=name)
 
         # if it was already enhanced, load the enhancment
@@ -542,42 +724,78 @@ class ViewContext(qw.QWidget):
 
         # 'None' image selected
         if path is None:
+            self.imageLoader.cancel(idx)
             img = np.ones((1, 1), dtype=np.uint16) * 0xffff
+            self.setBackground(img, index=idx, name=name)
+            self.viewSetup['backgrounds'][idx] = name
         else:
-            # try to load image at path. If fails, return with warning
-            img = getFlippedImagedata(path)
-            if img is None:
-                warnings.warn('Could not load {} @ {}'.format(name, path))
-                return
+            # loaded in background, recorded once shown, see _imageLoaded
+            self.imageLoader.load(idx, name, path)
 
-        self.setBackground(img, index=idx, name=name)
+    @qc.pyqtSlot(object, str, object, object)
+    def _imageLoaded(self, idx, name, img, extent):
+        """Shows preview or full resolution image loaded by imageLoader
+        """
+        if idx in self._compositeLoads:
+            # composites are only blended from full resolution images
+            if tuple(extent) == (img.shape[1], img.shape[0]):
+                self._compositeLoads.discard(idx)
+                self.updateComposite(idx[1])
+            return
+        if not idx in self.channels or idx in self.viewSetup['composites']:
+            return
+        self.setBackground(img, index=idx, name=name, extent=extent)
         self.viewSetup['backgrounds'][idx] = name
 
+        diag = self.dialogs['enhanceHist']
+        if diag.isVisible() and idx == self._clickedChannel.channelIndex:
+            diag.setHistogram(self.getHistogram(name))
+
+    @qc.pyqtSlot(object, str, object, str)
+    def _imageFailed(self, idx, name, path, message):
+        self._compositeLoads.discard(idx)
+        warnings.warn('Could not load {} @ {}: {}'.format(name, path, message))
+
     @qc.pyqtSlot(str, str)
     def _processSelection(self, aName, selector):
         """load image to selector
         """
         if selector == 'channelBg':
             idx = self._clickedChannel.channelIndex
+            self.viewSetup['composites'].pop(idx, None)
             self.loadImage(idx, aName)
 
+        elif selector == 'composite':
+            idx = self._clickedChannel.channelIndex
+            self.toggleComposite(idx, aName)
+
         elif selector == 'tags':
             if self._lastClickedEntity is None:
                 return
+            # the clicked entity decides, all selected entities follow
             if aName == 'None':
-                self._lastClickedEntity.tags = set([])
                 colorString = None
             elif aName in self._lastClickedEntity.tags:
-                self._lastClickedEntity.tags.remove(aName)
                 colorString = None
             else:
-                self._lastClickedEntity.tags.add(aName)
                 colorString = aName
-            self._updateInfoBox(self._lastClickedEntity)
 
-            # do the color stuff
-            self._colorManager.setColor(self._lastClickedEntity, colorString)
-            self._lastClickedEntity.GFX.update()
+            targets = self.entity_scn.selectedEntities()
+            if not any(ent is self._lastClickedEntity for ent in targets):
+                targets = [self._lastClickedEntity]
+
+            with self.entity_scn.bulkUpdate():
+                for entity in targets:
+                    if aName == 'None':
+                        entity.tags = set([])
+                    elif colorString is None:
+                        entity.tags.discard(aName)
+                    else:
+                        entity.tags.add(aName)
+                    # do the color stuff
+                    self.applyColor(entity, colorString)
+
+            self._updateInfoBox(self._lastClickedEntity)
 
     def _updateInfoBox(self, entity):
         #TODO to function...
@@ -651,7 +869,8 @@ class ViewContext(qw.QWidget):
             self._updateInfoBox(self._lastActiveEntity)
             self.setActiveEntity(self._lastActiveEntity)
         elif event == EntityChangedEvent:
-            event.entity.makeGFX()
+            # new entities and, with an EntityLayer, edited ones; a GFX
+            # follows edits itself, see GFX.updateGeometry
             self.addEntity(event.entity)
 
         try:
@@ -715,5 +934,8 @@ class ViewContext(qw.QWidget):
         """
         self._colorManager.changeOpacity(alpha)
         self.viewSetup['globalAlpha'] = alpha
-        for item in self.entity_scn.items():
-            item.update()
+        # styles are shared by all items, a single repaint is enough
+        if not self.entityLayer is None:
+            self.entityLayer.update()
+        else:
+            self.entity_scn.update()
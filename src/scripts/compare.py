@@ -29,8 +29,8 @@ def modify_ents(eman, pad):
     """Creates polygons and adds them as attribute
     inplace
     """
+    eman.translate(pad, pad)
     for ent in eman.iter_active():
-        ent.moveBy(pad, pad)
         ent.polygon = Polygon(ent.contours[0]).simplify(
             tolerance=0.5, preserve_topology=True).buffer(0)
     return eman
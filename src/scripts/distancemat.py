@@ -9,6 +9,7 @@ from inspectorcell.entities.entitytools import (
     draw_entities, read_into_manager)
 
 from inspectorcell.entities import EntityManager, EntityFile
+from inspectorcell.util.lookup import IdIndex
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -167,15 +168,16 @@ dframe = pd.read_csv(clusf, skiprows=range(1, 3))
 
 cluster_ids = set([])
 clst_key = ('clst', 1)
-for ent in eman:
-    try:
-        cluster, = dframe[dframe.CellID == ent.eid].Cluster
-        ent.scalars[clst_key] = int(cluster[1:])
-        cluster_ids.add(int(cluster[1:]))
-    except ValueError:
-        warn('no cluster assignment for %d', ent.eid)
+entities = list(eman)
+clusters, found = IdIndex(dframe.CellID.values).join(
+    [ent.objectId for ent in entities], dframe.Cluster.values)
+for ent, cluster, isFound in zip(entities, clusters, found):
+    if not isFound:
+        warn('no cluster assignment for %d', ent.objectId)
         ent.isActive = False
         continue
+    ent.scalars[clst_key] = int(cluster[1:])
+    cluster_ids.add(int(cluster[1:]))
 
 info('Using %d cluster: %s', len(cluster_ids), str(cluster_ids))
 
@@ -0,0 +1,107 @@
+import pytest
+import numpy as np
+
+from inspectorcell.entities import ContourStore
+from inspectorcell.entities.entityfile import _ObjTable, _ObjPropertieTable
+
+
+CONTOURS = [
+    [[[1, 1], [1, 5], [5, 5], [5, 1]]],
+    [],
+    [[[10, 10], [12, 10], [12, 14]], [[20, 20]]],
+]
+
+
+def test_roundtrip():
+    store = ContourStore.fromContours(CONTOURS, objectIds=[3, 7, 9])
+
+    assert len(store) == 3
+    assert store.contourCount == 3
+    assert store.coords.dtype == np.int32
+    assert store.toLists() == CONTOURS
+    assert np.all(store.objectIds == [3, 7, 9])
+
+    for contours, ought in zip(store, CONTOURS):
+        assert [cnt.tolist() for cnt in contours] == ought
+
+def test_default_ids_and_rounding():
+    store = ContourStore.fromContours([[[[0.6, 1.4], [2.5, 3.5]]]])
+
+    assert np.all(store.objectIds == [1])
+    assert store.toLists() == [[[[1, 1], [2, 4]]]]
+
+def test_views():
+    store = ContourStore.fromContours(CONTOURS)
+
+    store.contours(0)[0][0] = (0, 0)
+    assert store.coords[0].tolist() == [0, 0]
+
+def test_bboxes():
+    store = ContourStore.fromContours(CONTOURS)
+    bboxes = store.bboxes()
+
+    assert bboxes[0].tolist() == [[1, 1], [5, 5]]
+    # no points
+    assert bboxes[1].tolist() == [[0, 0], [-1, -1]]
+    assert bboxes[2].tolist() == [[10, 10], [20, 20]]
+
+def test_entity_index():
+    store = ContourStore.fromContours(CONTOURS)
+
+    assert store.entityIndex().tolist() == [0, 0, 0, 0, 2, 2, 2, 2]
+
+def test_invalid_offsets():
+    with pytest.raises(ValueError):
+        ContourStore(np.zeros((2, 2)), [0, 2], [0, 1], [1, 2])
+
+    with pytest.raises(ValueError):
+        ContourStore(np.zeros((2, 2)), [0, 1], [0, 1], [1])
+
+def test_save_load(tmp_path):
+    store = ContourStore.fromContours(CONTOURS, objectIds=[3, 7, 9])
+    fname = tmp_path / 'store.npz'
+    store.save(fname)
+
+    loaded = ContourStore.load(fname)
+    assert loaded.toLists() == CONTOURS
+    assert np.all(loaded.objectIds == store.objectIds)
+
+def test_file_contours_rounded():
+    """contours read from an entity file are rounded in a packed store
+    """
+    table = _ObjTable(_ObjPropertieTable())
+    table.fromDicts([
+        {'tags': [], 'scalars': [], 'contours': [[[0.6, 1.4], [2, 3]]]},
+        {'tags': [], 'scalars': [], 'contours': []},
+    ])
+
+    objects = table.to_dicts()
+    assert objects[0]['contours'] == [[[1, 1], [2, 3]]]
+    assert objects[1]['contours'] == []
+
+def test_translate():
+    store = ContourStore.fromContours(CONTOURS)
+    store.translate(2, -1)
+
+    assert store.toLists()[0] == [[[3, 0], [3, 4], [7, 4], [7, 0]]]
+    assert store.coords.dtype == np.int32
+
+def test_clip():
+    store = ContourStore.fromContours(CONTOURS)
+    store.translate(-3, 0)
+    store.clip(8, 12)
+
+    assert store.toLists()[0] == [[[0, 1], [0, 5], [2, 5], [2, 1]]]
+    assert store.toLists()[2] == [[[7, 10], [8, 10], [8, 12]], [[8, 12]]]
+
+@pytest.mark.parametrize('factor', [0.5, 2, 1.25])
+def test_scale(factor):
+    store = ContourStore.fromContours(CONTOURS)
+    ought = np.rint(store.coords * factor).astype(np.int32)
+    coords = store.coords
+    store.scale(factor)
+
+    # inplace, views handed out stay valid
+    assert store.coords is coords
+    assert store.coords.dtype == np.int32
+    assert np.all(store.coords == ought)
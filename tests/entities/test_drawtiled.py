@@ -0,0 +1,66 @@
+"""Tiled drawing must match drawing onto a single canvas
+"""
+import pytest
+import numpy as np
+
+from inspectorcell.entities.entitytools import (draw_entities,
+                                                draw_entities_tiled)
+
+tifffile = pytest.importorskip('tifffile')
+
+
+class _Drawable():
+    """Just what the drawing functions read from an Entity
+    """
+
+    def __init__(self, objectId, contours):
+        self.objectId = objectId
+        self.eid = objectId
+        self.contours = [np.array(cnt) for cnt in contours]
+
+
+def _entities():
+    rng = np.random.default_rng(42)
+    entities = []
+    for objectId in range(1, 41):
+        x, y = rng.integers(0, 90, 2)
+        w, h = rng.integers(3, 20, 2)
+        contours = [[[x, y], [x + w, y], [x + w, y + h], [x, y + h]]]
+        entities.append(_Drawable(objectId, contours))
+    # crossing many tiles and the border of the image
+    entities.append(_Drawable(41, [[[5, 60], [100, 64], [40, 5]]]))
+    return entities
+
+@pytest.mark.parametrize('stroke,workers', [(0, 1), (2, 1), (0, 3)])
+def test_tiled_matches_canvas(stroke, workers, tmp_path):
+    entities = _entities()
+    shape = (100, 90)
+
+    canvas = np.zeros(shape, np.uint16)
+    draw_entities(canvas, entities, lambda ent: ent.objectId, stroke=stroke)
+
+    tiffile = tmp_path / 'tiled.tif'
+    draw_entities_tiled(tiffile, entities, lambda ent: ent.objectId,
+                        shape, np.uint16, stroke=stroke, tilesize=32,
+                        workers=workers)
+
+    assert np.all(tifffile.imread(str(tiffile)) == canvas)
+
+def test_tiled_rgb(tmp_path):
+    entities = _entities()
+    shape = (64, 64, 3)
+
+    color = lambda ent: (ent.objectId, 2 * ent.objectId, 255)
+    canvas = np.zeros(shape, np.uint8)
+    draw_entities(canvas, entities, color, stroke=0)
+
+    tiffile = tmp_path / 'tiled.tif'
+    draw_entities_tiled(tiffile, entities, color, shape, np.uint8,
+                        tilesize=16)
+
+    assert np.all(tifffile.imread(str(tiffile)) == canvas)
+
+def test_tilesize():
+    with pytest.raises(ValueError):
+        draw_entities_tiled('never.tif', [], lambda ent: 1, (10, 10),
+                            np.uint8, tilesize=20)
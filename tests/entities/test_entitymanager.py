@@ -344,3 +344,75 @@ def testPopEntity():
     # test if id is free again
     new_ent = eman.make_entity(objectId=pop_id)
     assert not pop_ent is new_ent
+
+def _bulkManager():
+    eman = EntityManager()
+    eman.clear()
+    square = np.array([[0, 0], [0, 9], [9, 9], [9, 0]], np.int32)
+    eman.generateFromContours([(1, [square]), (2, [square + 20])])
+    return eman, square
+
+def _assertEntityMatches(ent, contour):
+    """Contour, bbox and path of ent match an entity made from contour
+    """
+    ref = Entity(999)
+    ref.from_contours([contour])
+    assert len(ent.contours) == 1
+    assert np.array_equal(ent.contours[0], contour)
+    assert np.array_equal(ent.bbox, ref.bbox)
+    assert ent.boundingbox == ref.boundingbox
+    assert ent.path.boundingRect() == ref.path.boundingRect()
+
+@pytest.mark.parametrize('ops', [
+    [('translate', 5, 3), ('translate', 5, 3)],
+    [('scale', 2), ('scale', 0.5)],
+    [('translate', -4, 6), ('clip', 30, 30), ('clip', 12, 30)],
+    [('translate', 3, 3), ('scale', 2), ('clip', 40, 40),
+     ('translate', -1, 0)],
+])
+def testRepeatedBulkOps(ops):
+    """Derived data follows the store after every bulk operation, also
+    when the entities were accessed in between
+    """
+    eman, square = _bulkManager()
+    expected = {1: square.copy(), 2: square + 20}
+    # build the path caches before the store is changed
+    for ent in eman.lookupEntities([1, 2]):
+        _assertEntityMatches(ent, expected[ent.objectId])
+
+    for name, *args in ops:
+        getattr(eman, name)(*args)
+        for oid, cnt in expected.items():
+            if name == 'translate':
+                cnt += args
+            elif name == 'scale':
+                cnt[:] = np.rint(cnt * args[0])
+            else:
+                np.clip(cnt, 0, args, out=cnt)
+
+        for ent in eman.lookupEntities([1, 2]):
+            _assertEntityMatches(ent, expected[ent.objectId])
+
+def testBulkOpsKeepStore():
+    """Reading derived data does not unpack the store
+    """
+    eman, _ = _bulkManager()
+    store = eman.contourStore
+    eman.translate(1, 2)
+    list(eman.iter_all())
+    eman.translate(1, 2)
+    assert eman.contourStore is store
+    assert np.array_equal(
+        eman.lookupEntity(objectId=1).contours[0][0], [2, 4])
+
+def testPackRoundsContours():
+    """Packing rounds to the int32 store and updates derived data
+    """
+    eman = EntityManager()
+    eman.clear()
+    ent = eman.make_entity()
+    ent.from_contours([np.array([[0.4, 0.6], [0.4, 9.4], [9.6, 9.4]])])
+
+    eman.packContours()
+    ent = eman.lookupEntity(objectId=ent.objectId)
+    _assertEntityMatches(ent, np.array([[0, 1], [0, 9], [10, 9]]))
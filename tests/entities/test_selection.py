@@ -0,0 +1,42 @@
+import numpy as np
+
+from inspectorcell.entities.selection import SelectionModel
+
+
+def test_order():
+    selection = SelectionModel()
+    selection.select([3, 1])
+    selection.select([2, 3])
+
+    assert list(selection) == [3, 1, 2]
+    assert len(selection) == 3
+    assert 1 in selection and not 4 in selection
+    assert selection.first(2) == [3, 1]
+    assert selection.first(0) == []
+    assert selection.first(-1) == []
+
+def test_deselect():
+    selection = SelectionModel()
+    selection.select([1, 2, 3])
+    selection.deselect([2, 5])
+    assert list(selection) == [1, 3]
+
+    # reselecting moves to the end
+    selection.select([2, 1])
+    assert list(selection) == [1, 3, 2]
+
+    selection.clear()
+    assert len(selection) == 0
+
+def test_set_selection():
+    selection = SelectionModel()
+    selection.select([4, 1, 2])
+    selection.setSelection([5, 2, 4])
+    assert list(selection) == [4, 2, 5]
+
+def test_numpy_ids():
+    selection = SelectionModel()
+    selection.select(np.array([7, 8], np.int64))
+    assert list(selection) == [7, 8]
+    assert all(type(oid) is int for oid in selection)
+    assert np.int64(7) in selection
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from AnyQt.QtCore import QPointF
+from AnyQt.QtGui import QPolygonF
+
+from inspectorcell.graphics.gfx import GFX, lodScheduler
+
+
+class _Drawable:
+    """Minimal stand-in for an Entity drawn by a GFX
+    """
+
+    def __init__(self):
+        circle = [(50 + 40 * np.cos(a), 50 + 40 * np.sin(a)) \
+                  for a in np.linspace(0, 2 * np.pi, 200, endpoint=False)]
+        self.contours = [np.array(circle).astype(int)]
+        self.polygons = [QPolygonF([QPointF(*pt) for pt in circle])]
+        self.boundingbox = self.polygons[0].boundingRect()
+
+def _levelsDone(gfx):
+    return all(not level is None for level in gfx._lodLevels[1:])
+
+@pytest.mark.parametrize('lod,level', [
+    (2., 0),
+    (0.5, 0),
+    (0.3, 1),
+    # level 2 is pending, the next finer one is used
+    (0.2, 1),
+    (0.1, 1),
+    (0.07, 3),
+    (0.05, 3),
+    (0.01, None),
+])
+def test_polygons_for_lod(qtbot, lod, level):
+    gfx = GFX(_Drawable())
+    levels = ['level0', 'level1', None, 'level3']
+    gfx._lodLevels = list(levels)
+
+    polygons = gfx._polygonsForLod(lod)
+    if level is None:
+        assert polygons is None
+    else:
+        assert polygons == levels[level]
+
+def test_polygons_for_lod_pending(qtbot):
+    """Until anything is simplified, the polygons of the entity are used
+    """
+    entity = _Drawable()
+    gfx = GFX(entity)
+    gfx._lodLevels = [None] * len(GFX.lodTolerances)
+    assert gfx._polygonsForLod(0.06) is entity.polygons
+    assert gfx._lodLevels[0] is entity.polygons
+
+def test_lod_computed(qtbot):
+    gfx = GFX(_Drawable())
+    qtbot.waitUntil(lambda: _levelsDone(gfx))
+
+    counts = [sum(len(poly) for poly in gfx._lodLevels[level]) \
+              for level in range(1, len(GFX.lodTolerances))]
+    assert counts == sorted(counts, reverse=True)
+    assert counts[0] < 200
+
+def test_outdated_generation(qtbot):
+    gfx = GFX(_Drawable())
+    qtbot.waitUntil(lambda: _levelsDone(gfx))
+    outdated = gfx.lodGeneration
+
+    gfx.invalidateLod()
+    assert gfx.lodGeneration == outdated + 1
+    assert gfx._lodLevels == [None] * len(GFX.lodTolerances)
+
+    # results for the previous contour are dropped
+    stale = ['stale'] * (len(GFX.lodTolerances) - 1)
+    lodScheduler()._apply([(gfx, outdated, stale)])
+    assert not 'stale' in gfx._lodLevels
+
+    qtbot.waitUntil(lambda: _levelsDone(gfx))
+    assert not 'stale' in gfx._lodLevels
@@ -0,0 +1,154 @@
+import uuid
+
+import pytest
+from AnyQt.QtCore import QPointF, QRectF
+from AnyQt.QtGui import QPainterPath, QPolygonF
+
+from inspectorcell.graphics.layer import EntityLayer
+
+
+STYLES = (object(), object())
+
+
+class _Drawable:
+    """Minimal stand-in for an Entity drawn by the layer
+    """
+
+    def __init__(self, *contours):
+        self.eid = uuid.uuid4()
+        self.polygons = [QPolygonF([QPointF(x, y) for x, y in cnt]) \
+                         for cnt in contours]
+        self.boundingbox = self.polygons[0].boundingRect()
+
+def _square(x, y, size=10):
+    return [(x, y), (x + size, y), (x + size, y + size), (x, y + size)]
+
+def _layer(qtbot, *entities, cellSize=64):
+    layer = EntityLayer(cellSize=cellSize, margin=0)
+    for entity in entities:
+        layer.addEntity(entity, STYLES)
+    return layer
+
+def test_entities_in(qtbot):
+    near, far = _Drawable(_square(0, 0)), _Drawable(_square(200, 200))
+    layer = _layer(qtbot, near, far)
+
+    assert layer.entitiesIn(QRectF(-5, -5, 20, 20)) == [near.eid]
+    assert layer.entitiesIn(QRectF(150, 150, 100, 100)) == [far.eid]
+    assert set(layer.entitiesIn(QRectF(0, 0, 300, 300))) == \
+        {near.eid, far.eid}
+    assert layer.entitiesIn(QRectF(50, 50, 10, 10)) == []
+
+def test_entity_at(qtbot):
+    ring = _Drawable(_square(0, 0, 30), _square(10, 10, 10))
+    other = _Drawable(_square(100, 100))
+    layer = _layer(qtbot, ring, other)
+
+    assert layer.entityAt(QPointF(5, 5)) is ring
+    assert layer.entityAt(QPointF(105, 105)) is other
+    # inside the hole
+    assert layer.entityAt(QPointF(15, 15)) is None
+    assert layer.entityAt(QPointF(50, 50)) is None
+
+def test_entity_at_hidden(qtbot):
+    entity = _Drawable(_square(0, 0))
+    layer = _layer(qtbot, entity)
+    layer.setSelected([entity])
+    layer.hideSelected()
+    assert layer.entityAt(QPointF(5, 5)) is None
+
+def test_select_area(qtbot):
+    entities = [_Drawable(_square(x, 0)) for x in (0, 20, 40)]
+    layer = _layer(qtbot, *entities)
+
+    path = QPainterPath()
+    path.addRect(QRectF(15, -5, 20, 20))
+    layer.selectArea(path)
+    assert layer.selectedEntities() == [entities[1]]
+
+    # replaces the selection
+    path = QPainterPath()
+    path.addRect(QRectF(-5, -5, 30, 20))
+    layer.selectArea(path)
+    assert set(layer.selected) == {entities[0].eid, entities[1].eid}
+
+def test_hide_show(qtbot):
+    entities = [_Drawable(_square(x, 0)) for x in (0, 20)]
+    layer = _layer(qtbot, *entities)
+    layer.setSelected(entities[:1])
+
+    layer.hideSelected()
+    assert layer.hidden == {entities[0].eid}
+    assert not layer.selected
+
+    # hidden entities are not selected by area
+    path = QPainterPath()
+    path.addRect(QRectF(-5, -5, 50, 20))
+    layer.selectArea(path)
+    assert layer.selectedEntities() == [entities[1]]
+
+    layer.showAll()
+    assert not layer.hidden
+    assert layer.entityAt(QPointF(5, 5)) is entities[0]
+
+def test_bounds_after_remove(qtbot):
+    entities = [_Drawable(_square(0, 0)), _Drawable(_square(100, 50)),
+                _Drawable(_square(300, 300))]
+    layer = _layer(qtbot, *entities)
+    assert layer.boundingRect() == QRectF(0, 0, 310, 310)
+
+    layer.removeEntity(entities[2])
+    assert layer.boundingRect() == QRectF(0, 0, 110, 60)
+    assert not entities[2] in layer
+    assert len(layer) == 2
+
+    layer.removeEntity(entities[0])
+    assert layer.boundingRect() == QRectF(100, 50, 10, 10)
+
+    layer.removeEntity(entities[1])
+    assert layer.boundingRect().isEmpty()
+    # removing twice is ignored
+    layer.removeEntity(entities[1])
+
+def test_remove_deselects(qtbot):
+    entity = _Drawable(_square(0, 0))
+    layer = _layer(qtbot, entity)
+    layer.setSelected([entity])
+    layer.removeEntity(entity)
+    assert not layer.selected
+    assert layer.selectedEntities() == []
+
+@pytest.mark.parametrize('change', ['add', 'remove'])
+def test_batch_invalidation(qtbot, change):
+    first, second = _Drawable(_square(0, 0)), _Drawable(_square(20, 0))
+    layer = _layer(qtbot, first)
+    cell = (0, 0)
+
+    batches = layer._batchesFor(cell)
+    assert layer._batchesFor(cell) is batches
+    assert len(batches) == 1
+
+    if change == 'add':
+        layer.addEntity(second, STYLES)
+        expected = QRectF(0, 0, 30, 10)
+    else:
+        layer.addEntity(second, STYLES)
+        layer._batchesFor(cell)
+        layer.removeEntity(second)
+        expected = QRectF(0, 0, 10, 10)
+
+    assert not cell in layer._batches
+    _, _, path, rects = layer._batchesFor(cell)[0]
+    assert path.boundingRect() == expected
+    assert len(rects) == (2 if change == 'add' else 1)
+
+def test_selection_batches(qtbot):
+    """Selected entities are batched with their selected style
+    """
+    first, second = _Drawable(_square(0, 0)), _Drawable(_square(20, 0))
+    layer = _layer(qtbot, first, second)
+    layer.setSelected([second])
+
+    batches = layer._batchesFor((0, 0))
+    styles = {selected: style for selected, style, _, _ in batches}
+    assert styles == {False: STYLES[0], True: STYLES[1]}
@@ -0,0 +1,105 @@
+import uuid
+
+import numpy as np
+import pytest
+from AnyQt.QtCore import QPointF, QRectF
+from AnyQt.QtGui import QPainterPath, QPolygonF
+
+from inspectorcell.graphics.gfx import GFX
+from inspectorcell.graphics.layer import EntityLayer
+from inspectorcell.graphics.scene import ViewContextScene
+
+
+class _Drawable:
+    """Minimal stand-in for an Entity drawn by a GFX or the layer
+    """
+
+    def __init__(self, objectId, x):
+        self.eid = uuid.uuid4()
+        self.objectId = objectId
+        square = [(x, 0), (x + 10, 0), (x + 10, 10), (x, 10)]
+        self.contours = [np.array(square)]
+        self.polygons = [QPolygonF([QPointF(*pt) for pt in square])]
+        self.boundingbox = self.polygons[0].boundingRect()
+        self.path = QPainterPath()
+        self.path.addPolygon(self.polygons[0])
+        self.GFX = None
+
+
+class _Manager:
+
+    def __init__(self, entities):
+        self.entities = {ent.objectId: ent for ent in entities}
+
+    def lookupEntities(self, objectIds):
+        return [self.entities.get(oid) for oid in objectIds]
+
+
+@pytest.fixture
+def layerScene(qtbot):
+    entities = [_Drawable(oid, 20 * oid) for oid in range(1, 5)]
+    scene = ViewContextScene(entityManager=_Manager(entities))
+    layer = EntityLayer()
+    scene.setEntityLayer(layer)
+    for entity in entities:
+        layer.addEntity(entity, (None, None))
+    return scene, entities
+
+def test_layer_selection(layerScene):
+    scene, entities = layerScene
+    layer = scene.entityLayer
+
+    layer.setSelected(entities[2:3])
+    layer.setSelected(entities[:1])
+    assert list(scene.selection) == [3, 1]
+    assert scene.selectedEntities() == [entities[2], entities[0]]
+
+    path = QPainterPath()
+    path.addRect(QRectF(35, -5, 20, 20))
+    scene.setSelectionArea(path)
+    assert list(scene.selection) == [2]
+
+    layer.removeEntity(entities[1])
+    assert len(scene.selection) == 0
+
+def test_layer_hide(layerScene):
+    scene, entities = layerScene
+    scene.entityLayer.setSelected(entities)
+    scene.changeVisible(False)
+    assert len(scene.selection) == 0
+
+def test_draw_mode_single_selection(layerScene):
+    """Entering the drawing mode keeps only the last selected entity
+    """
+    scene, entities = layerScene
+    layer = scene.entityLayer
+    for entity in entities[:3]:
+        layer.setSelected([entity])
+
+    scene.setDrawingMode('D')
+    assert list(scene.selection) == [3]
+    assert layer.selectedEntities() == [entities[2]]
+    assert scene._editedEntity() is entities[2]
+
+def test_gfx_selection(qtbot):
+    entities = [_Drawable(oid, 20 * oid) for oid in range(1, 4)]
+    scene = ViewContextScene(entityManager=_Manager(entities))
+    for entity in entities:
+        entity.GFX = GFX(entity)
+        scene.addGFX(entity.GFX)
+
+    entities[1].GFX.setSelected(True)
+    entities[0].GFX.setSelected(True)
+    assert list(scene.selection) == [2, 1]
+    assert scene.selectedGFX() == [entities[1].GFX, entities[0].GFX]
+
+    entities[1].GFX.setSelected(False)
+    assert list(scene.selection) == [1]
+
+    entities[2].GFX.setSelected(True)
+    scene.setDrawingMode('D')
+    assert list(scene.selection) == [3]
+    assert not entities[0].GFX.isSelected()
+
+    scene.clearSelection()
+    assert len(scene.selection) == 0
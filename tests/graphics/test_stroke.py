@@ -0,0 +1,75 @@
+import pytest
+import numpy as np
+
+from inspectorcell.graphics.stroke import applyStroke, strokeMask
+from inspectorcell.util.raster import local_mask, mask_contours
+
+
+BBOX = np.array([[0, 0], [39, 39]])
+
+
+class _Editable:
+    """Minimal stand-in for an Entity edited by a stroke
+    """
+
+    def __init__(self, mask):
+        self.contours = mask_contours(np.s_[0:40, 0:40], mask)
+
+    def update_contour(self, contours):
+        self.contours = contours
+
+    @property
+    def mask(self):
+        return local_mask(self.contours, bbox=BBOX)[1]
+
+def _square(hole=False):
+    mask = np.zeros((40, 40), bool)
+    mask[5:35, 5:35] = True
+    if hole:
+        mask[15:25, 15:25] = False
+    return mask
+
+def test_stroke_mask():
+    mask_slice, mask = strokeMask([(10, 10), (20, 10)], 2)
+
+    assert mask_slice == np.s_[8:13, 8:23]
+    assert mask[2].all()
+
+def test_erase_inside():
+    """Erasing within a cell punches a hole
+    """
+    ent = _Editable(_square())
+    assert applyStroke(ent, [(20, 20)], 3, erase=True)
+
+    mask = ent.mask
+    assert not mask[20, 20]
+    assert mask[20, 10] and mask[10, 20]
+    assert mask.sum() < _square().sum()
+
+def test_draw_next_to_hole():
+    """Drawing at the edge of a hole keeps the rest of it
+    """
+    ent = _Editable(_square(hole=True))
+    assert applyStroke(ent, [(15, 20)], 2)
+
+    mask = ent.mask
+    assert mask[20, 16]
+    assert not mask[20, 20]
+    assert not mask[16:24, 19:24].any()
+
+def test_erase_hole_unchanged():
+    """Erasing only within the hole does not change the cell
+    """
+    ent = _Editable(_square(hole=True))
+    contours = ent.contours
+    assert not applyStroke(ent, [(20, 20)], 3, erase=True)
+    assert ent.contours is contours
+
+@pytest.mark.parametrize('erase', [False, True])
+def test_no_overlap(erase):
+    ent = _Editable(_square())
+    assert not applyStroke(ent, [(38, 2)], 1, erase=erase)
+
+def test_draw_unchanged():
+    ent = _Editable(_square())
+    assert not applyStroke(ent, [(20, 20)], 3)
@@ -97,3 +97,29 @@ def test_viewcontext_integration(qtbot):
 
     assert viewer.viewSetup['rows'] == new_rows
     assert viewer.viewSetup['cols'] == new_cols
+
+def test_range_sync(qtbot):
+    """One range change is published once and each channel applies it
+    once, without publishing it again
+    """
+    viewer = ViewContext(dataManager=DataManager(),
+                         entityManager=EntityManager())
+    viewer.setGridlayout(2, 2)
+    qtbot.addWidget(viewer)
+    viewer.show()
+    qtbot.waitExposed(viewer)
+    # initial layout settled
+    qtbot.wait(100)
+
+    published = []
+    viewer.rangeModel.sigChanged.connect(published.append)
+    applied = {index: [] for index in viewer.channels}
+    for index, chan in viewer.channels.items():
+        chan.sigDeviceRangeChanged.connect(
+            lambda chan, rect, index=index: applied[index].append(rect))
+
+    viewer.channels[0, 0].setRange(QRectF(5, 5, 40, 40), padding=0)
+    qtbot.wait(300)
+
+    assert len(published) == 1
+    assert [len(ranges) for ranges in applied.values()] == [1, 1, 1, 1]
@@ -0,0 +1,74 @@
+import pytest
+import numpy as np
+
+from inspectorcell.util.enhancer import Enhancer
+
+
+def _enhancer(adjustFrom, adjustTo=(0, 0xff)):
+    enhancer = Enhancer()
+    enhancer.adjustFrom = adjustFrom
+    enhancer.adjustTo = adjustTo
+    return enhancer
+
+def test_lut():
+    lut = _enhancer((0x100, 0x200)).getScalingLUT()
+
+    assert lut.shape == (0x10000,)
+    assert lut.dtype == np.uint8
+    assert lut[0] == 0 and lut[0x100] == 0
+    assert lut[0x180] == 127
+    assert lut[0x200] == 0xff and lut[-1] == 0xff
+    assert np.all(np.diff(lut.astype(int)) >= 0)
+
+def test_lut_inverted():
+    lut = _enhancer((0, 0xffff), (0xff, 0)).getScalingLUT()
+    assert lut[0] == 0xff and lut[-1] == 0
+
+@pytest.mark.parametrize('adjustFrom,adjustTo', [
+    ((0, 0xff), (0, 0xff)),
+    ((0x200, 0x100), (0, 0xff)),
+    ((0x100, 0x100), (0, 0xff)),
+])
+def test_lut_none(adjustFrom, adjustTo):
+    assert _enhancer(adjustFrom, adjustTo).getScalingLUT() is None
+
+def test_lut_out():
+    """The buffer handed in is reused and matches a new lut
+    """
+    enhancer = _enhancer((0x100, 0x200))
+    out = enhancer.getScalingLUT()
+
+    enhancer.adjustFrom = (0x1000, 0x8000)
+    reused = enhancer.getScalingLUT(out=out)
+    assert reused is out
+    assert np.array_equal(reused, _enhancer((0x1000, 0x8000)).getScalingLUT())
+
+@pytest.mark.parametrize('out', [
+    np.zeros(0x100, np.uint8),
+    np.zeros(0x10000, np.uint16),
+])
+def test_lut_out_mismatch(out):
+    lut = _enhancer((0x100, 0x200)).getScalingLUT(out=out)
+    assert not lut is out
+    assert lut.shape == (0x10000,) and lut.dtype == np.uint8
+
+def test_auto_bounds():
+    hist = np.zeros(0x10000, np.int64)
+    hist[100:1100] = 10
+    minVal, maxVal = Enhancer().getAutoBounds(hist, lower=0.1, upper=0.9)
+    assert minVal == 200
+    assert maxVal == 999
+
+def test_auto_bounds_empty():
+    enhancer = Enhancer()
+    assert enhancer.getAutoBounds(np.zeros(0x10000)) == (0, 0xffff)
+    assert enhancer.getAutoBounds(np.zeros(0)) == (0, 0xffff)
+
+@pytest.mark.parametrize('value', [0, 500, 0xffff])
+def test_auto_bounds_constant(value):
+    """A single value still gives an increasing range within the dtype
+    """
+    hist = np.zeros(0x10000, np.int64)
+    hist[value] = 1000
+    minVal, maxVal = Enhancer().getAutoBounds(hist)
+    assert 0 <= minVal < maxVal <= 0xffff
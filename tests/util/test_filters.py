@@ -0,0 +1,81 @@
+import pytest
+import numpy as np
+
+from inspectorcell.util.filters import (normalized, scaledFilters,
+                                        filterMargin, applyFilters,
+                                        filterTile, gamma, clahe)
+
+
+CHAINS = [
+    (('gamma', 0.8),),
+    (('subtract', 5),),
+    (('clahe', 2.0, 16),),
+    (('subtract', 4), ('clahe', 2.0, 16), ('gamma', 1.2)),
+]
+
+
+def _image(shape=(90, 110)):
+    rng = np.random.default_rng(7)
+    rows, cols = np.mgrid[:shape[0], :shape[1]]
+    image = 2000 + 40 * rows + 20 * cols + rng.integers(0, 800, shape)
+    return image.astype(np.uint16)
+
+def test_normalized():
+    assert normalized(None) == ()
+    assert normalized([['gamma', 0.8], ['clahe', 2.0, 64]]) == \
+        (('gamma', 0.8), ('clahe', 2.0, 64))
+
+def test_normalized_invalid():
+    with pytest.raises(ValueError):
+        normalized([['blur', 3]])
+
+def test_scaled():
+    chain = (('subtract', 25), ('clahe', 2.0, 64), ('gamma', 0.8))
+    assert scaledFilters(chain, 4) == \
+        (('subtract', 6), ('clahe', 2.0, 16), ('gamma', 0.8))
+    # sizes never drop below one pixel
+    assert scaledFilters((('subtract', 1),), 8) == (('subtract', 1),)
+
+def test_margin():
+    assert filterMargin(()) == (0, 1)
+    assert filterMargin((('gamma', 0.8),)) == (0, 1)
+    assert filterMargin((('subtract', 5), ('clahe', 2.0, 16))) == (26, 16)
+
+def test_gamma():
+    image = np.array([0, 0x4000, 0xffff], np.uint16)
+    assert np.array_equal(gamma(image, 1.0), image)
+    brighter = gamma(image, 0.5)
+    assert brighter.dtype == np.uint16
+    assert brighter[0] == 0 and brighter[-1] == 0xffff
+    assert brighter[1] > image[1]
+
+def test_clahe_shape():
+    image = _image((50, 70))
+    equalized = clahe(image, 2.0, 32)
+    assert equalized.shape == image.shape
+    assert equalized.dtype == image.dtype
+
+def test_apply_clips_dtype():
+    image = np.array([[-5., 70000.]])
+    filtered = applyFilters(image, (('gamma', 1.0),))
+    assert filtered.dtype == np.uint16
+    assert np.array_equal(filtered, [[0, 0xffff]])
+
+@pytest.mark.parametrize('filters', CHAINS)
+@pytest.mark.parametrize('rows,cols', [
+    (slice(0, 32), slice(0, 32)),
+    (slice(32, 64), slice(64, 96)),
+    (slice(64, 90), slice(96, 110)),
+])
+def test_tile_matches_image(filters, rows, cols):
+    """Tiles are filtered as part of the whole image
+    """
+    image = _image()
+    whole = applyFilters(image, filters)
+    tile = filterTile(image, rows, cols, filters)
+    assert np.array_equal(tile, whole[rows, cols])
+
+def test_tile_unfiltered():
+    image = _image()
+    tile = filterTile(image, slice(0, 10), slice(5, 15), ())
+    assert np.array_equal(tile, image[:10, 5:15])
@@ -0,0 +1,108 @@
+import os
+
+import pytest
+import numpy as np
+
+from inspectorcell.util.image import ImageCache, imageHistogram
+
+
+class _Loader:
+    """Counts decodes, each image has 1000 bytes
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, imgPath):
+        self.calls.append(os.path.basename(str(imgPath)))
+        return np.full((20, 25), len(self.calls), np.uint16)
+
+def _files(tmp_path, count):
+    paths = []
+    for idx in range(count):
+        path = tmp_path / 'img{}.tif'.format(idx)
+        path.write_bytes(b'')
+        paths.append(path)
+    return paths
+
+def test_cached(tmp_path):
+    loader = _Loader()
+    cache = ImageCache(loader=loader)
+    path, = _files(tmp_path, 1)
+
+    image = cache.get(path)
+    assert cache.get(str(path)) is image
+    assert loader.calls == ['img0.tif']
+    assert path in cache
+    assert not image.flags.writeable
+
+def test_eviction(tmp_path):
+    loader = _Loader()
+    cache = ImageCache(budget=2500, loader=loader)
+    paths = _files(tmp_path, 4)
+
+    cache.get(paths[0])
+    cache.get(paths[1])
+    # most recently used, the second one is evicted first
+    cache.get(paths[0])
+    cache.get(paths[2])
+
+    assert len(cache) == 2
+    assert cache.nbytes == 2000
+    assert paths[0] in cache and paths[2] in cache
+    assert not paths[1] in cache
+
+    cache.get(paths[1])
+    assert loader.calls[-1] == 'img1.tif'
+
+def test_keeps_last(tmp_path):
+    """The most recently used image is kept beyond the budget
+    """
+    cache = ImageCache(budget=10, loader=_Loader())
+    paths = _files(tmp_path, 2)
+
+    cache.get(paths[0])
+    cache.get(paths[1])
+    assert len(cache) == 1
+    assert paths[1] in cache
+
+def test_mtime(tmp_path):
+    loader = _Loader()
+    cache = ImageCache(loader=loader)
+    path, = _files(tmp_path, 1)
+
+    first = cache.get(path)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert not path in cache
+    second = cache.get(path)
+    assert not second is first
+    assert len(loader.calls) == 2
+
+def test_histogram(tmp_path):
+    cache = ImageCache(budget=1000, loader=_Loader())
+    paths = _files(tmp_path, 2)
+
+    hist = cache.histogram(paths[0])
+    assert hist.shape == (0x10000,)
+    assert hist[1] == 500
+    assert cache.histogram(paths[0]) is hist
+
+    # dropped together with the image
+    cache.get(paths[1])
+    assert not cache._histograms
+
+def test_missing(tmp_path):
+    cache = ImageCache(loader=_Loader())
+    with pytest.raises(ValueError):
+        cache.get(tmp_path / 'missing.tif')
+    assert not tmp_path / 'missing.tif' in cache
+
+def test_image_histogram():
+    image = np.array([[0, 1, 1], [0xffff, 1, 1]], np.uint16)
+    hist = imageHistogram(image)
+    assert hist[0] == 1 and hist[1] == 4 and hist[0xffff] == 1
+
+    sampled = imageHistogram(np.ones((100, 100), np.uint16), maxSamples=100)
+    assert sampled.sum() <= 100
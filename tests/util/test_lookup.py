@@ -0,0 +1,71 @@
+import pytest
+import numpy as np
+
+from inspectorcell.util.lookup import IdIndex, label_lut, colourize
+
+
+def test_rows():
+    index = IdIndex([7, 3, 11, 5])
+
+    assert len(index) == 4
+    assert index.rows([3, 5, 7, 11]).tolist() == [1, 3, 0, 2]
+
+def test_missing_ids():
+    index = IdIndex([7, 3, 11])
+
+    # below, between and above all ids
+    assert index.rows([1, 4, 12, 3]).tolist() == [-1, -1, -1, 1]
+
+def test_duplicate_ids():
+    """ids found more than once can not be resolved
+    """
+    index = IdIndex([2, 4, 2, 6, 4, 4])
+
+    assert len(index) == 1
+    assert index.rows([2, 4, 6]).tolist() == [-1, -1, 3]
+
+def test_empty_index():
+    index = IdIndex([])
+
+    assert index.rows([1, 2]).tolist() == [-1, -1]
+
+def test_join():
+    index = IdIndex([10, 20, 30])
+    joined, found = index.join([30, 15, 10], ['c', 'b', 'a'], default='-')
+
+    assert joined.tolist() == ['a', '-', 'c']
+    assert found.tolist() == [True, False, True]
+
+def test_join_numeric_default():
+    index = IdIndex([1, 2])
+    joined, found = index.join([2, 3], [0.5, 1.5], default=np.nan)
+
+    assert joined[0] == 1.5
+    assert np.isnan(joined[1])
+    assert found.tolist() == [True, False]
+
+def test_label_lut():
+    lut = label_lut([1, 3], [(255, 0, 0), (0, 255, 0)], default=(1, 1, 1))
+
+    assert lut.shape == (4, 3)
+    assert lut.dtype == np.uint8
+    assert lut[0].tolist() == [0, 0, 0]
+    assert lut[1].tolist() == [255, 0, 0]
+    assert lut[2].tolist() == [1, 1, 1]
+    assert lut[3].tolist() == [0, 255, 0]
+
+def test_label_lut_empty():
+    lut = label_lut([], [], background=(5, 5, 5))
+
+    assert lut.tolist() == [[5, 5, 5]]
+
+def test_colourize():
+    lut = label_lut([1, 2], [(10, 0, 0), (0, 20, 0)])
+    labels = np.array([[0, 1], [2, 9]])
+    image = colourize(labels[..., None], lut)
+
+    assert image.shape == (2, 2, 3)
+    assert image[0, 1].tolist() == [10, 0, 0]
+    assert image[1, 0].tolist() == [0, 20, 0]
+    # beyond the lut is background
+    assert image[1, 1].tolist() == [0, 0, 0]
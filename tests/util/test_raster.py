@@ -0,0 +1,121 @@
+import pytest
+import numpy as np
+import cv2
+
+from inspectorcell.util.raster import (fill_contours, stroke_contours,
+                                       local_mask, mask_contours,
+                                       merge_contours, rasterize)
+
+
+SQUARE = np.array([[2, 2], [7, 2], [7, 7], [2, 7]], np.int32)
+
+
+def _ring():
+    """Disk with a hole as mask in a 30 x 30 frame
+    """
+    mask = np.zeros((30, 30), np.uint8)
+    cv2.circle(mask, (15, 15), 12, 1, -1)
+    cv2.circle(mask, (15, 15), 5, 0, -1)
+    return mask.astype(bool)
+
+def test_fill():
+    canvas = np.zeros((10, 10), np.uint16)
+    fill_contours(canvas, [SQUARE], 7)
+
+    expected = np.zeros((10, 10), np.uint16)
+    expected[2:8, 2:8] = 7
+    assert np.array_equal(canvas, expected)
+
+def test_fill_offset():
+    canvas = np.zeros((10, 10), np.uint16)
+    fill_contours(canvas, [SQUARE], 7, offset=(1, -2))
+
+    expected = np.zeros((10, 10), np.uint16)
+    expected[0:6, 3:9] = 7
+    assert np.array_equal(canvas, expected)
+
+def test_stroke():
+    canvas = np.zeros((10, 10), np.uint8)
+    stroke_contours(canvas, [SQUARE], 1, 1)
+
+    expected = np.zeros((10, 10), np.uint8)
+    expected[2:8, 2:8] = 1
+    expected[3:7, 3:7] = 0
+    assert np.array_equal(canvas, expected)
+
+def test_local_mask():
+    mask_slice, mask = local_mask([SQUARE], pad=1)
+
+    assert mask_slice == np.s_[1:9, 1:9]
+    assert mask.dtype == bool
+    assert mask[1:-1, 1:-1].all()
+    assert mask.sum() == 36
+
+def test_local_mask_empty():
+    assert local_mask([np.zeros((0, 2), np.int32)]) == (None, None)
+
+def test_mask_roundtrip_holes():
+    mask = _ring()
+    mask_slice = np.s_[10:40, 20:50]
+
+    contours = mask_contours(mask_slice, mask)
+    assert len(contours) == 2
+
+    rec_slice, rec = local_mask(contours, bbox=((20, 10), (49, 39)))
+    assert rec_slice == mask_slice
+    assert np.array_equal(rec, mask)
+
+def test_mask_contours_simple():
+    mask = np.zeros((40, 40), bool)
+    mask[5:35, 5:35] = True
+
+    contours = mask_contours(np.s_[0:40, 0:40], mask)
+    assert len(contours) == 1
+    assert len(contours[0]) == 4
+
+@pytest.mark.parametrize('gap,merged', [(0, False), (2, True)])
+def test_merge_gap(gap, merged):
+    left = [np.array([[0, 0], [4, 0], [4, 9], [0, 9]], np.int32)]
+    # two pixels between the shapes
+    right = [np.array([[7, 0], [11, 0], [11, 9], [7, 9]], np.int32)]
+
+    contours = merge_contours([left, right], gap=gap)
+    if not merged:
+        assert contours is None
+        return
+
+    assert len(contours) == 1
+    _, mask = local_mask(contours, bbox=((0, 0), (11, 9)))
+    # the gap is closed, apart from the corners rounded by the closing
+    assert mask[1:-1].all()
+
+def test_merge_touching():
+    left = [np.array([[0, 0], [4, 0], [4, 9], [0, 9]], np.int32)]
+    right = [np.array([[5, 0], [9, 0], [9, 9], [5, 9]], np.int32)]
+
+    contours = merge_contours([left, right])
+    assert len(contours) == 1
+    _, mask = local_mask(contours, bbox=((0, 0), (9, 9)))
+    assert mask.all()
+
+@pytest.mark.parametrize('stroke', [0, 1, -1])
+def test_rasterize_clipped(stroke):
+    """Contours crossing the canvas are drawn as if it was larger
+    """
+    triangle = [np.array([[-5, 3], [40, 11], [9, 50]], np.int32)]
+    large = np.zeros((80, 80), np.uint8)
+    rasterize(large, [triangle], [5], stroke=stroke, offset=(20, 20))
+
+    canvas = np.zeros((24, 24), np.uint8)
+    rasterize(canvas, [triangle], [5], stroke=stroke)
+    assert np.array_equal(canvas, large[20:44, 20:44])
+
+def test_rasterize_add():
+    canvas = np.zeros((10, 10), np.uint16)
+    rasterize(canvas, [[SQUARE], [SQUARE]], [2, 3], mode='add')
+    assert canvas[4, 4] == 5
+    assert canvas[0, 0] == 0
+
+def test_rasterize_mode():
+    with pytest.raises(ValueError):
+        rasterize(np.zeros((4, 4)), [], [], mode='invalid')
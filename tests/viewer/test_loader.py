@@ -0,0 +1,82 @@
+import pytest
+import numpy as np
+
+from inspectorcell.viewer.loader import ImageLoader
+
+tifffile = pytest.importorskip('tifffile')
+
+
+def _tiff(tmp_path, name, value=1, shape=(200, 2400)):
+    """Uncompressed TIFF, which allows a strided preview
+    """
+    path = tmp_path / name
+    tifffile.imwrite(str(path), np.full(shape, value, np.uint16))
+    return path
+
+def _collect(loader):
+    loaded = []
+    loader.sigLoaded.connect(lambda *args: loaded.append(args))
+    return loaded
+
+def test_preview_first(qtbot, tmp_path):
+    path = _tiff(tmp_path, 'preview.tif')
+    loader = ImageLoader()
+    loaded = _collect(loader)
+
+    loader.load(0, 'chan', path)
+    qtbot.waitUntil(lambda: len(loaded) == 2)
+
+    (_, _, preview, extent), (_, name, image, fullExtent) = loaded
+    assert name == 'chan'
+    assert image.shape == (200, 2400)
+    assert preview.shape[1] < image.shape[1]
+    # the preview covers the full image
+    assert tuple(extent) == tuple(fullExtent) == (2400, 200)
+
+def test_no_preview_when_cached(qtbot, tmp_path):
+    path = _tiff(tmp_path, 'cached.tif')
+    loader = ImageLoader()
+    loaded = _collect(loader)
+
+    loader.load(0, 'chan', path)
+    qtbot.waitUntil(lambda: len(loaded) == 2)
+    loader.load(0, 'chan', path)
+    qtbot.waitUntil(lambda: len(loaded) == 3)
+    assert loaded[-1][2].shape == (200, 2400)
+
+def test_superseded(qtbot, tmp_path):
+    """A load replaced by a newer one for the same channel never
+    delivers anything
+    """
+    old = _tiff(tmp_path, 'old.tif', value=1)
+    new = _tiff(tmp_path, 'new.tif', value=2)
+    loader = ImageLoader()
+    loaded = _collect(loader)
+
+    loader.load(0, 'old', old)
+    loader.load(0, 'new', new)
+    loader.load(1, 'other', old)
+    qtbot.waitUntil(lambda: len([args for args in loaded \
+                                 if args[2].shape == (200, 2400)]) == 2)
+    loader._pool.waitForDone()
+    qtbot.wait(50)
+
+    assert not 'old' in [name for _, name, _, _ in loaded]
+    assert all((image == 2).all() for index, _, image, _ in loaded \
+               if index == 0)
+
+def test_cancel(qtbot, tmp_path):
+    path = _tiff(tmp_path, 'cancelled.tif')
+    loader = ImageLoader()
+    with qtbot.assertNotEmitted(loader.sigLoaded, wait=200):
+        loader.load(0, 'chan', path)
+        loader.cancel(0)
+        loader._pool.waitForDone()
+
+def test_failed(qtbot, tmp_path):
+    loader = ImageLoader()
+    with qtbot.waitSignal(loader.sigFailed) as blocker:
+        loader.load(2, 'missing', tmp_path / 'missing.tif')
+    index, name, path, _ = blocker.args
+    assert (index, name) == (2, 'missing')
+    assert path == tmp_path / 'missing.tif'
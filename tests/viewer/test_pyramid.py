@@ -0,0 +1,182 @@
+import gc
+
+import pytest
+import numpy as np
+
+from inspectorcell.viewer.pyramid import (ImagePyramid, TiledBackgroundImage,
+                                          sharedPyramid)
+from inspectorcell.viewer.tilefilter import filteredTileCache
+
+
+def _qimageArray(qimage):
+    """Copy of the pixels of a Grayscale8 QImage
+    """
+    ptr = qimage.constBits()
+    ptr.setsize(qimage.bytesPerLine() * qimage.height())
+    data = np.frombuffer(ptr, np.uint8).reshape(qimage.height(), -1)
+    return data[:, :qimage.width()].copy()
+
+def test_level_count():
+    image = np.zeros((300, 1000), np.uint16)
+    # 1000 -> 500 -> 250
+    assert ImagePyramid(image, minSize=256).levelCount == 3
+    assert ImagePyramid(image, minSize=1000).levelCount == 1
+
+def test_levels():
+    image = np.arange(10 * 7, dtype=np.uint16).reshape(10, 7)
+    pyramid = ImagePyramid(image, minSize=2)
+
+    assert pyramid.levelCount == 4
+    assert pyramid.level(0) is image
+    assert pyramid.shape == image.shape
+    assert [pyramid.level(idx).shape for idx in range(4)] == \
+        [(10, 7), (5, 4), (3, 2), (2, 1)]
+    # area interpolation averages 2 x 2 pixels
+    assert pyramid.level(1)[0, 0] == image[:2, :2].mean()
+    # computed once
+    assert pyramid.level(2) is pyramid.level(2)
+
+def test_level_clamped():
+    image = np.zeros((64, 64), np.uint16)
+    pyramid = ImagePyramid(image, minSize=16)
+    assert pyramid.level(-1) is image
+    assert pyramid.level(10) is pyramid.level(pyramid.levelCount - 1)
+
+@pytest.mark.parametrize('lod,level', [
+    (4., 0),
+    (1., 0),
+    (0.6, 0),
+    (0.5, 1),
+    (0.3, 1),
+    (0.25, 2),
+    (0.01, 3),
+    (0., 3),
+])
+def test_level_for_lod(lod, level):
+    pyramid = ImagePyramid(np.zeros((64, 64), np.uint16), minSize=8)
+    assert pyramid.levelCount == 4
+    assert pyramid.levelForLod(lod) == level
+
+def test_shared():
+    image = np.zeros((64, 64), np.uint16)
+    pyramid = sharedPyramid(image, minSize=16)
+    assert sharedPyramid(image, minSize=16) is pyramid
+    assert not sharedPyramid(image.copy(), minSize=16) is pyramid
+
+def _background(filters=()):
+    image = np.arange(64 * 48, dtype=np.uint16).reshape(48, 64) * 20
+    background = TiledBackgroundImage(tileSize=32)
+    background.setImage(image)
+    background.setLookupTable((np.arange(0x10000) >> 8).astype(np.uint8))
+    background.setFilters(filters)
+    return background, image
+
+def test_tile():
+    background, image = _background()
+    qimage = background.tile(0, 1, 0)
+
+    assert (qimage.width(), qimage.height()) == (32, 32)
+    assert np.array_equal(_qimageArray(qimage), image[:32, 32:] >> 8)
+    # cached
+    assert background.tile(0, 1, 0) is qimage
+
+def test_placeholder_owns_buffer(qtbot):
+    """Unfiltered placeholders are not cached, their QImage must not
+    point into a freed array
+    """
+    background, image = _background((('gamma', 0.5),))
+    with qtbot.waitSignal(filteredTileCache().sigReady) as blocker:
+        qimage = background.tile(0, 1, 1)
+        assert not background._tiles
+        gc.collect()
+        # reuse the memory of any freed buffer
+        garbage = [np.full(32 * 16, 0xff, np.uint8) for _ in range(64)]
+        assert np.array_equal(_qimageArray(qimage), image[32:, 32:] >> 8)
+
+    pyramid, level, rows, cols = blocker.args
+    assert pyramid is background.pyramid
+    assert (level, rows, cols) == (0, slice(32, 48), slice(32, 64))
+    # the filtered tile is final and cached now
+    background.tile(0, 1, 1)
+    assert (0, 1, 1) in background._tiles
+
+@pytest.mark.parametrize('level,rect', [
+    (0, (26, 9, 16, 16)),
+    (1, (42, 9, 32, 32)),
+])
+def test_level_rect(level, rect):
+    background, _ = _background()
+    background.setBGPos(10, 9)
+    tileRect = background.levelRect(level, slice(0, 16), slice(16, 32))
+    assert (tileRect.x(), tileRect.y(), tileRect.width(),
+            tileRect.height()) == rect
+
+def _qimageRGB(qimage):
+    """Copy of the pixels of a RGB888 QImage
+    """
+    ptr = qimage.constBits()
+    ptr.setsize(qimage.bytesPerLine() * qimage.height())
+    data = np.frombuffer(ptr, np.uint8).reshape(qimage.height(), -1)
+    return data[:, :qimage.width() * 3].reshape(
+        qimage.height(), qimage.width(), 3).copy()
+
+def _composite(values, colours, blend='add', shapes=None):
+    """Composite of constant images, the lut maps values to themselves
+    """
+    if shapes is None:
+        shapes = [(32, 32)] * len(values)
+    images = [np.full(shape, value, np.uint16) \
+              for shape, value in zip(shapes, values)]
+    lut = np.arange(0x10000).clip(0, 0xff).astype(np.uint8)
+    background = TiledBackgroundImage(tileSize=32)
+    background.setComposite(images, [lut] * len(images), colours,
+                            blend=blend)
+    return background
+
+@pytest.mark.parametrize('blend,rgb', [
+    ('add', (200, 100, 200)),
+    ('max', (200, 100, 200)),
+])
+def test_composite_disjoint(blend, rgb):
+    """Colours without common channels are the same for both blends
+    """
+    background = _composite([100, 200], [(0, 255, 0), (255, 0, 255)],
+                            blend=blend)
+    assert background.isComposite
+    pixels = _qimageRGB(background.tile(0, 0, 0))
+    assert pixels.shape == (32, 32, 3)
+    assert (pixels == rgb).all()
+
+@pytest.mark.parametrize('blend,rgb', [
+    # 200 + 150 saturates
+    ('add', (255, 200, 0)),
+    ('max', (200, 200, 0)),
+])
+def test_composite_overlapping(blend, rgb):
+    background = _composite([200, 150], [(255, 255, 0), (255, 0, 0)],
+                            blend=blend)
+    pixels = _qimageRGB(background.tile(0, 0, 0))
+    assert (pixels == rgb).all()
+
+def test_composite_scaled_colour():
+    background = _composite([200], [(0, 0, 127)])
+    pixels = _qimageRGB(background.tile(0, 0, 0))
+    assert (pixels == (0, 0, 99)).all()
+
+def test_composite_invalid_blend():
+    with pytest.raises(ValueError):
+        _composite([100, 200], [(0, 255, 0), (255, 0, 255)], blend='mean')
+
+def test_composite_shape_mismatch():
+    """Layers of another shape are dropped with a warning
+    """
+    with pytest.warns(UserWarning, match='same shape'):
+        background = _composite([100, 200], [(0, 255, 0), (255, 0, 255)],
+                                shapes=[(32, 32), (16, 32)])
+    pixels = _qimageRGB(background.tile(0, 0, 0))
+    assert (pixels == (0, 100, 0)).all()
+
+def test_composite_ended():
+    background = _composite([100, 200], [(0, 255, 0), (255, 0, 255)])
+    background.setImage(np.zeros((32, 32), np.uint16))
+    assert not background.isComposite